@@ -0,0 +1,159 @@
+"""Salary analytics aggregated in the database.
+
+Headcount, mean, minimum and maximum come straight from SQL ``GROUP BY``.
+Percentiles need the ordered values: PostgreSQL computes them in SQL with
+``percentile_cont``. SQLite has no percentile aggregate, so there one
+unsorted pass fetches ``(department, position, salary)`` into flat arrays
+and every group's percentiles are interpolated in a single vectorized step
+with NumPy (or in plain Python when NumPy is not installed). No ``Employee``
+objects are built either way.
+
+Results are cached in ``employee_cache`` until the next employee write.
+"""
+from array import array
+from functools import lru_cache
+
+from sqlalchemy import func, select
+
+from models import db, Employee
+from cache import employee_cache
+from routing import cached_read
+
+
+@lru_cache(maxsize=None)
+def numpy_module():
+    """numpy, or None without it; imported on first use, not at worker start."""
+    try:
+        import numpy
+    except ImportError:  # Optional; the plain Python path gives the same numbers
+        return None
+    return numpy
+
+
+PERCENTILES = (25, 50, 75, 90)
+FETCH_SIZE = 10000
+
+
+def _group_percentiles(codes, salaries, group_count):
+    """``PERCENTILES`` of ``salaries`` for each group code in ``range(group_count)``.
+
+    ``codes`` and ``salaries`` are parallel ``array('q')`` / ``array('d')``.
+    Uses the same linear interpolation as ``percentile_cont`` and
+    ``numpy.percentile``. Groups without values get ``None``.
+    """
+    if not salaries:
+        return [None] * group_count
+    fractions = [pct / 100 for pct in PERCENTILES]
+
+    np = numpy_module()
+    if np is not None:
+        codes = np.frombuffer(codes, dtype=np.int64)
+        values = np.frombuffer(salaries, dtype=np.float64)
+        # Sort by group, then salary, so each group is one sorted slice
+        values = values[np.lexsort((values, codes))]
+        sizes = np.bincount(codes, minlength=group_count)
+        starts = np.concatenate(([0], np.cumsum(sizes)[:-1]))
+        last = np.maximum(sizes - 1, 0)[:, None]
+        positions = last * np.asarray(fractions)[None, :]
+        lower = np.floor(positions).astype(np.int64)
+        upper = np.minimum(lower + 1, last)
+        # Empty groups index past their (zero-length) slice; clamp and drop them
+        low = values[np.minimum(starts[:, None] + lower, len(values) - 1)]
+        high = values[np.minimum(starts[:, None] + upper, len(values) - 1)]
+        result = (low + (high - low) * (positions - lower)).tolist()
+        return [row if size else None for row, size in zip(result, sizes.tolist())]
+
+    groups = [[] for _ in range(group_count)]
+    for code, salary in zip(codes, salaries):
+        groups[code].append(salary)
+    result = []
+    for values in groups:
+        if not values:
+            result.append(None)
+            continue
+        values.sort()
+        row = []
+        for fraction in fractions:
+            position = (len(values) - 1) * fraction
+            lower = int(position)
+            upper = min(lower + 1, len(values) - 1)
+            row.append(values[lower] + (values[upper] - values[lower]) * (position - lower))
+        result.append(row)
+    return result
+
+
+def _fetched_percentiles():
+    """Percentiles keyed by ``None`` (everyone), department and position."""
+    table = Employee.__table__
+    # A Core result on the session's connection: plain tuples, no ORM row processing
+    result = db.session.connection().execute(
+        select(table.c.department, table.c.position, table.c.salary)
+        .execution_options(stream_results=True)
+    )
+    departments = {}
+    positions = {}
+    department_codes = array('q')
+    position_codes = array('q')
+    salaries = array('d')
+    for chunk in result.partitions(FETCH_SIZE):
+        for department, position, salary in chunk:
+            department_codes.append(departments.setdefault(department, len(departments)))
+            position_codes.append(positions.setdefault(position, len(positions)))
+            salaries.append(salary)
+
+    everyone = _group_percentiles(array('q', [0]) * len(salaries), salaries, 1)
+    by_department = _group_percentiles(department_codes, salaries, len(departments))
+    by_position = _group_percentiles(position_codes, salaries, len(positions))
+    return {
+        None: {None: everyone[0]},
+        'department': dict(zip(departments, by_department)),
+        'position': dict(zip(positions, by_position)),
+    }
+
+
+def _group_stats(key, percentiles):
+    """Stats per distinct value of ``key``, or for everyone when ``key`` is None."""
+    keys = [key] if key is not None else []
+    columns = keys + [
+        func.count(Employee.id),
+        func.avg(Employee.salary),
+        func.min(Employee.salary),
+        func.max(Employee.salary),
+    ]
+    if percentiles is None:
+        columns += [func.percentile_cont(pct / 100).within_group(Employee.salary)
+                    for pct in PERCENTILES]
+
+    stats = []
+    for row in db.session.query(*columns).group_by(*keys).order_by(*keys):
+        group = row[0] if keys else None
+        count, mean, low, high = row[len(keys):len(keys) + 4]
+        values = row[len(keys) + 4:] if percentiles is None else percentiles[getattr(key, 'key', None)].get(group)
+        if not count or values is None:
+            # No employees, or the group appeared after the salaries were fetched
+            continue
+        stats.append({
+            'group': group,
+            'headcount': count,
+            'mean': float(mean),
+            'min': low,
+            'max': high,
+            'percentiles': {pct: float(value) for pct, value in zip(PERCENTILES, values)},
+        })
+    return stats
+
+
+def compute_salary_analytics():
+    """Uncached analytics; use ``salary_analytics()`` from views."""
+    percentiles = None if db.engine.dialect.name == 'postgresql' else _fetched_percentiles()
+    overall = _group_stats(None, percentiles)
+    return {
+        'overall': overall[0] if overall else None,
+        'departments': _group_stats(Employee.department, percentiles),
+        'positions': _group_stats(Employee.position, percentiles),
+    }
+
+
+def salary_analytics():
+    """Company, per-department and per-position salary statistics."""
+    return cached_read(employee_cache, 'salary_analytics', compute_salary_analytics)
@@ -0,0 +1,282 @@
+"""Versioned JSON API over employees.
+
+Uses the same session login and RBAC decorators as the HTML routes. Reads
+are keyset-paginated and answer ``If-None-Match`` with ``304 Not Modified``
+so polling clients do not re-download unchanged pages. Batch writes run in
+a single transaction: either every item is applied or none is.
+"""
+from flask import Blueprint, jsonify, request
+from flask_login import current_user
+from sqlalchemy.exc import IntegrityError
+from werkzeug.exceptions import HTTPException
+
+from models import db, Employee
+from analytics import salary_analytics
+from auth import permission_required
+from autocomplete import prefix_index
+from cache import employee_cache, invalidate_employee_caches
+from exporter import EXPORT_FIELDS
+from hierarchy import can_reach, is_scoped, parse_manager, scope_query, subtree_ids
+from importer import validate_row
+from pagination import decode_cursor, keyset_paginate
+from routing import from_primary
+from search import filter_employees
+
+api = Blueprint('api', __name__, url_prefix='/api/v1')
+
+DEFAULT_LIMIT = 50
+MAX_LIMIT = 500
+MAX_BATCH = 1000
+SUGGEST_LIMIT = 10
+MAX_SUGGEST_LIMIT = 50
+SUGGEST_FIELDS = ('id', 'name', 'email', 'position', 'department')
+
+
+class ApiError(Exception):
+
+    def __init__(self, message, status=400, details=None):
+        super().__init__(message)
+        self.message = message
+        self.status = status
+        self.details = details
+
+
+@api.errorhandler(ApiError)
+def handle_api_error(error):
+    body = {'error': error.message}
+    if error.details:
+        body['details'] = error.details
+    return jsonify(body), error.status
+
+
+def handle_http_error(error):
+    if error.code >= 500:
+        db.session.rollback()
+    return jsonify({'error': error.description}), error.code
+
+
+api.register_error_handler(HTTPException, handle_http_error)
+# The app's HTML handlers for these codes would otherwise win over the class handler
+for _code in (403, 404, 500):
+    api.register_error_handler(_code, handle_http_error)
+
+
+@api.before_request
+def require_login():
+    # JSON clients get a 401 instead of a redirect to the login page
+    if not current_user.is_authenticated:
+        return jsonify({'error': 'Authentication required'}), 401
+
+
+def visible_fields():
+    if current_user.can_view_salaries():
+        return EXPORT_FIELDS
+    return tuple(field for field in EXPORT_FIELDS if field != 'salary')
+
+
+def requested_fields():
+    """Fields from ``?fields=a,b``; hidden or unknown fields are an error."""
+    allowed = visible_fields()
+    fields = request.args.get('fields')
+    if not fields:
+        return allowed
+    fields = tuple(field.strip() for field in fields.split(',') if field.strip())
+    unknown = [field for field in fields if field not in allowed]
+    if unknown:
+        raise ApiError(f"Unknown fields: {', '.join(unknown)}")
+    return fields
+
+
+def serialize(employee, fields):
+    return {field: getattr(employee, field) for field in fields}
+
+
+def conditional(payload):
+    """JSON response with a content ETag; 304 when the client already has it."""
+    response = jsonify(payload)
+    response.add_etag()
+    return response.make_conditional(request)
+
+
+def json_items():
+    data = request.get_json(silent=True)
+    if isinstance(data, dict):
+        data = data.get('items')
+    if not isinstance(data, list) or not data:
+        raise ApiError("Expected a non-empty JSON list of items")
+    if len(data) > MAX_BATCH:
+        raise ApiError(f"At most {MAX_BATCH} items per batch")
+    return data
+
+
+def validate_item(item, partial=False):
+    """``validate_row()`` plus the optional ``manager_id``."""
+    clean = validate_row(item, partial=partial)
+    if 'manager_id' in item:
+        clean['manager_id'] = parse_manager(item['manager_id'])
+        # Managers can only move people within their own team
+        if is_scoped(current_user) and not (clean['manager_id'] and can_reach(current_user, clean['manager_id'])):
+            raise ValueError("You can only move employees within your own team")
+    return clean
+
+
+def commit():
+    try:
+        db.session.commit()
+    except IntegrityError as e:
+        db.session.rollback()
+        raise ApiError("Conflicts with an existing employee (duplicate email?)", 409,
+                       str(e.orig))
+    except ValueError as e:
+        # Reporting-line checks run at flush time
+        db.session.rollback()
+        raise ApiError(str(e))
+    invalidate_employee_caches()
+
+
+@api.route('/employees')
+@permission_required('read')
+def list_employees():
+    fields = requested_fields()
+    limit = min(max(request.args.get('limit', DEFAULT_LIMIT, type=int), 1), MAX_LIMIT)
+    after = request.args.get('after')
+    # The dashboard falls back to page 1; a client would silently start over
+    if after and decode_cursor(after) is None:
+        raise ApiError(f"Invalid cursor '{after}'")
+    query = filter_employees(
+        scope_query(Employee.query, current_user),
+        request.args.get('search', ''),
+        request.args.get('department', ''),
+        ranked=False
+    )
+    page = keyset_paginate(
+        query, after, per_page=limit,
+        with_count=request.args.get('count', 0, type=int) == 1
+    )
+    payload = {
+        'items': [serialize(employee, fields) for employee in page.items],
+        'next_cursor': page.next_cursor,
+    }
+    if page.total is not None:
+        payload['total'] = page.total
+    return conditional(payload)
+
+
+def team_ids(user):
+    """Ids a manager may see, as a set for the prefix index; None when unrestricted."""
+    if not is_scoped(user):
+        return None
+    root_id = user.employee_id
+    if root_id is None:
+        return frozenset()
+    return employee_cache.get_or_compute(('team_ids', root_id), from_primary(lambda: frozenset(
+        db.session.scalars(subtree_ids(root_id))
+    ) | {root_id}))
+
+
+@api.route('/employees/autocomplete')
+@permission_required('read')
+def autocomplete():
+    """Up to ``limit`` employees matching the start of every word in ``q``."""
+    text = request.args.get('q', '').strip()
+    limit = min(max(request.args.get('limit', SUGGEST_LIMIT, type=int), 1), MAX_SUGGEST_LIMIT)
+    if not text:
+        return conditional({'items': []})
+    ids = prefix_index.search(text, limit, team_ids(current_user))
+    if ids is None:
+        # Index still building: same matching rules, answered by the full-text index
+        query = filter_employees(scope_query(Employee.query, current_user), text, ranked=False)
+        employees = query.limit(limit).all()
+    else:
+        rows = {employee.id: employee for employee in Employee.query.filter(Employee.id.in_(ids))}
+        employees = [rows[i] for i in ids if i in rows]
+    return conditional({'items': [serialize(employee, SUGGEST_FIELDS) for employee in employees]})
+
+
+@api.route('/employees/<int:employee_id>')
+@permission_required('read')
+def get_employee(employee_id):
+    employee = db.get_or_404(Employee, employee_id)
+    # Outside a manager's team looks the same as not existing
+    if not can_reach(current_user, employee_id):
+        raise ApiError("Employee not found", 404)
+    return conditional(serialize(employee, requested_fields()))
+
+
+@api.route('/employees', methods=['POST'])
+@permission_required('create')
+def create_employees():
+    """Create a batch of employees in one transaction."""
+    errors = []
+    employees = []
+    for index, item in enumerate(json_items()):
+        try:
+            employees.append(Employee(**validate_item(item if isinstance(item, dict) else {})))
+        except ValueError as e:
+            errors.append({'index': index, 'error': str(e)})
+    if errors:
+        raise ApiError("Validation failed, nothing was created", details=errors)
+
+    db.session.add_all(employees)
+    commit()
+    return jsonify({'items': [serialize(employee, visible_fields()) for employee in employees]}), 201
+
+
+@api.route('/employees', methods=['PATCH'])
+@permission_required('update')
+def update_employees():
+    """Update a batch of ``{"id": ..., <fields>}`` items in one transaction."""
+    items = json_items()
+    errors = []
+    changes = {}
+    for index, item in enumerate(items):
+        if not isinstance(item, dict) or not isinstance(item.get('id'), int):
+            errors.append({'index': index, 'error': "Each item needs an integer 'id'"})
+            continue
+        try:
+            changes[item['id']] = validate_item(item, partial=True)
+        except ValueError as e:
+            errors.append({'index': index, 'error': str(e)})
+    if errors:
+        raise ApiError("Validation failed, nothing was updated", details=errors)
+
+    query = scope_query(Employee.query, current_user, include_root=False)
+    employees = query.filter(Employee.id.in_(list(changes))).all()
+    missing = set(changes) - {employee.id for employee in employees}
+    if missing:
+        raise ApiError("Employees not found", 404, sorted(missing))
+
+    for employee in employees:
+        for field, value in changes[employee.id].items():
+            setattr(employee, field, value)
+    commit()
+    return jsonify({'items': [serialize(employee, visible_fields()) for employee in employees]})
+
+
+@api.route('/employees', methods=['DELETE'])
+@permission_required('delete')
+def delete_employees():
+    """Delete a batch of employees given as ``{"ids": [...]}`` in one transaction."""
+    data = request.get_json(silent=True) or {}
+    ids = data.get('ids') if isinstance(data, dict) else None
+    if not isinstance(ids, list) or not ids or not all(isinstance(i, int) for i in ids):
+        raise ApiError("Expected {\"ids\": [<int>, ...]}")
+    if len(ids) > MAX_BATCH:
+        raise ApiError(f"At most {MAX_BATCH} items per batch")
+
+    employees = Employee.query.filter(Employee.id.in_(ids)).all()
+    missing = set(ids) - {employee.id for employee in employees}
+    if missing:
+        raise ApiError("Employees not found", 404, sorted(missing))
+
+    for employee in employees:
+        db.session.delete(employee)
+    commit()
+    return jsonify({'deleted': sorted(ids)})
+
+
+@api.route('/analytics/salaries')
+def salary_stats():
+    if not current_user.can_view_salaries():
+        raise ApiError("Salary analytics are restricted", 403)
+    return conditional(salary_analytics())
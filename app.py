@@ -1,64 +1,124 @@
-from flask import Flask, render_template, request, redirect, url_for, flash, abort
-from flask_login import LoginManager, login_user, logout_user, login_required, current_user
-from models import db, User, Employee, Role
-from werkzeug.security import generate_password_hash, check_password_hash
-from functools import wraps
-import random
+from flask import Blueprint, Flask, render_template, request, redirect, url_for, flash, abort, g, Response, stream_with_context
+from flask_login import login_user, logout_user, login_required, current_user
+from models import db, User, Employee, Role, AuditLog
+from search import filter_employees
+from migrations import upgrade
+from pagination import keyset_paginate
+from seeding import seed_employees
+from importer import FORMATS as IMPORT_FORMATS, detect_format, import_employees, validate_row
+from exporter import FORMATS as EXPORT_FORMATS, stream_export
+from analytics import PERCENTILES, salary_analytics
+from summary import department_summary, rebuild_department_stats
+from hierarchy import can_reach, chain_of_command, is_scoped, parse_manager, rebuild_closure, scope_filter, scope_query, team_sizes, team_summary
+from bulk import bulk_changes, bulk_delete, bulk_selection, bulk_update, parse_ids, preview
+from cache import employee_cache, user_cache, page_cache, invalidate_employee_caches
+from auth import login_manager, role_required, permission_required, invalidate_user_cache
+from passwords import HasherBusy, password_hasher
+from api import api
+from metrics import metrics
+from pagecache import cached_fragment, cached_response
+from audit import audit_writer
+from autocomplete import prefix_index
+from database import configure_engine, engine_options
+from routing import cached_read, replica_binds, replica_router
 from datetime import datetime
-import time
+import click
+import json
 import os
 
-app = Flask(__name__)
-app.secret_key = os.environ.get('SECRET_KEY', 'your_secret_key_for_development')
-app.config['SQLALCHEMY_DATABASE_URI'] = os.environ.get('DATABASE_URL', 'sqlite:///employees.db')
-app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
-
-# Initialize Flask-Login
-login_manager = LoginManager()
-login_manager.init_app(app)
-login_manager.login_view = 'login'
-login_manager.login_message = 'Please log in to access this page.'
-
-# Initialize db with app
-db.init_app(app)
-
-@login_manager.user_loader
-def load_user(user_id):
-    return User.query.get(int(user_id))
-
-# Role-based decorators
-def role_required(roles):
-    """Decorator to require specific roles"""
-    def decorator(f):
-        @wraps(f)
-        def decorated_function(*args, **kwargs):
-            if not current_user.is_authenticated:
-                return redirect(url_for('login'))
-            if current_user.role not in roles:
-                abort(403)  # Forbidden
-            return f(*args, **kwargs)
-        return decorated_function
-    return decorator
-
-def permission_required(permission):
-    """Decorator to require specific permission"""
-    def decorator(f):
-        @wraps(f)
-        def decorated_function(*args, **kwargs):
-            if not current_user.is_authenticated:
-                return redirect(url_for('login'))
-            if not current_user.has_permission(permission):
-                abort(403)  # Forbidden
-            return f(*args, **kwargs)
-        return decorated_function
-    return decorator
-
-# Create tables and users
-with app.app_context():
-    # Drop all tables and recreate them to ensure schema consistency
-    db.drop_all()
-    db.create_all()
-    
+main = Blueprint('main', __name__, cli_group=None)
+
+def configure(app):
+    """Load settings from the environment."""
+    app.secret_key = os.environ.get('SECRET_KEY', 'your_secret_key_for_development')
+    app.config['SQLALCHEMY_DATABASE_URI'] = os.environ.get('DATABASE_URL', 'sqlite:///employees.db')
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    # Connection pool per worker process for client/server databases (not SQLite);
+    # keep workers * (DB_POOL_SIZE + DB_MAX_OVERFLOW) under the server's connection limit
+    app.config['DB_POOL_SIZE'] = int(os.environ.get('DB_POOL_SIZE', 5))
+    app.config['DB_MAX_OVERFLOW'] = int(os.environ.get('DB_MAX_OVERFLOW', 5))
+    app.config['DB_POOL_TIMEOUT'] = float(os.environ.get('DB_POOL_TIMEOUT', 10))
+    app.config['DB_POOL_RECYCLE'] = int(os.environ.get('DB_POOL_RECYCLE', 1800))
+    app.config['DB_POOL_PRE_PING'] = os.environ.get('DB_POOL_PRE_PING', '1') != '0'
+    # Seconds a SQLite writer waits for the lock before "database is locked"
+    app.config['SQLITE_BUSY_TIMEOUT'] = float(os.environ.get('SQLITE_BUSY_TIMEOUT', 15))
+    app.config['SQLITE_WAL'] = os.environ.get('SQLITE_WAL', '1') != '0'
+    # Optional read replicas (comma-separated URLs); GET requests read from them
+    app.config['SQLALCHEMY_BINDS'] = replica_binds(os.environ.get('DATABASE_REPLICA_URLS', ''))
+    # How long a user reads from the primary after their own write
+    app.config['REPLICA_STICKY_SECONDS'] = float(os.environ.get('REPLICA_STICKY_SECONDS', 10))
+    # How long an unreachable replica is skipped before it is tried again
+    app.config['REPLICA_RETRY_SECONDS'] = float(os.environ.get('REPLICA_RETRY_SECONDS', 30))
+    # How long dashboard data and pages read from a replica stay cached
+    app.config['REPLICA_CACHE_SECONDS'] = float(os.environ.get('REPLICA_CACHE_SECONDS', 5))
+    app.config['CACHE_TTL'] = int(os.environ.get('CACHE_TTL', 300))
+    # Optional SQLite file shared by all workers on this host for cache entries
+    app.config['CACHE_SHARED_PATH'] = os.environ.get('CACHE_SHARED_PATH')
+    # How long another worker may serve a logged-in user's old role after an edit
+    # (only without CACHE_SHARED_PATH; 0 reloads the user on every request)
+    app.config['USER_CACHE_TTL'] = int(os.environ.get('USER_CACHE_TTL', 5))
+    # Password hashing cost and the process pool that computes it (0 = inline)
+    app.config['PASSWORD_HASH_METHOD'] = os.environ.get('PASSWORD_HASH_METHOD', 'pbkdf2:sha256:600000')
+    app.config['PASSWORD_HASH_WORKERS'] = int(os.environ.get('PASSWORD_HASH_WORKERS', 2))
+    app.config['PASSWORD_HASH_TIMEOUT'] = float(os.environ.get('PASSWORD_HASH_TIMEOUT', 10))
+    # Statements slower than this are logged with their SQL text
+    app.config['SLOW_QUERY_MS'] = float(os.environ.get('SLOW_QUERY_MS', 200))
+    # When set, /metrics requires "Authorization: Bearer <token>"
+    app.config['METRICS_TOKEN'] = os.environ.get('METRICS_TOKEN')
+    # Audit entries are written by a background thread in batches (0 = inline at commit)
+    app.config['AUDIT_ASYNC'] = os.environ.get('AUDIT_ASYNC', '1') != '0'
+    app.config['AUDIT_BATCH_SIZE'] = int(os.environ.get('AUDIT_BATCH_SIZE', 100))
+    app.config['AUDIT_FLUSH_INTERVAL'] = float(os.environ.get('AUDIT_FLUSH_INTERVAL', 1.0))
+    # Entries queued in memory per process before writers have to wait for the database
+    app.config['AUDIT_QUEUE_SIZE'] = int(os.environ.get('AUDIT_QUEUE_SIZE', 10000))
+    # Minimum seconds between background rebuilds of the autocomplete index
+    app.config['AUTOCOMPLETE_REBUILD_INTERVAL'] = float(os.environ.get('AUTOCOMPLETE_REBUILD_INTERVAL', 30))
+
+def cache_metrics():
+    lines = ['# HELP staffhub_cache_lookups_total Cache lookups by result.',
+             '# TYPE staffhub_cache_lookups_total counter']
+    for cache in (employee_cache, user_cache, page_cache):
+        stats = cache.get_stats()
+        for result in ('hits', 'shared_hits', 'misses'):
+            lines.append(f'staffhub_cache_lookups_total{{cache="{cache.name}",result="{result}"}} {stats[result]}')
+    return lines
+
+metrics.add_collector(cache_metrics)
+
+def audit_metrics():
+    lines = ['# HELP staffhub_audit_entries_total Audit entries by outcome.',
+             '# TYPE staffhub_audit_entries_total counter']
+    for result in ('written', 'inline', 'failed'):
+        lines.append(f'staffhub_audit_entries_total{{result="{result}"}} {audit_writer.stats[result]}')
+    return lines
+
+metrics.add_collector(audit_metrics)
+
+def autocomplete_metrics():
+    lines = ['# HELP staffhub_autocomplete_total Autocomplete index activity by kind.',
+             '# TYPE staffhub_autocomplete_total counter']
+    for kind in ('builds', 'updates', 'lookups', 'fallbacks'):
+        lines.append(f'staffhub_autocomplete_total{{kind="{kind}"}} {prefix_index.stats[kind]}')
+    lines += ['# HELP staffhub_autocomplete_employees Employees in this process\'s autocomplete index.',
+              '# TYPE staffhub_autocomplete_employees gauge',
+              f'staffhub_autocomplete_employees {prefix_index.size}']
+    return lines
+
+metrics.add_collector(autocomplete_metrics)
+
+# Default accounts, and optionally sample employees, for an empty database
+def seed_database(demo=False):
+    if User.query.first() is not None:
+        print("Users already exist, skipping default accounts")
+    else:
+        seed_users()
+    if demo:
+        if Employee.query.first() is not None:
+            print("Employees already exist, skipping demo data")
+        else:
+            seed_demo_employees()
+
+def seed_users():
     # Create users with different roles
     users_data = [
         {
@@ -94,7 +154,7 @@ with app.app_context():
     for user_data in users_data:
         user = User(
             username=user_data['username'],
-            password=generate_password_hash(user_data['password']),
+            password=password_hasher.hash(user_data['password']),
             role=user_data['role'],
             full_name=user_data['full_name'],
             email=user_data['email']
@@ -108,217 +168,196 @@ with app.app_context():
     print("Manager: Manager / manager@staffhub.com")
     print("Employee: Employee / employee@staffhub.com")
 
+def seed_demo_employees():
     # Generate 100+ sample employees for enterprise-scale testing
-    def generate_large_employee_dataset():
-        departments = ['Engineering', 'Human Resources', 'Marketing', 'Finance', 'Sales', 'Operations', 'IT Support', 'Legal', 'Research & Development', 'Customer Service']
-        positions = {
-            'Engineering': ['Software Engineer', 'Senior Software Engineer', 'Lead Developer', 'DevOps Engineer', 'Frontend Developer', 'Backend Developer', 'Full Stack Developer', 'System Architect'],
-            'Human Resources': ['HR Manager', 'HR Specialist', 'Recruiter', 'Training Coordinator', 'Compensation Analyst'],
-            'Marketing': ['Marketing Manager', 'Digital Marketing Specialist', 'Content Creator', 'SEO Specialist', 'Brand Manager'],
-            'Finance': ['Financial Analyst', 'Accountant', 'Finance Manager', 'Budget Analyst', 'Tax Specialist'],
-            'Sales': ['Sales Manager', 'Sales Representative', 'Account Executive', 'Business Development Manager'],
-            'Operations': ['Operations Manager', 'Project Manager', 'Quality Analyst', 'Process Improvement Specialist'],
-            'IT Support': ['IT Support Specialist', 'System Administrator', 'Network Engineer', 'Help Desk Technician'],
-            'Legal': ['Legal Counsel', 'Paralegal', 'Contract Specialist', 'Compliance Officer'],
-            'Research & Development': ['Research Scientist', 'Product Manager', 'Innovation Specialist', 'R&D Engineer'],
-            'Customer Service': ['Customer Service Rep', 'Support Manager', 'Client Success Manager', 'Call Center Agent']
-        }
-        
-        first_names = ['John', 'Sarah', 'Michael', 'Emily', 'Robert', 'Lisa', 'David', 'Jennifer', 'Christopher', 'Ashley', 
-                      'Matthew', 'Amanda', 'Daniel', 'Jessica', 'Anthony', 'Melissa', 'Mark', 'Michelle', 'Steven', 'Kimberly',
-                      'Paul', 'Amy', 'Andrew', 'Angela', 'Joshua', 'Helen', 'Kenneth', 'Deborah', 'Kevin', 'Rachel',
-                      'Brian', 'Carolyn', 'George', 'Janet', 'Edward', 'Catherine', 'Ronald', 'Maria', 'Timothy', 'Heather',
-                      'Jason', 'Diane', 'Jeffrey', 'Ruth', 'Ryan', 'Julie', 'Jacob', 'Joyce', 'Gary', 'Virginia']
-        
-        last_names = ['Smith', 'Johnson', 'Williams', 'Brown', 'Jones', 'Garcia', 'Miller', 'Davis', 'Rodriguez', 'Martinez',
-                     'Hernandez', 'Lopez', 'Gonzalez', 'Wilson', 'Anderson', 'Thomas', 'Taylor', 'Moore', 'Jackson', 'Martin',
-                     'Lee', 'Perez', 'Thompson', 'White', 'Harris', 'Sanchez', 'Clark', 'Ramirez', 'Lewis', 'Robinson',
-                     'Walker', 'Young', 'Allen', 'King', 'Wright', 'Scott', 'Torres', 'Nguyen', 'Hill', 'Flores']
-        
-        employees = []
-        used_emails = set()  # Track used emails to prevent duplicates
-        
-        for i in range(120):  # Generate 120 employees for 100+ requirement
-            dept = random.choice(departments)
-            first_name = random.choice(first_names)
-            last_name = random.choice(last_names)
-            position = random.choice(positions[dept])
-            
-            # Generate unique email with counter if needed
-            base_email = f"{first_name.lower()}.{last_name.lower()}"
-            email = f"{base_email}@staffhub.com"
-            counter = 1
-            while email in used_emails:
-                email = f"{base_email}{counter}@staffhub.com"
-                counter += 1
-            used_emails.add(email)
-            
-            # Generate realistic salary ranges based on position and department
-            base_salary = {
-                'Engineering': random.randint(70000, 130000),
-                'Human Resources': random.randint(50000, 85000),
-                'Marketing': random.randint(45000, 90000),
-                'Finance': random.randint(55000, 95000),
-                'Sales': random.randint(40000, 120000),
-                'Operations': random.randint(50000, 85000),
-                'IT Support': random.randint(45000, 75000),
-                'Legal': random.randint(80000, 150000),
-                'Research & Development': random.randint(65000, 110000),
-                'Customer Service': random.randint(35000, 60000)
-            }
-            
-            employees.append({
-                'name': f"{first_name} {last_name}",
-                'email': email,
-                'department': dept,
-                'position': position,
-                'salary': base_salary[dept]
-            })
-        
-        return employees
-    
     print("Generating 100+ employee records for enterprise-scale testing...")
-    start_time = time.time()
-    
-    sample_employees = generate_large_employee_dataset()
-    
-    for emp_data in sample_employees:
-        employee = Employee(
-            name=emp_data['name'],
-            email=emp_data['email'],
-            department=emp_data['department'],
-            position=emp_data['position'],
-            salary=emp_data['salary']
-        )
-        db.session.add(employee)
-    
-    db.session.commit()
-    
-    end_time = time.time()
-    processing_time = end_time - start_time
+    created, processing_time = seed_employees(120)
+    # The demo manager account heads the first team below the top of the tree
+    manager = User.query.filter_by(username='Manager').first()
+    if manager is not None and manager.employee_id is None:
+        manager.employee_id = db.session.execute(
+            db.select(Employee.id).where(Employee.manager_id.is_not(None)).order_by(Employee.id).limit(1)
+        ).scalar()
+        db.session.commit()
     
-    print(f"✅ Successfully created {len(sample_employees)} employee records!")
+    print(f"✅ Successfully created {created} employee records!")
     print(f"⚡ Database processing time: {processing_time:.2f} seconds")
     print("🚀 Enterprise-scale dataset ready for testing!")
 
+@main.cli.command('init-db')
+def init_db_command():
+    """Apply pending schema migrations."""
+    upgrade()
+
+@main.cli.command('seed')
+@click.option('--demo', is_flag=True, help='Also load 120 sample employees.')
+def seed_command(demo):
+    """Create the default accounts in an empty database."""
+    seed_database(demo=demo)
+
+@main.cli.command('seed-employees')
+@click.option('--rows', default=100000, show_default=True, help='Number of employees to generate.')
+@click.option('--seed', type=int, default=None, help='Random seed for a reproducible dataset.')
+@click.option('--chunk-size', default=10000, show_default=True, help='Rows per bulk INSERT.')
+@click.option('--span', default=10, show_default=True, help='Direct reports per manager (0 = no reporting lines).')
+def seed_employees_command(rows, seed, chunk_size, span):
+    """Bulk-load generated employees for load testing."""
+    created, elapsed = seed_employees(rows, seed=seed, chunk_size=chunk_size, span=span)
+    rate = created / elapsed if elapsed else float('inf')
+    click.echo(f"Inserted {created} employees in {elapsed:.2f}s ({rate:,.0f} rows/sec)")
+
+@main.cli.command('rebuild-department-stats')
+def rebuild_department_stats_command():
+    """Recompute the department summary table from the employee table."""
+    with db.engine.begin() as conn:
+        departments = rebuild_department_stats(conn)
+    invalidate_employee_caches()
+    click.echo(f"Rebuilt stats for {departments} departments")
+
+@main.cli.command('rebuild-org-chart')
+def rebuild_org_chart_command():
+    """Recompute the reporting-line closure table from manager_id."""
+    with db.engine.begin() as conn:
+        rows = rebuild_closure(conn)
+    invalidate_employee_caches()
+    click.echo(f"Rebuilt {rows} reporting-line rows")
+
 # -------- Authentication Routes --------
-@app.route('/login', methods=['GET', 'POST'])
+@main.route('/login', methods=['GET', 'POST'])
 def login():
-    print("Login route accessed")  # Debug print
     if request.method == 'POST':
-        print("POST request received")  # Debug print
         username = request.form['username']
         password = request.form['password']
-        print(f"Login attempt: {username}")  # Debug print
         
         user = User.query.filter_by(username=username).first()
         
-        if user and check_password_hash(user.password, password):
+        if user and password_hasher.verify(user.password, password):
+            # Upgrade hashes made with older cost parameters while we have the password
+            if password_hasher.needs_rehash(user.password):
+                user.password = password_hasher.hash(password)
+                db.session.commit()
             login_user(user)
             flash('Login successful!')
             next_page = request.args.get('next')
-            return redirect(next_page) if next_page else redirect(url_for('index'))
+            return redirect(next_page) if next_page else redirect(url_for('main.index'))
         else:
             flash('Invalid username or password!')
     
-    print("Rendering login template")  # Debug print
     return render_template('login.html')
 
-@app.route('/logout')
+@main.route('/logout')
 @login_required
 def logout():
     logout_user()
     flash('You have been logged out.')
-    return redirect(url_for('login'))
+    return redirect(url_for('main.login'))
 
 # -------- Routes --------
-@app.route('/test')
+@main.route('/test')
 def test():
     return "<h1>Test page works!</h1>"
 
-@app.route('/debug')
+@main.route('/debug')
 def debug():
     try:
         employees = Employee.query.all()
-        html = f"""
+        items = [f"<li>{emp.name} - {emp.department} - {emp.position} - ${emp.salary}</li>" for emp in employees]
+        return f"""
         <h1>Debug Page - No Login Required</h1>
         <p>Server is working!</p>
         <p>Employees found in database: {len(employees)}</p>
         <h3>Employee List:</h3>
         <ul>
-        """
-        for emp in employees:
-            html += f"<li>{emp.name} - {emp.department} - {emp.position} - ${emp.salary}</li>"
-        html += """
+        {''.join(items)}
         </ul>
         <p><a href='/login'>Go to Login Page</a></p>
         """
-        return html
     except Exception as e:
         return f"<h1>Debug Error:</h1><p>{str(e)}</p>"
 
-@app.route('/simple_login')
+@main.route('/simple_login')
 def simple_login():
     return render_template('simple_login.html')
 
-@app.route('/')
+@main.route('/')
 @login_required
+@cached_response
 def index():
-    print("Index route accessed")  # Debug print
-    start_time = time.time()
-    
+    listing = cached_fragment('index_listing', render_listing)
+    return render_template('index.html', listing=listing)
+
+def render_listing():
+    """Employee table, filters and summary cards of the dashboard."""
     # Get search parameters
     search = request.args.get('search', '')
     department_filter = request.args.get('department', '')
     page = request.args.get('page', 1, type=int)
+    # Keyset mode: ?after=<name,id> seeks instead of OFFSET (empty = first page)
+    after = request.args.get('after')
+    keyset = after is not None
     per_page = 10  # Show 10 employees per page for better performance
     
-    # Build query with optimizations
-    query = Employee.query
+    # Build query with optimizations; managers only see their own subtree
+    scope = scope_filter(current_user)
+    query = Employee.query if scope is None else Employee.query.filter(scope)
     
-    # Apply search filters
-    if search:
-        query = query.filter(
-            (Employee.name.contains(search)) |
-            (Employee.email.contains(search)) |
-            (Employee.position.contains(search))
-        )
-    
-    if department_filter:
-        query = query.filter(Employee.department == department_filter)
-    
-    # Order by name for consistent pagination
-    query = query.order_by(Employee.name)
-    
-    # Apply pagination
-    employees_paginated = query.paginate(
-        page=page, per_page=per_page, error_out=False
-    )
-    
-    # Get unique departments for filter dropdown
-    departments = db.session.query(Employee.department.distinct()).all()
-    departments = [dept[0] for dept in departments]
+    # Apply search filters (full-text index; ranked unless seeking by name)
+    query = filter_employees(query, search, department_filter, ranked=not keyset)
     
-    # Get total count for performance metrics
-    total_employees = Employee.query.count()
+    if keyset:
+        # Counting is a full scan of the filtered set, so it is opt-in
+        employees_paginated = keyset_paginate(
+            query, after, per_page=per_page,
+            with_count=request.args.get('count', 0, type=int) == 1
+        )
+    else:
+        # Order by name for consistent pagination
+        query = query.order_by(Employee.name, Employee.id)
+        
+        # Apply pagination
+        employees_paginated = query.paginate(
+            page=page, per_page=per_page, error_out=False
+        )
     
-    end_time = time.time()
-    query_time = end_time - start_time
+    # Department facets and headcount only change on employee writes
+    departments = department_facets() if scope is None else team_facets(current_user.employee_id)
+    total_employees = sum(headcount for _, headcount, _ in departments)
+    total_payroll = sum(payroll for _, _, payroll in departments)
     
-    print(f"Found {total_employees} total employees")  # Debug print
-    print(f"Showing page {page} with {len(employees_paginated.items)} employees")  # Debug print
-    print(f"Query execution time: {query_time:.3f} seconds")  # Performance metric
-    print("Current user:", current_user.username, "Role:", current_user.role)  # Debug print
+    # Time spent in SQL for this request, measured by the metrics engine hooks
+    query_time = g.get('sql_seconds', 0.0)
     
-    return render_template('index.html', 
+    return render_template('index_listing.html',
                          employees=employees_paginated,
                          search=search,
                          department_filter=department_filter,
                          departments=departments,
                          total_employees=total_employees,
+                         total_payroll=total_payroll,
                          query_time=query_time)
 
-@app.route('/add', methods=['GET', 'POST'])
+def department_facets():
+    """Return ``[(department, headcount, payroll), ...]`` sorted by department."""
+    # One row per department from the maintained summary, not a scan of employees
+    return cached_read(employee_cache, 'department_facets', department_summary)
+
+def team_facets(root_id):
+    """``department_facets()`` for ``root_id`` and everyone under it."""
+    if root_id is None:
+        return []
+    return cached_read(employee_cache, ('team_facets', root_id), lambda: team_summary(root_id))
+
+@main.route('/cache/stats')
+@login_required
+@role_required([Role.ADMIN.value])
+def cache_stats():
+    return employee_cache.get_stats()
+
+def parse_salary(form):
+    """The form's salary as a whole number, checked like imported and API salaries."""
+    return validate_row({'salary': form.get('salary')}, partial=True)['salary']
+
+@main.route('/add', methods=['GET', 'POST'])
 @login_required
 @permission_required('create')
 def add_employee():
@@ -327,42 +366,219 @@ def add_employee():
         email = request.form['email']
         department = request.form['department']
         position = request.form['position']
-        salary = request.form['salary']
-        new_employee = Employee(name=name, email=email, department=department, position=position, salary=salary)
-        db.session.add(new_employee)
-        db.session.commit()
+        try:
+            salary = parse_salary(request.form)
+            manager_id = parse_manager(request.form.get('manager_id'))
+            new_employee = Employee(name=name, email=email, department=department, position=position,
+                                    salary=salary, manager_id=manager_id)
+            db.session.add(new_employee)
+            db.session.commit()
+        except ValueError as e:
+            db.session.rollback()
+            flash(str(e), "error")
+            return render_template('add_employee.html')
+        invalidate_employee_caches()
         flash("Employee added successfully!")
-        return redirect(url_for('index'))
+        return redirect(url_for('main.index'))
     return render_template('add_employee.html')
 
-@app.route('/edit/<int:id>', methods=['GET', 'POST'])
+@main.route('/edit/<int:id>', methods=['GET', 'POST'])
 @login_required
 @permission_required('update')
 def edit_employee(id):
     employee = Employee.query.get_or_404(id)
+    # Managers edit the people under them, not themselves or anyone else
+    if not can_reach(current_user, id, include_root=False):
+        abort(403)
     if request.method == 'POST':
         employee.name = request.form['name']
         employee.email = request.form['email']
         employee.department = request.form['department']
         employee.position = request.form['position']
-        employee.salary = request.form['salary']
-        db.session.commit()
+        try:
+            employee.salary = parse_salary(request.form)
+            manager_id = parse_manager(request.form.get('manager_id'))
+            # Managers can only move people within their own team
+            if manager_id != employee.manager_id and is_scoped(current_user):
+                if manager_id is None or not can_reach(current_user, manager_id):
+                    raise ValueError("You can only move employees within your own team")
+            employee.manager_id = manager_id
+            db.session.commit()
+        except ValueError as e:
+            db.session.rollback()
+            flash(str(e), "error")
+            return render_template('edit_employee.html', employee=employee)
+        invalidate_employee_caches()
         flash("Employee updated successfully!")
-        return redirect(url_for('index'))
+        return redirect(url_for('main.index'))
     return render_template('edit_employee.html', employee=employee)
 
-@app.route('/delete/<int:id>')
+@main.route('/delete/<int:id>')
 @login_required
 @permission_required('delete')
 def delete_employee(id):
     employee = Employee.query.get_or_404(id)
     db.session.delete(employee)
     db.session.commit()
+    invalidate_employee_caches()
     flash("Employee deleted successfully!")
-    return redirect(url_for('index'))
+    return redirect(url_for('main.index'))
+
+def render_history(entity_type, entity_id, title, back_url):
+    page = request.args.get('page', 1, type=int)
+    # Include this worker's own recent changes that are still queued
+    audit_writer.flush(timeout=2)
+    entries = (AuditLog.query
+               .filter_by(entity_type=entity_type, entity_id=entity_id)
+               .order_by(AuditLog.id.desc())
+               .paginate(page=page, per_page=20, error_out=False))
+    return render_template('history.html', entries=entries, title=title, back_url=back_url)
+
+@main.route('/employees/<int:id>/history')
+@login_required
+def employee_history(id):
+    """Change history of an employee, including deleted ones - HR and Admin only"""
+    if not current_user.can_view_salaries():
+        abort(403)
+    employee = db.session.get(Employee, id)
+    title = employee.name if employee else f"Deleted employee #{id}"
+    return render_history('employee', id, title, url_for('main.index'))
+
+@main.route('/org')
+@main.route('/org/<int:id>')
+@login_required
+@permission_required('read')
+@cached_response
+def org_chart(id=None):
+    """One level of the reporting tree: an employee, the managers above and the direct reports"""
+    if id is None and is_scoped(current_user):
+        # Managers start at their own record and cannot browse above it
+        if current_user.employee_id is None:
+            abort(403)
+        id = current_user.employee_id
+    employee = None
+    if id is not None:
+        employee = db.get_or_404(Employee, id)
+        if not can_reach(current_user, id):
+            abort(403)
+    # Only the page of direct reports is loaded, never the whole tree
+    page = request.args.get('page', 1, type=int)
+    reports = (Employee.query
+               .filter(Employee.manager_id == id)
+               .order_by(Employee.name, Employee.id)
+               .paginate(page=page, per_page=50, error_out=False))
+    sizes = team_sizes([report.id for report in reports.items] + ([id] if employee else []))
+    chain = chain_of_command(id, current_user) if employee else []
+    return render_template('org_chart.html', employee=employee, chain=chain, reports=reports, sizes=sizes)
+
+@main.route('/employees/bulk', methods=['GET', 'POST'])
+@login_required
+@permission_required('update')
+def bulk_edit():
+    """Edit or delete a filtered selection of employees in one statement"""
+    form = request.form if request.method == 'POST' else request.args
+    search = form.get('search', '').strip()
+    department = form.get('department', '').strip()
+    action = form.get('action', 'update')
+    result = None
+    if request.method == 'POST':
+        if action == 'delete' and not current_user.has_permission('delete'):
+            abort(403)
+        if action == 'update' and form.get('salary_mode') and not current_user.can_view_salaries():
+            abort(403)
+        try:
+            selection = bulk_selection(search, department, parse_ids(form.get('ids', '')),
+                                       scope_filter(current_user, include_root=False))
+            changes = None
+            if action == 'update':
+                changes = bulk_changes(form.get('new_department', '').strip(),
+                                       form.get('new_position', '').strip(),
+                                       form.get('salary_mode', ''), form.get('salary_value', ''))
+            result = preview(selection, changes)
+            if 'apply' in form:
+                # Refuse if the selection changed since the preview the user confirmed
+                if form.get('expected', type=int) != result['count']:
+                    flash(f"The selection now matches {result['count']} employees; review and apply again.", "warning")
+                elif result['count']:
+                    if action == 'delete':
+                        count = bulk_delete(selection)
+                    else:
+                        count = bulk_update(selection, changes)
+                    db.session.commit()
+                    invalidate_employee_caches()
+                    flash(f"{'Deleted' if action == 'delete' else 'Updated'} {count} employees.", "success")
+                    return redirect(url_for('main.index'))
+        except ValueError as e:
+            db.session.rollback()
+            flash(str(e), "error")
+    return render_template('bulk_edit.html', form=form, action=action, result=result)
+
+@main.route('/employees/import', methods=['GET', 'POST'])
+@login_required
+def import_employees_view():
+    """Bulk import employees from CSV or NDJSON - HR and Admin only"""
+    if not current_user.can_create_employees():
+        abort(403)
+    
+    if request.method == 'GET':
+        return render_template('import_employees.html')
+    
+    # Multipart uploads are spooled to disk by Werkzeug; raw bodies are
+    # read straight from the socket. Either way rows are streamed.
+    upload = request.files.get('file')
+    if upload is not None:
+        stream = upload.stream
+        fmt = request.form.get('format') or detect_format(upload.filename, upload.content_type)
+    else:
+        stream = request.stream
+        fmt = request.args.get('format') or detect_format(content_type=request.content_type)
+    if fmt not in IMPORT_FORMATS:
+        abort(400)
+    
+    def generate():
+        for event in import_employees(stream, fmt):
+            yield json.dumps(event) + '\n'
+    
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+
+@main.route('/employees/export')
+@login_required
+@permission_required('read')
+def export_employees():
+    """Stream the (filtered) employee directory as CSV or NDJSON"""
+    fmt = request.args.get('format', 'csv')
+    if fmt not in EXPORT_FORMATS:
+        abort(400)
+    
+    query = filter_employees(
+        scope_query(Employee.query, current_user),
+        request.args.get('search', ''),
+        request.args.get('department', ''),
+        ranked=False
+    )
+    body = stream_export(query, fmt, include_salary=current_user.can_view_salaries())
+    response = Response(stream_with_context(body), mimetype=EXPORT_FORMATS[fmt])
+    response.headers['Content-Disposition'] = f'attachment; filename=employees.{fmt}'
+    return response
+
+@main.route('/analytics')
+@login_required
+def analytics():
+    if not current_user.can_view_salaries():
+        abort(403)
+    return render_template('analytics.html', stats=salary_analytics(), percentiles=PERCENTILES)
 
 # -------- User Account Management Routes --------
-@app.route('/users')
+def linked_employee_id(form):
+    """Employee record an account belongs to, from the optional form field."""
+    value = form.get('employee_id', '').strip()
+    if not value:
+        return None
+    if not value.isdigit() or db.session.get(Employee, int(value)) is None:
+        raise ValueError(f"No employee with ID '{value}'")
+    return int(value)
+
+@main.route('/users')
 @login_required
 def manage_users():
     """Show all user accounts - HR and Admin only"""
@@ -372,7 +588,7 @@ def manage_users():
     users = User.query.all()
     return render_template('manage_users.html', users=users)
 
-@app.route('/users/edit/<int:user_id>', methods=['GET', 'POST'])
+@main.route('/users/edit/<int:user_id>', methods=['GET', 'POST'])
 @login_required
 def edit_user_account(user_id):
     """Edit user account details - HR and Admin only"""
@@ -384,7 +600,7 @@ def edit_user_account(user_id):
     # HR users cannot edit Admin accounts - only Admin can edit Admin
     if user.role == Role.ADMIN.value and not current_user.can_manage_users():
         flash("Only Admins can edit Administrator accounts!", "error")
-        return redirect(url_for('manage_users'))
+        return redirect(url_for('main.manage_users'))
     
     if request.method == 'POST':
         new_username = request.form['username']
@@ -404,10 +620,17 @@ def edit_user_account(user_id):
             flash("Only Admins can assign Administrator role!", "error")
             return render_template('edit_user.html', user=user)
         
+        try:
+            employee_id = linked_employee_id(request.form)
+        except ValueError as e:
+            flash(str(e), "error")
+            return render_template('edit_user.html', user=user)
+        
         # Update user details
         user.username = new_username
         user.full_name = new_full_name
         user.email = new_email
+        user.employee_id = employee_id
         
         # Only Admin can change roles
         if current_user.can_manage_users():
@@ -415,17 +638,28 @@ def edit_user_account(user_id):
         
         # Update password if provided
         if new_password:
-            user.password = generate_password_hash(new_password)
+            user.password = password_hasher.hash(new_password)
             flash(f"Account updated successfully! New password set for {user.username}.", "success")
         else:
             flash(f"Account updated successfully for {user.username}!", "success")
         
         db.session.commit()
-        return redirect(url_for('manage_users'))
+        invalidate_user_cache()
+        return redirect(url_for('main.manage_users'))
     
     return render_template('edit_user.html', user=user)
 
-@app.route('/users/add', methods=['GET', 'POST'])
+@main.route('/users/<int:user_id>/history')
+@login_required
+def user_history(user_id):
+    """Change history of a user account - HR and Admin only"""
+    if not current_user.can_manage_accounts():
+        abort(403)
+    user = db.session.get(User, user_id)
+    title = user.username if user else f"Deleted account #{user_id}"
+    return render_history('user', user_id, title, url_for('main.manage_users'))
+
+@main.route('/users/add', methods=['GET', 'POST'])
 @login_required
 def add_user_account():
     """Add new user account - HR and Admin only"""
@@ -450,23 +684,31 @@ def add_user_account():
             flash("Only Admins can create Administrator accounts!", "error")
             return render_template('add_user.html')
         
+        try:
+            employee_id = linked_employee_id(request.form)
+        except ValueError as e:
+            flash(str(e), "error")
+            return render_template('add_user.html')
+        
         # Create new user
         new_user = User(
             username=username,
-            password=generate_password_hash(password),
+            password=password_hasher.hash(password),
             full_name=full_name,
             email=email,
-            role=role
+            role=role,
+            employee_id=employee_id
         )
         
         db.session.add(new_user)
         db.session.commit()
+        invalidate_user_cache()
         flash(f"New user account created successfully for {username}!", "success")
-        return redirect(url_for('manage_users'))
+        return redirect(url_for('main.manage_users'))
     
     return render_template('add_user.html')
 
-@app.route('/users/delete/<int:user_id>')
+@main.route('/users/delete/<int:user_id>')
 @login_required
 def delete_user_account(user_id):
     """Delete user account - Admin can delete anyone, HR can delete non-admin users"""
@@ -478,38 +720,81 @@ def delete_user_account(user_id):
     # Prevent deleting the current user
     if user.id == current_user.id:
         flash("You cannot delete your own account!", "error")
-        return redirect(url_for('manage_users'))
+        return redirect(url_for('main.manage_users'))
     
     # HR users cannot delete Admin accounts - only Admin can delete Admin
     if user.role == Role.ADMIN.value and not current_user.can_manage_users():
         flash("Only Admins can delete Administrator accounts!", "error")
-        return redirect(url_for('manage_users'))
+        return redirect(url_for('main.manage_users'))
     
     username = user.username
     user_role = user.role.title()
     db.session.delete(user)
     db.session.commit()
+    invalidate_user_cache()
     flash(f"{user_role} account '{username}' deleted successfully!", "success")
-    return redirect(url_for('manage_users'))
+    return redirect(url_for('main.manage_users'))
 
 # Error handlers
-@app.errorhandler(403)
+@main.app_errorhandler(403)
 def forbidden(error):
     flash("You don't have permission to access this resource!", "error")
-    return redirect(url_for('index'))
+    return redirect(url_for('main.index'))
 
-@app.errorhandler(404)
+@main.app_errorhandler(404)
 def not_found(error):
     flash("The requested page was not found!", "error")
-    return redirect(url_for('index'))
+    return redirect(url_for('main.index'))
+
+@main.app_errorhandler(HasherBusy)
+def hasher_busy(error):
+    db.session.rollback()
+    flash("The server is busy right now. Please try again in a moment.", "warning")
+    return redirect(request.url)
 
-@app.errorhandler(500)
+@main.app_errorhandler(500)
 def internal_error(error):
     db.session.rollback()
     flash("An internal error occurred. Please try again!", "error")
-    return redirect(url_for('index'))
+    return redirect(url_for('main.index'))
+
+def create_app(config=None):
+    """Build the application; ``config`` overrides settings from the environment.
+
+    Only settings and extension wiring happen here. The schema, the default
+    accounts and demo data are set up by the ``init-db`` and ``seed``
+    commands, never while a worker starts.
+    """
+    app = Flask(__name__)
+    configure(app)
+    app.config.update(config or {})
+    app.config.setdefault('SQLALCHEMY_ENGINE_OPTIONS', engine_options(app.config))
+
+    # Initialize Flask-Login
+    login_manager.init_app(app)
+
+    # Initialize db with app
+    db.init_app(app)
+    configure_engine(app)
+    replica_router.init_app(app)
+    employee_cache.init_app(app)
+    user_cache.init_app(app, ttl=app.config['USER_CACHE_TTL'])
+    page_cache.init_app(app)
+    password_hasher.init_app(app)
+    audit_writer.init_app(app)
+    prefix_index.init_app(app)
+    metrics.init_app(app)
+    app.register_blueprint(api)
+    app.register_blueprint(main)
+    return app
+
+# WSGI entry point: gunicorn app:app, flask --app app
+app = create_app()
 
 # Run server
 if __name__ == '__main__':
+    with app.app_context():
+        upgrade()
+        seed_database(demo=True)
     port = int(os.environ.get('PORT', 5000))
     app.run(host='0.0.0.0', port=port, debug=False)
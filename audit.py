@@ -0,0 +1,260 @@
+"""Change history of employees and user accounts in ``audit_log``.
+
+An ``after_flush`` listener records field-level diffs of every flushed
+``Employee`` and ``User`` (creates, edits, deletes, API batches) on the
+session; when the transaction commits they are handed to ``AuditWriter``,
+and a rollback discards them. Bulk paths that bypass the ORM (seeding, the
+importer) are not audited; other set-based writes queue their diffs
+through ``record_changes()``.
+
+The writer does not add an INSERT to the request. Entries go into a bounded
+in-memory queue that a background thread drains, writing up to
+``AUDIT_BATCH_SIZE`` entries per transaction at least every
+``AUDIT_FLUSH_INTERVAL`` seconds. When the queue is full the caller writes
+its entries itself, so a burst slows writers down instead of dropping
+history. ``flush()`` waits until everything queued so far is written; it
+runs at interpreter exit and from gunicorn's ``worker_exit`` hook, so
+entries are confirmed before a worker goes away.
+
+With ``AUDIT_ASYNC = False`` entries are written inline at commit, which is
+what tests and one-off scripts want.
+"""
+import atexit
+import json
+import logging
+import os
+import queue
+import threading
+import time
+from datetime import datetime
+
+from flask import has_request_context
+from flask_login import current_user
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import LoaderCallableStatus
+
+from models import db, Employee, User, AuditLog
+
+log = logging.getLogger('staffhub.audit')
+
+AUDITED = {Employee: 'employee', User: 'user'}
+# Recorded as changed, never with their values
+REDACTED = {'password'}
+_PENDING_KEY = 'audit_entries'
+_STOP = object()
+
+
+def _value(field, value):
+    return '[redacted]' if field in REDACTED and value is not None else value
+
+
+def _diff(state, action):
+    changes = {}
+    for attr in state.mapper.column_attrs:
+        field = attr.key
+        if action == 'create':
+            # Read from the instance dict; loading attributes mid-flush would emit SQL
+            value = state.dict.get(field)
+            if value is not None:
+                changes[field] = [None, value]
+        elif action == 'delete':
+            # Attributes never loaded before the delete are unknown; skip them
+            value = state.attrs[field].loaded_value
+            if value is not None and value is not LoaderCallableStatus.NO_VALUE:
+                changes[field] = [value, None]
+        else:
+            history = state.attrs[field].history
+            if history.has_changes():
+                old = history.deleted[0] if history.deleted else None
+                new = history.added[0] if history.added else None
+                if old != new:
+                    changes[field] = [old, new]
+    return changes
+
+
+def _actor():
+    if has_request_context() and current_user.is_authenticated:
+        return current_user.id, current_user.username
+    return None, None
+
+
+def record_changes(session, entity_type, changes):
+    """Queue ``[(entity_id, action, {field: [old, new]}), ...]`` on ``session``.
+
+    For set-based statements, which the flush listener does not see; the
+    entries are submitted when ``session`` commits, like flushed changes.
+    """
+    actor_id, actor_name = _actor()
+    now = datetime.utcnow()
+    session.info.setdefault(_PENDING_KEY, []).extend({
+        'entity_type': entity_type,
+        'entity_id': entity_id,
+        'action': action,
+        'changes': json.dumps({field: [_value(field, old), _value(field, new)]
+                               for field, (old, new) in fields.items()},
+                              default=str, sort_keys=True),
+        'actor_id': actor_id,
+        'actor_name': actor_name,
+        'created_at': now,
+    } for entity_id, action, fields in changes)
+
+
+@event.listens_for(db.session, 'after_flush')
+def capture_changes(session, flush_context):
+    for objects, action in ((session.new, 'create'), (session.dirty, 'update'),
+                            (session.deleted, 'delete')):
+        changes = {}
+        for obj in objects:
+            entity_type = AUDITED.get(type(obj))
+            if entity_type is None or (action == 'update' and obj in session.deleted):
+                continue
+            state = inspect(obj)
+            fields = _diff(state, action)
+            if fields or action != 'update':
+                entity_id = state.mapper.primary_key_from_instance(obj)[0]
+                changes.setdefault(entity_type, []).append((entity_id, action, fields))
+        for entity_type, entries in changes.items():
+            record_changes(session, entity_type, entries)
+
+
+@event.listens_for(db.session, 'after_commit')
+def submit_changes(session):
+    entries = session.info.pop(_PENDING_KEY, None)
+    if entries:
+        audit_writer.submit(entries)
+
+
+@event.listens_for(db.session, 'after_rollback')
+def discard_changes(session):
+    session.info.pop(_PENDING_KEY, None)
+
+
+class AuditWriter:
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._done = threading.Condition(self._lock)
+        self._queue = None
+        self._thread = None
+        self._pid = None
+        self._pending = 0
+        self._atexit = False
+        self.app = None
+        self.asynchronous = True
+        self.batch_size = 100
+        self.flush_interval = 1.0
+        self.queue_size = 10000
+        self.stats = {'written': 0, 'batches': 0, 'inline': 0, 'failed': 0}
+
+    def init_app(self, app):
+        self.app = app
+        self.asynchronous = app.config.get('AUDIT_ASYNC', self.asynchronous)
+        self.batch_size = app.config.get('AUDIT_BATCH_SIZE', self.batch_size)
+        self.flush_interval = app.config.get('AUDIT_FLUSH_INTERVAL', self.flush_interval)
+        self.queue_size = app.config.get('AUDIT_QUEUE_SIZE', self.queue_size)
+
+    def _started_queue(self):
+        # Started lazily and per process, so it is never inherited across a fork
+        with self._lock:
+            if self._thread is None or self._pid != os.getpid():
+                self._queue = queue.Queue(self.queue_size)
+                self._pending = 0
+                self._pid = os.getpid()
+                self._thread = threading.Thread(target=self._run, name='audit-writer', daemon=True)
+                self._thread.start()
+                if not self._atexit:
+                    atexit.register(self.shutdown)
+                    self._atexit = True
+            return self._queue
+
+    def submit(self, entries):
+        """Queue committed entries for the background writer."""
+        if not self.asynchronous:
+            self._write(entries)
+            return
+        pending = self._started_queue()
+        with self._lock:
+            self._pending += len(entries)
+        for index, entry in enumerate(entries):
+            try:
+                pending.put_nowait(entry)
+            except queue.Full:
+                # Back-pressure: this request pays for the write rather than losing it
+                rest = entries[index:]
+                with self._lock:
+                    self.stats['inline'] += len(rest)
+                self._write(rest)
+                self._settled(len(rest))
+                return
+
+    def _settled(self, count):
+        with self._done:
+            self._pending -= count
+            self._done.notify_all()
+
+    def _run(self):
+        pending = self._queue
+        while True:
+            batch = [pending.get()]
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size and batch[-1] is not _STOP:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(pending.get(timeout=timeout))
+                except queue.Empty:
+                    break
+            stop = batch[-1] is _STOP
+            entries = [entry for entry in batch if entry is not _STOP]
+            if entries:
+                self._write(entries)
+                self._settled(len(entries))
+            if stop:
+                return
+
+    def _write(self, entries, attempts=3):
+        for attempt in range(1, attempts + 1):
+            try:
+                with self.app.app_context():
+                    with db.engine.begin() as conn:
+                        conn.execute(AuditLog.__table__.insert(), entries)
+            except Exception:
+                if attempt < attempts:
+                    time.sleep(0.5 * attempt)
+                    continue
+                # Keep the entries recoverable from the log rather than lose them
+                log.exception("Could not write %d audit entries: %s", len(entries),
+                              json.dumps(entries, default=str))
+                with self._lock:
+                    self.stats['failed'] += len(entries)
+                return False
+            with self._lock:
+                self.stats['written'] += len(entries)
+                self.stats['batches'] += 1
+            return True
+
+    def flush(self, timeout=10):
+        """Wait until every entry queued so far is written. Returns False on timeout."""
+        if self._pid != os.getpid():
+            return True
+        with self._done:
+            return self._done.wait_for(lambda: self._pending <= 0, timeout)
+
+    def shutdown(self, timeout=10):
+        """Write what is queued and stop the background thread."""
+        with self._lock:
+            thread = self._thread if self._pid == os.getpid() else None
+            self._thread = None
+        if thread is None or not thread.is_alive():
+            return True
+        self._queue.put(_STOP)
+        thread.join(timeout)
+        if thread.is_alive():
+            log.error("Audit writer did not finish within %ss; %d entries unwritten",
+                      timeout, self._pending)
+            return False
+        return True
+
+
+audit_writer = AuditWriter()
@@ -0,0 +1,84 @@
+"""Login management and role/permission decorators.
+
+``load_user`` runs on every authenticated request, so it serves users from
+``user_cache`` instead of querying the database each time. Cached entries
+are plain column snapshots (never the password hash) rebuilt into detached
+``User`` objects; any change to a user account must call
+``invalidate_user_cache()`` after committing.
+
+With ``CACHE_SHARED_PATH`` set the invalidation reaches every worker at
+once. Without it, other worker processes keep serving a changed or deleted
+account as it was for up to ``USER_CACHE_TTL`` seconds, which is why that
+TTL is kept short.
+"""
+from functools import wraps
+
+from flask import abort, redirect, url_for
+from flask_login import LoginManager, current_user
+from sqlalchemy.orm import make_transient_to_detached
+
+from models import db, User, PERMISSION_NAMES
+from cache import user_cache
+from routing import from_primary
+
+login_manager = LoginManager()
+login_manager.login_view = 'main.login'
+login_manager.login_message = 'Please log in to access this page.'
+
+_SNAPSHOT_FIELDS = ('id', 'username', 'role', 'full_name', 'email', 'is_active', 'employee_id')
+
+
+def _snapshot(user_id):
+    user = db.session.get(User, user_id)
+    if user is None:
+        return None
+    return {field: getattr(user, field) for field in _SNAPSHOT_FIELDS}
+
+
+@login_manager.user_loader
+def load_user(user_id):
+    user_id = int(user_id)
+    snapshot = user_cache.get_or_compute(user_id, from_primary(lambda: _snapshot(user_id)))
+    if snapshot is None:
+        return None
+    user = User(**snapshot)
+    make_transient_to_detached(user)
+    return user
+
+
+def invalidate_user_cache():
+    """Call after committing any change to a user account."""
+    user_cache.invalidate()
+
+
+# Role-based decorators
+def role_required(roles):
+    """Decorator to require specific roles"""
+    allowed = frozenset(roles)
+
+    def decorator(f):
+        @wraps(f)
+        def decorated_function(*args, **kwargs):
+            if not current_user.is_authenticated:
+                return redirect(url_for('main.login'))
+            if current_user.role not in allowed:
+                abort(403)  # Forbidden
+            return f(*args, **kwargs)
+        return decorated_function
+    return decorator
+
+
+def permission_required(permission):
+    """Decorator to require specific permission"""
+    flag = PERMISSION_NAMES[permission]  # Unknown names fail at import time
+
+    def decorator(f):
+        @wraps(f)
+        def decorated_function(*args, **kwargs):
+            if not current_user.is_authenticated:
+                return redirect(url_for('main.login'))
+            if current_user.permissions & flag != flag:
+                abort(403)  # Forbidden
+            return f(*args, **kwargs)
+        return decorated_function
+    return decorator
@@ -0,0 +1,325 @@
+"""In-memory prefix index behind the search box's autocomplete.
+
+Every word of an employee's name, position and email (the part before the
+``@``; the domain is the same for everyone) is a token, as in the full-text
+index. A suggestion must match the start of a token with every word typed,
+like a search does. The index keeps:
+
+* the sorted vocabulary of distinct tokens, so the tokens starting with a
+  prefix are one ``bisect`` range;
+* per token, the sorted ids of the employees that have it (postings);
+* per employee, its token ids (forward index), packed in flat arrays, so
+  the other words of a query are checked without touching the database.
+
+A lookup walks the postings of the most selective word in vocabulary order
+and stops at ``limit`` matches, so it costs about the same at 500,000
+employees as at 1,000. Only the matched rows are then read, by primary key.
+
+The index is built in a background thread on first use; until it is ready,
+suggestions come from the database. ORM writes (add, edit, delete, API
+batches) are applied to it incrementally when they commit, and the cache
+invalidation that follows each of them is expected. Writes it did not
+see (bulk changes, imports, other workers with a shared cache store) show up
+as employee cache generations it cannot account for, and trigger a rebuild
+in the background, at most once per ``AUTOCOMPLETE_REBUILD_INTERVAL``
+seconds; the previous index keeps answering meanwhile.
+"""
+import logging
+import os
+import threading
+import time
+from array import array
+from bisect import bisect_left
+
+from sqlalchemy import event, inspect, select
+
+from models import db, Employee
+from cache import employee_cache
+from search import search_tokens
+
+log = logging.getLogger('staffhub.autocomplete')
+
+_PENDING_KEY = 'autocomplete_changes'
+_INDEXED = ('name', 'email', 'position')
+# Sorts after every character that can follow a prefix
+_HIGH = '\U0010ffff'
+
+
+def employee_tokens(name, email, position):
+    """Distinct tokens of one employee, in first-seen order."""
+    text = ' '.join((name or '', (email or '').split('@', 1)[0], position or ''))
+    return list(dict.fromkeys(search_tokens(text)))
+
+
+class _Index:
+    """The index data; read and changed only under ``PrefixIndex._lock``."""
+
+    def __init__(self):
+        self.words = []          # sorted vocabulary
+        self.word_ids = []       # stable id of each entry in ``words``
+        self.vocabulary = {}     # token -> stable id
+        self.postings = []       # stable id -> array of employee ids, ascending
+        self.starts = array('i')     # employee id -> offset into ``tokens`` (-1 = absent)
+        self.lengths = array('i')
+        self.tokens = array('i')
+        self.size = 0
+
+    def _word_id(self, token):
+        word_id = self.vocabulary.get(token)
+        if word_id is None:
+            word_id = len(self.postings)
+            self.vocabulary[token] = word_id
+            self.postings.append(array('i'))
+            position = bisect_left(self.words, token)
+            self.words.insert(position, token)
+            self.word_ids.insert(position, word_id)
+        return word_id
+
+    def _forward(self, employee_id):
+        if employee_id >= len(self.starts) or self.starts[employee_id] < 0:
+            return None
+        start = self.starts[employee_id]
+        return self.tokens[start:start + self.lengths[employee_id]]
+
+    def add(self, employee_id, name, email, position, ordered=False):
+        """Index an employee; ``ordered`` when ids arrive ascending (bulk build)."""
+        self.remove(employee_id)
+        word_ids = [self._word_id(token) for token in employee_tokens(name, email, position)]
+        for word_id in word_ids:
+            postings = self.postings[word_id]
+            if ordered or not postings or postings[-1] < employee_id:
+                postings.append(employee_id)
+            else:
+                postings.insert(bisect_left(postings, employee_id), employee_id)
+        if employee_id >= len(self.starts):
+            grow = employee_id + 1 - len(self.starts)
+            self.starts.extend([-1] * grow)
+            self.lengths.extend([0] * grow)
+        # Replaced entries stay behind in ``tokens`` until the next rebuild
+        self.starts[employee_id] = len(self.tokens)
+        self.lengths[employee_id] = len(word_ids)
+        self.tokens.extend(word_ids)
+        self.size += 1
+
+    def remove(self, employee_id):
+        word_ids = self._forward(employee_id)
+        if word_ids is None:
+            return
+        for word_id in word_ids:
+            postings = self.postings[word_id]
+            position = bisect_left(postings, employee_id)
+            if position < len(postings) and postings[position] == employee_id:
+                del postings[position]
+        self.starts[employee_id] = -1
+        self.size -= 1
+
+    def _range(self, prefix):
+        return bisect_left(self.words, prefix), bisect_left(self.words, prefix + _HIGH)
+
+    def search(self, query, limit, allowed=None):
+        """Ids of up to ``limit`` employees matching every word of ``query``."""
+        tokens = search_tokens(query)
+        if not tokens:
+            return []
+        ranges = []
+        for token in dict.fromkeys(tokens):
+            low, high = self._range(token)
+            if low == high:
+                return []
+            ranges.append((low, high))
+        # Walk the word with the fewest postings; check the others per employee
+        sizes = [sum(len(self.postings[self.word_ids[i]]) for i in range(low, high)) for low, high in ranges]
+        driver = sizes.index(min(sizes))
+        others = [{self.word_ids[i] for i in range(low, high)}
+                  for index, (low, high) in enumerate(ranges) if index != driver]
+
+        found = []
+        seen = set()
+        low, high = ranges[driver]
+        for i in range(low, high):
+            for employee_id in self.postings[self.word_ids[i]]:
+                if employee_id in seen:
+                    continue
+                seen.add(employee_id)
+                if allowed is not None and employee_id not in allowed:
+                    continue
+                if others:
+                    own = set(self._forward(employee_id))
+                    if not all(own & other for other in others):
+                        continue
+                found.append(employee_id)
+                if len(found) >= limit:
+                    return found
+        return found
+
+
+class PrefixIndex:
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._index = None
+        self._generation = None
+        # Committed local changes whose cache invalidation may not have happened yet
+        self._absorbed = 0
+        self._replay = None
+        self._thread = None
+        self._pid = None
+        self._last_build = 0.0
+        self.app = None
+        self.rebuild_interval = 30.0
+        self.stats = {'builds': 0, 'updates': 0, 'lookups': 0, 'fallbacks': 0}
+
+    def init_app(self, app):
+        self.app = app
+        self.rebuild_interval = app.config.get('AUTOCOMPLETE_REBUILD_INTERVAL', self.rebuild_interval)
+
+    @property
+    def size(self):
+        index = self._index
+        return index.size if index is not None else 0
+
+    def _build(self, generation):
+        index = _Index()
+        with self.app.app_context():
+            rows = db.session.execute(
+                select(Employee.id, Employee.name, Employee.email, Employee.position)
+                .order_by(Employee.id)
+                .execution_options(yield_per=10000)
+            )
+            for row in rows:
+                index.add(*row, ordered=True)
+            db.session.remove()
+        return index
+
+    def _run_build(self, generation):
+        started = time.perf_counter()
+        try:
+            index = self._build(generation)
+        except Exception:
+            log.exception("Could not build the autocomplete index")
+            with self._lock:
+                self._replay = None
+                self._thread = None
+            return
+        with self._lock:
+            replay, self._replay = self._replay or [], None
+            # Changes committed while the rows were read; applying them again is harmless
+            for changes in replay:
+                self._apply(index, changes)
+            self._index = index
+            self._generation = generation
+            self._absorbed = len(replay)
+            self._thread = None
+            self.stats['builds'] += 1
+        log.info("Autocomplete index built: %d employees in %.2fs", index.size, time.perf_counter() - started)
+
+    def _maybe_rebuild(self, generation):
+        """Start a background build unless one is running or ran too recently."""
+        if self._thread is not None and self._pid == os.getpid():
+            return
+        if self._index is not None and time.monotonic() - self._last_build < self.rebuild_interval:
+            return
+        self._last_build = time.monotonic()
+        self._pid = os.getpid()
+        self._replay = []
+        self._thread = threading.Thread(target=self._run_build, args=(generation,),
+                                        name='autocomplete-build', daemon=True)
+        self._thread.start()
+
+    def _current(self):
+        """The index to answer from, or None while the first build runs."""
+        generation = employee_cache.generation
+        with self._lock:
+            if self._pid is not None and self._pid != os.getpid():
+                # Inherited across a fork: the build thread did not come along
+                self._index, self._thread, self._generation = None, None, None
+            if self._index is not None and generation != self._generation:
+                if generation - self._generation == self._absorbed:
+                    # Every invalidation since the build is a change already applied here
+                    self._generation, self._absorbed = generation, 0
+                elif generation - self._generation > self._absorbed:
+                    self._maybe_rebuild(generation)
+            elif self._index is None:
+                self._maybe_rebuild(generation)
+            return self._index
+
+    def wait_ready(self, timeout=60):
+        """Build the index now (if needed) and wait for it; for scripts and benchmarks."""
+        self._current()
+        thread = self._thread
+        if thread is not None:
+            thread.join(timeout)
+        return self._index is not None
+
+    def search(self, query, limit=10, allowed=None):
+        """Ids of up to ``limit`` matching employees, or None while the index is building."""
+        index = self._current()
+        if index is None:
+            with self._lock:
+                self.stats['fallbacks'] += 1
+            return None
+        with self._lock:
+            self.stats['lookups'] += 1
+            return index.search(query, limit, allowed)
+
+    @staticmethod
+    def _apply(index, changes):
+        for employee_id, values in changes:
+            if values is None:
+                index.remove(employee_id)
+            else:
+                index.add(employee_id, *values)
+
+    def apply(self, changes):
+        """Apply ``[(employee_id, (name, email, position) or None), ...]`` committed locally.
+
+        Called once per committed transaction that wrote employees, with an
+        empty list when no indexed field changed.
+        """
+        with self._lock:
+            if self._index is None:
+                return
+            self._apply(self._index, changes)
+            self._absorbed += 1
+            if self._replay is not None:
+                self._replay.append(changes)
+            self.stats['updates'] += 1
+
+
+prefix_index = PrefixIndex()
+
+
+@event.listens_for(db.session, 'after_flush')
+def capture_index_changes(session, flush_context):
+    # Any employee write is followed by a cache invalidation, even one that
+    # changes no indexed field; it is recorded so that one is accounted for
+    touched = False
+    changes = []
+    for obj in session.new:
+        if isinstance(obj, Employee):
+            touched = True
+            changes.append((obj.id, tuple(getattr(obj, field) for field in _INDEXED)))
+    for obj in session.dirty:
+        if isinstance(obj, Employee) and obj not in session.deleted and session.is_modified(obj):
+            touched = True
+            attrs = inspect(obj).attrs
+            if any(getattr(attrs, field).history.has_changes() for field in _INDEXED):
+                changes.append((obj.id, tuple(getattr(obj, field) for field in _INDEXED)))
+    for obj in session.deleted:
+        if isinstance(obj, Employee):
+            touched = True
+            changes.append((inspect(obj).identity[0], None))
+    if touched:
+        session.info.setdefault(_PENDING_KEY, []).extend(changes)
+
+
+@event.listens_for(db.session, 'after_commit')
+def apply_index_changes(session):
+    changes = session.info.pop(_PENDING_KEY, None)
+    if changes is not None:
+        prefix_index.apply(changes)
+
+
+@event.listens_for(db.session, 'after_rollback')
+def discard_index_changes(session):
+    session.info.pop(_PENDING_KEY, None)
@@ -0,0 +1,75 @@
+"""Salary analytics: per-row Python vs SQL GROUP BY plus vectorized percentiles.
+
+Seeds a throwaway SQLite database and times three ways of producing the
+department and position statistics: loading every ``Employee`` and
+crunching in Python (what ``/debug`` style code does), the ``analytics``
+module uncached, and the cached ``salary_analytics()`` hit.
+
+Usage:
+    python benchmarks/analytics_benchmark.py --rows 1000000 --repeat 3
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+_tmp = tempfile.TemporaryDirectory()
+os.environ.setdefault('DATABASE_URL', f"sqlite:///{os.path.join(_tmp.name, 'bench.db')}")
+os.environ.setdefault('PASSWORD_HASH_WORKERS', '0')
+
+import app as staffhub  # noqa: E402
+import analytics  # noqa: E402
+from models import db, Employee  # noqa: E402
+from seeding import seed_employees  # noqa: E402
+
+
+def per_row_python():
+    groups = {}
+    for employee in Employee.query.all():
+        groups.setdefault(('department', employee.department), []).append(employee.salary)
+        groups.setdefault(('position', employee.position), []).append(employee.salary)
+    result = {}
+    for key, salaries in groups.items():
+        cuts = statistics.quantiles(salaries, n=100, method='inclusive') if len(salaries) > 1 else salaries * 99
+        result[key] = (len(salaries), statistics.fmean(salaries), min(salaries), max(salaries),
+                       [cuts[pct - 1] for pct in analytics.PERCENTILES])
+    db.session.expunge_all()
+    return result
+
+
+def best_of(fn, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=1000000)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--skip-per-row', action='store_true', help='Skip the slow per-row baseline')
+    args = parser.parse_args()
+
+    with staffhub.app.app_context():
+        staffhub.upgrade()
+        written, seconds = seed_employees(args.rows, seed=42)
+        print(f"Seeded {written:,} employees in {seconds:.1f}s "
+              f"(percentiles via {'NumPy' if analytics.numpy_module() is not None else 'plain Python'})")
+
+        if not args.skip_per_row:
+            print(f"{'per-row Python':<22} {best_of(per_row_python, args.repeat) * 1000:9.1f} ms")
+        print(f"{'SQL + vectorized':<22} "
+              f"{best_of(analytics.compute_salary_analytics, args.repeat) * 1000:9.1f} ms")
+        analytics.salary_analytics()
+        print(f"{'cached':<22} {best_of(analytics.salary_analytics, args.repeat) * 1000:9.1f} ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,116 @@
+"""Per-keystroke latency of the search box autocomplete at a given dataset size.
+
+Seeds a throwaway SQLite database (``init-db``, ``seed`` and
+``seed-employees``), builds the prefix index and replays people typing
+employee names one character at a time, measuring:
+
+index       ``prefix_index.search()`` alone, the in-memory lookup
+endpoint    ``GET /api/v1/employees/autocomplete`` through the test client:
+            lookup, primary-key read of the matches and JSON
+update      applying one committed edit to the index
+
+Also reports the time and memory (peak RSS growth) to build the index.
+Exits non-zero when the p95 of the index lookup exceeds ``--budget-ms``.
+
+Usage:
+    python benchmarks/autocomplete_benchmark.py --rows 500000 --typists 200
+"""
+import argparse
+import os
+import random
+import resource
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from load_test import ROOT  # noqa: E402
+from route_benchmark import bench_env, prepare  # noqa: E402
+
+
+def keystrokes(names):
+    """Every prefix of every name, as typed: ``j``, ``jo``, ..., ``john s``, ..."""
+    for name in names:
+        for end in range(1, len(name) + 1):
+            if not name[end - 1].isspace():
+                yield name[:end]
+
+
+def report(label, samples):
+    samples_ms = sorted(sample * 1000 for sample in samples)
+    p95 = samples_ms[int(len(samples_ms) * 0.95) - 1]
+    p99 = samples_ms[int(len(samples_ms) * 0.99) - 1]
+    print(f"{label:<10} p50 {statistics.median(samples_ms):7.3f} ms   p95 {p95:7.3f} ms   "
+          f"p99 {p99:7.3f} ms   max {samples_ms[-1]:7.3f} ms   ({len(samples_ms)} samples)")
+    return p95
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=500000)
+    parser.add_argument('--typists', type=int, default=200, help="Names typed out in full.")
+    parser.add_argument('--limit', type=int, default=10)
+    parser.add_argument('--budget-ms', type=float, default=5.0)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        print(f"Seeding {args.rows} employees...")
+        database = prepare(args.rows, tmp)
+        os.environ.update(bench_env(database, PASSWORD_HASH_WORKERS='0', AUDIT_ASYNC='0'))
+        sys.path.insert(0, ROOT)
+        import app as staffhub
+        from autocomplete import prefix_index
+        from models import db, Employee
+
+        app = staffhub.app
+        rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        start = time.perf_counter()
+        assert prefix_index.wait_ready(timeout=600), "index build failed"
+        grown = (resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - rss) / 1024
+        print(f"Index built: {prefix_index.size} employees in {time.perf_counter() - start:.2f}s, "
+              f"peak RSS +{grown:.0f} MB")
+
+        rng = random.Random(1)
+        with app.app_context():
+            ids = rng.sample(range(1, args.rows + 1), args.typists)
+            names = [name.lower() for name in
+                     db.session.scalars(db.select(Employee.name).where(Employee.id.in_(ids)))]
+        typed = list(keystrokes(names))
+
+        lookups = []
+        for text in typed:
+            start = time.perf_counter()
+            prefix_index.search(text, args.limit)
+            lookups.append(time.perf_counter() - start)
+
+        client = app.test_client()
+        client.post('/login', data={'username': 'HR', 'password': 'hr123'})
+        requests, empty = [], 0
+        for text in typed:
+            start = time.perf_counter()
+            response = client.get('/api/v1/employees/autocomplete', query_string={'q': text, 'limit': args.limit})
+            requests.append(time.perf_counter() - start)
+            assert response.status_code == 200, response.status_code
+            empty += not response.json['items']
+
+        updates = []
+        for employee_id in ids[:50]:
+            changes = [(employee_id, (f'Typeahead Probe {employee_id}', f'probe.{employee_id}@staffhub.com', 'Benchmark'))]
+            start = time.perf_counter()
+            prefix_index.apply(changes)
+            updates.append(time.perf_counter() - start)
+
+        p95 = report('index', lookups)
+        report('endpoint', requests)
+        report('update', updates)
+        if empty:
+            print(f"{empty} keystrokes returned no suggestions")
+        if p95 > args.budget_ms:
+            print(f"Index lookup p95 {p95:.3f} ms is over the {args.budget_ms} ms budget")
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,171 @@
+"""Throughput of the production gunicorn profile vs plain ``gunicorn app:app``.
+
+Prepares a throwaway SQLite database, then for each profile starts
+gunicorn on a local port and drives it from concurrent keep-alive clients
+for a fixed time. Each client logs in once and then requests a mix of the
+dashboard, a search, a keyset page and the JSON API, with a share of API
+writes and of slow full CSV exports. Reports requests/s, latency
+percentiles of the fast requests (everything but exports) and errors.
+
+Extra processes only add throughput with extra CPU cores; on a single core
+the profiles differ mainly in how much one slow request delays the rest.
+
+Profiles:
+    baseline  plain ``gunicorn app:app`` (one sync worker) with SQLite WAL off
+    tuned     ``gunicorn -c gunicorn.conf.py app:app``
+
+Usage:
+    python benchmarks/load_test.py --rows 20000 --clients 16 --duration 20
+"""
+import argparse
+import http.client
+import json
+import os
+import random
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from urllib.parse import urlencode
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+READS = ['/', '/?search=smith', '/?after=', '/?department=Engineering',
+         '/api/v1/employees?limit=50']
+EXPORT = '/employees/export?format=csv'
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def wait_for(port, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            with socket.create_connection(('127.0.0.1', port), timeout=1):
+                return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError(f"gunicorn did not start on port {port}")
+
+
+def login(port):
+    conn = http.client.HTTPConnection('127.0.0.1', port, timeout=60)
+    conn.request('POST', '/login', urlencode({'username': 'HR', 'password': 'hr123'}),
+                 {'Content-Type': 'application/x-www-form-urlencoded'})
+    response = conn.getresponse()
+    response.read()
+    cookie = response.getheader('Set-Cookie', '').split(';', 1)[0]
+    if response.status != 302 or not cookie:
+        raise RuntimeError(f"Login failed with status {response.status}")
+    return conn, cookie
+
+
+def client(port, duration, write_ratio, export_ratio, max_id, results, lock, barrier):
+    rng = random.Random()
+    conn, cookie = login(port)
+    latencies = []
+    requests = 0
+    errors = 0
+    barrier.wait()
+    deadline = time.perf_counter() + duration
+    while time.perf_counter() < deadline:
+        headers = {'Cookie': cookie}
+        roll = rng.random()
+        if roll < export_ratio:
+            args = ('GET', EXPORT, None)
+        elif roll < export_ratio + write_ratio:
+            body = json.dumps([{'id': rng.randint(1, max_id), 'salary': rng.randint(40000, 150000)}])
+            args = ('PATCH', '/api/v1/employees', body)
+            headers['Content-Type'] = 'application/json'
+        else:
+            args = ('GET', rng.choice(READS), None)
+        start = time.perf_counter()
+        try:
+            conn.request(*args, headers=headers)
+            response = conn.getresponse()
+            response.read()
+            if response.status >= 400:
+                errors += 1
+        except (OSError, http.client.HTTPException):
+            errors += 1
+            conn.close()
+            conn = http.client.HTTPConnection('127.0.0.1', port, timeout=60)
+        requests += 1
+        if args[1] != EXPORT:
+            latencies.append(time.perf_counter() - start)
+    conn.close()
+    with lock:
+        results['latencies'].extend(latencies)
+        results['requests'] += requests
+        results['errors'] += errors
+
+
+def run_profile(name, args, database, env):
+    port = free_port()
+    command = [sys.executable, '-m', 'gunicorn', '-b', f'127.0.0.1:{port}']
+    if name == 'tuned':
+        command += ['-c', os.path.join(ROOT, 'gunicorn.conf.py')]
+    else:
+        # An empty config file, so gunicorn does not pick up gunicorn.conf.py
+        command += ['-c', os.devnull]
+    command.append('app:app')
+    profile_env = dict(env, DATABASE_URL=f'sqlite:///{database}')
+    if name == 'baseline':
+        profile_env['SQLITE_WAL'] = '0'
+    server = subprocess.Popen(command, cwd=ROOT, env=profile_env,
+                              stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        wait_for(port)
+        results = {'latencies': [], 'requests': 0, 'errors': 0}
+        lock = threading.Lock()
+        barrier = threading.Barrier(args.clients)
+        threads = [threading.Thread(target=client, args=(port, args.duration, args.write_ratio,
+                                                         args.export_ratio, args.rows,
+                                                         results, lock, barrier))
+                   for _ in range(args.clients)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    finally:
+        server.terminate()
+        server.wait()
+
+    latencies = sorted(results['latencies'])
+    pct = lambda p: latencies[min(len(latencies) - 1, int(len(latencies) * p / 100))] * 1000
+    print(f"{name:<9} {results['requests'] / args.duration:8.1f} req/s   p50 {pct(50):7.1f} ms   "
+          f"p95 {pct(95):7.1f} ms   p99 {pct(99):7.1f} ms   errors {results['errors']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=20000)
+    parser.add_argument('--clients', type=int, default=16)
+    parser.add_argument('--duration', type=float, default=20, help='Seconds per profile')
+    parser.add_argument('--write-ratio', type=float, default=0.05)
+    parser.add_argument('--export-ratio', type=float, default=0.01)
+    parser.add_argument('--profiles', default='baseline,tuned')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        template = os.path.join(tmp, 'template.db')
+        env = dict(os.environ, DATABASE_URL=f'sqlite:///{template}', SQLITE_WAL='0',
+                   PASSWORD_HASH_METHOD='pbkdf2:sha256:50000')
+        for flask_args in (['init-db'], ['seed'], ['seed-employees', '--rows', str(args.rows), '--seed', '1']):
+            subprocess.run([sys.executable, '-m', 'flask', '--app', 'app', *flask_args],
+                           cwd=ROOT, env=env, check=True, stdout=subprocess.DEVNULL)
+        for name in args.profiles.split(','):
+            # Each profile starts from an identical copy of the data
+            database = os.path.join(tmp, f'{name}.db')
+            shutil.copy(template, database)
+            run_profile(name, args, database, env)
+
+
+if __name__ == '__main__':
+    main()
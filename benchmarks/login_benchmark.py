@@ -0,0 +1,93 @@
+"""Login latency under concurrent load: inline hashing vs the process pool.
+
+Runs concurrent logins through the Flask test client while a second set of
+threads keeps requesting a cheap page, and reports p50/p95/p99 for both, so
+the effect of hashing on unrelated requests is visible too.
+
+Usage:
+    python benchmarks/login_benchmark.py --concurrency 16 --logins 10 --workers 4
+"""
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+_tmp = tempfile.TemporaryDirectory()
+os.environ.setdefault('DATABASE_URL', f"sqlite:///{os.path.join(_tmp.name, 'bench.db')}")
+os.environ.setdefault('PASSWORD_HASH_WORKERS', '0')
+
+import app as staffhub  # noqa: E402
+from passwords import password_hasher  # noqa: E402
+
+
+def percentile(samples, pct):
+    samples = sorted(samples)
+    return samples[min(len(samples) - 1, int(len(samples) * pct / 100))] * 1000
+
+
+def run(concurrency, logins):
+    login_times = []
+    page_times = []
+    lock = threading.Lock()
+    done = threading.Event()
+
+    def login_worker():
+        client = staffhub.app.test_client()
+        for _ in range(logins):
+            start = time.perf_counter()
+            response = client.post('/login', data={'username': 'HR', 'password': 'hr123'})
+            elapsed = time.perf_counter() - start
+            assert response.status_code == 302, response.status_code
+            with lock:
+                login_times.append(elapsed)
+
+    def page_worker():
+        client = staffhub.app.test_client()
+        while not done.is_set():
+            start = time.perf_counter()
+            client.get('/test')
+            with lock:
+                page_times.append(time.perf_counter() - start)
+
+    loggers = [threading.Thread(target=login_worker) for _ in range(concurrency)]
+    pagers = [threading.Thread(target=page_worker) for _ in range(max(1, concurrency // 4))]
+    start = time.perf_counter()
+    for thread in loggers + pagers:
+        thread.start()
+    for thread in loggers:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    done.set()
+    for thread in pagers:
+        thread.join()
+    return login_times, page_times, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--logins', type=int, default=10, help='Logins per concurrent client')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 2, help='Process pool size to compare with inline')
+    parser.add_argument('--method', default=staffhub.app.config['PASSWORD_HASH_METHOD'])
+    args = parser.parse_args()
+
+    with staffhub.app.app_context():
+        staffhub.upgrade()
+        staffhub.seed_database()
+
+    for label, workers in (('inline', 0), (f'pool x{args.workers}', args.workers)):
+        password_hasher.configure(args.method, workers)
+        login_times, page_times, elapsed = run(args.concurrency, args.logins)
+        print(f"{label:<10} logins/s {len(login_times) / elapsed:7.1f}   "
+              f"login p50 {percentile(login_times, 50):7.1f} ms  p95 {percentile(login_times, 95):7.1f} ms  "
+              f"p99 {percentile(login_times, 99):7.1f} ms   "
+              f"other pages p99 {percentile(page_times, 99):7.1f} ms")
+    password_hasher.shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,330 @@
+"""Latency of every main route at several dataset sizes, saved as JSON.
+
+For each size, seeds a throwaway SQLite database (``init-db``, ``seed``
+and ``seed-employees``) and measures the same scenarios two ways:
+
+testclient  sequential requests through the Flask test client, in a child
+            process per size; reports p50/p95/p99 and SQL statements per
+            request (from the metrics hooks)
+http        concurrent keep-alive clients against ``gunicorn -c
+            gunicorn.conf.py`` for ``--duration`` seconds per scenario;
+            reports requests/s and p50/p95/p99
+
+Dashboard scenarios run with the page cache emptied before every request,
+so they measure the queries (over HTTP, a unique query argument misses the
+page cache instead); ``index cached`` is the same page served from cache.
+Results go to ``--output`` with the run's environment, and ``--compare``
+prints the p95 change against an earlier file, flagging
+regressions beyond ``--threshold`` percent.
+
+Users are seeded with a cheaper password hash (``PASSWORD_HASH_METHOD``
+overrides it), so ``login`` measures the app around the hash.
+
+Usage:
+    python benchmarks/route_benchmark.py --sizes 1000,100000,1000000 --output before.json
+    python benchmarks/route_benchmark.py --sizes 1000,100000 --compare before.json
+"""
+import argparse
+import http.client
+import itertools
+import json
+import os
+import platform
+import random
+import shutil
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timezone
+from urllib.parse import urlencode
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from load_test import ROOT, free_port, wait_for  # noqa: E402
+
+PASSWORD_HASH_METHOD = 'pbkdf2:sha256:50000'
+
+
+def scenarios(rows):
+    """``[(name, method, path, kind), ...]``; ``kind`` picks the request body."""
+    last_page = max(1, -(-rows // 10))
+    return [
+        ('login', 'POST', '/login', 'login'),
+        ('index', 'GET', '/', 'cold'),
+        ('index cached', 'GET', '/', 'warm'),
+        ('index search', 'GET', '/?search=smith', 'cold'),
+        ('index department', 'GET', '/?department=Engineering', 'cold'),
+        ('index search+department', 'GET', '/?search=smith&department=Engineering', 'cold'),
+        ('index deep page', 'GET', f'/?page={last_page}', 'cold'),
+        ('index keyset', 'GET', '/?after=', 'cold'),
+        ('add_employee', 'POST', '/add', 'add'),
+        ('edit_employee', 'POST', '/edit/{id}', 'edit'),
+        ('manage_users', 'GET', '/users', 'warm'),
+    ]
+
+
+def form_body(kind, rng, rows, counter):
+    if kind == 'login':
+        return {'username': 'HR', 'password': 'hr123'}
+    if kind in ('add', 'edit'):
+        n = next(counter)
+        return {'name': f'Bench Person {n}', 'email': f'bench{n}.{rng.random():.9f}@example.com',
+                'department': rng.choice(['Engineering', 'Sales', 'Finance']),
+                'position': 'Analyst', 'salary': str(rng.randint(40000, 150000))}
+    return None
+
+
+def percentiles(samples):
+    samples = sorted(samples)
+    if not samples:
+        return {}
+    pick = lambda p: round(samples[min(len(samples) - 1, int(len(samples) * p / 100))] * 1000, 2)
+    return {'p50_ms': pick(50), 'p95_ms': pick(95), 'p99_ms': pick(99),
+            'mean_ms': round(sum(samples) / len(samples) * 1000, 2)}
+
+
+def bench_env(database, **extra):
+    env = dict(os.environ, DATABASE_URL=f'sqlite:///{database}', **extra)
+    # The same method at seeding and login, or every login would re-hash
+    env.setdefault('PASSWORD_HASH_METHOD', PASSWORD_HASH_METHOD)
+    return env
+
+
+def prepare(rows, directory):
+    """Seed a database with ``rows`` employees; returns its path."""
+    database = os.path.join(directory, f'employees-{rows}.db')
+    # Without WAL the file is complete on its own and can be copied as is
+    env = bench_env(database, PASSWORD_HASH_WORKERS='0', SQLITE_WAL='0')
+    for flask_args in (['init-db'], ['seed'], ['seed-employees', '--rows', str(rows), '--seed', '1']):
+        subprocess.run([sys.executable, '-m', 'flask', '--app', 'app', *flask_args],
+                       cwd=ROOT, env=env, check=True, stdout=subprocess.DEVNULL)
+    return database
+
+
+# -------- Test client (runs in a child process, see run_testclient) --------
+
+def testclient_main(rows, repeat):
+    sys.path.insert(0, ROOT)
+    from flask import g, request_finished
+    import app as staffhub
+    from cache import invalidate_employee_caches
+
+    app = staffhub.app
+    queries = []
+    # Strong reference: blinker would drop a weakly held lambda right away
+    request_finished.connect(lambda sender, response, **extra: queries.append(g.get('sql_queries', 0)),
+                             app, weak=False)
+
+    def logged_in():
+        client = app.test_client()
+        response = client.post('/login', data={'username': 'HR', 'password': 'hr123'})
+        assert response.status_code == 302, response.status_code
+        # Render once so the login flash does not bypass the page cache below
+        client.get('/users')
+        return client
+
+    rng = random.Random(1)
+    counter = itertools.count()
+    results = []
+    for name, method, path, kind in scenarios(rows):
+        client = app.test_client() if kind == 'login' else logged_in()
+        if kind == 'warm':
+            client.open(path, method=method)
+        latencies, statements, errors = [], [], 0
+        for _ in range(repeat):
+            if kind == 'cold':
+                invalidate_employee_caches()
+            url = path.format(id=rng.randint(1, rows))
+            queries.clear()
+            start = time.perf_counter()
+            response = client.open(url, method=method, data=form_body(kind, rng, rows, counter))
+            latencies.append(time.perf_counter() - start)
+            statements.extend(queries)
+            if response.status_code >= 400:
+                errors += 1
+        results.append({
+            'scenario': name, 'method': method, 'path': path, 'requests': repeat, 'errors': errors,
+            'queries_per_request': round(sum(statements) / len(statements), 2) if statements else None,
+            **percentiles(latencies),
+        })
+    json.dump(results, sys.stdout)
+
+
+def run_testclient(database, rows, repeat):
+    env = bench_env(database, PASSWORD_HASH_WORKERS='0', AUDIT_ASYNC='0')
+    output = subprocess.run([sys.executable, __file__, '--testclient-child', str(rows), '--repeat', str(repeat)],
+                            cwd=ROOT, env=env, check=True, capture_output=True, text=True).stdout
+    return json.loads(output)
+
+
+# -------- Concurrent HTTP load --------
+
+def http_login(port):
+    conn = http.client.HTTPConnection('127.0.0.1', port, timeout=60)
+    conn.request('POST', '/login', urlencode({'username': 'HR', 'password': 'hr123'}),
+                 {'Content-Type': 'application/x-www-form-urlencoded'})
+    response = conn.getresponse()
+    response.read()
+    return conn, response.getheader('Set-Cookie', '').split(';', 1)[0]
+
+
+def http_client(port, scenario, rows, duration, counter, results, lock, barrier):
+    name, method, path, kind = scenario
+    rng = random.Random()
+    conn, cookie = http_login(port)
+    latencies, errors = [], 0
+    barrier.wait()
+    deadline = time.perf_counter() + duration
+    while time.perf_counter() < deadline:
+        body = form_body(kind, rng, rows, counter)
+        headers = {'Content-Type': 'application/x-www-form-urlencoded'} if body else {}
+        if kind != 'login':
+            headers['Cookie'] = cookie
+        url = path.format(id=rng.randint(1, rows))
+        if kind == 'cold':
+            # The page cache is keyed by query arguments; an unused one misses it
+            url += ('&' if '?' in url else '?') + f'nocache={next(counter)}'
+        start = time.perf_counter()
+        try:
+            conn.request(method, url,
+                         urlencode(body) if body else None, headers)
+            response = conn.getresponse()
+            response.read()
+            if response.status >= 400:
+                errors += 1
+        except (OSError, http.client.HTTPException):
+            errors += 1
+            conn.close()
+            conn = http.client.HTTPConnection('127.0.0.1', port, timeout=60)
+        latencies.append(time.perf_counter() - start)
+    conn.close()
+    with lock:
+        results['latencies'].extend(latencies)
+        results['errors'] += errors
+
+
+def run_http(database, rows, clients, duration):
+    port = free_port()
+    env = bench_env(database)
+    server = subprocess.Popen([sys.executable, '-m', 'gunicorn', '-b', f'127.0.0.1:{port}',
+                               '-c', os.path.join(ROOT, 'gunicorn.conf.py'), 'app:app'],
+                              cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    counter = itertools.count(10 ** 9)
+    output = []
+    try:
+        wait_for(port)
+        for scenario in scenarios(rows):
+            results = {'latencies': [], 'errors': 0}
+            lock = threading.Lock()
+            barrier = threading.Barrier(clients)
+            threads = [threading.Thread(target=http_client, args=(port, scenario, rows, duration,
+                                                                  counter, results, lock, barrier))
+                       for _ in range(clients)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            name, method, path, kind = scenario
+            output.append({
+                'scenario': name, 'method': method, 'path': path,
+                'requests': len(results['latencies']), 'errors': results['errors'],
+                'requests_per_second': round(len(results['latencies']) / duration, 1),
+                **percentiles(results['latencies']),
+            })
+    finally:
+        server.terminate()
+        server.wait()
+    return output
+
+
+# -------- Reporting --------
+
+def environment():
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT,
+                                capture_output=True, text=True).stdout.strip() or None
+    except OSError:
+        commit = None
+    return {
+        'timestamp': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'commit': commit,
+        'python': platform.python_version(),
+        'sqlite': sqlite3.sqlite_version,
+        'platform': platform.platform(),
+        'cpus': os.cpu_count(),
+    }
+
+
+def print_results(results):
+    for result in results:
+        extra = (f"q/req {result['queries_per_request'] or 0:>6}" if 'queries_per_request' in result
+                 else f"{result['requests_per_second']:8.1f} req/s")
+        print(f"{result['rows']:>9} {result['mode']:<10} {result['scenario']:<24} "
+              f"p50 {result.get('p50_ms', 0):8.2f} ms  p95 {result.get('p95_ms', 0):8.2f} ms  "
+              f"p99 {result.get('p99_ms', 0):8.2f} ms  {extra}  errors {result['errors']}")
+
+
+def compare(results, previous_path, threshold):
+    with open(previous_path) as f:
+        previous = {(r['rows'], r['mode'], r['scenario']): r for r in json.load(f)['results']}
+    regressions = 0
+    print(f"\np95 vs {previous_path}:")
+    for result in results:
+        before = previous.get((result['rows'], result['mode'], result['scenario']))
+        if not before or not before.get('p95_ms') or 'p95_ms' not in result:
+            continue
+        change = (result['p95_ms'] - before['p95_ms']) / before['p95_ms'] * 100
+        flag = '  REGRESSION' if change > threshold else ''
+        regressions += bool(flag)
+        print(f"{result['rows']:>9} {result['mode']:<10} {result['scenario']:<24} "
+              f"{before['p95_ms']:8.2f} -> {result['p95_ms']:8.2f} ms ({change:+.1f}%){flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', default='1000,100000', help='Comma-separated employee counts')
+    parser.add_argument('--modes', default='testclient,http')
+    parser.add_argument('--repeat', type=int, default=50, help='Requests per scenario (testclient)')
+    parser.add_argument('--clients', type=int, default=8, help='Concurrent clients (http)')
+    parser.add_argument('--duration', type=float, default=5, help='Seconds per scenario (http)')
+    parser.add_argument('--output', default=f"route_benchmark_{datetime.now():%Y%m%d_%H%M%S}.json")
+    parser.add_argument('--compare', help='Earlier results file to compare p95 against')
+    parser.add_argument('--threshold', type=float, default=20, help='p95 increase (%%) reported as a regression')
+    parser.add_argument('--testclient-child', type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.testclient_child is not None:
+        testclient_main(args.testclient_child, args.repeat)
+        return
+
+    modes = args.modes.split(',')
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for rows in (int(size) for size in args.sizes.split(',')):
+            template = prepare(rows, tmp)
+            for mode in modes:
+                # Every mode starts from the same data; the write scenarios change it
+                # A fresh name per run: a stale -wal file beside a reused name would be replayed
+                database = os.path.join(tmp, f'{mode}-{rows}.db')
+                shutil.copy(template, database)
+                if mode == 'testclient':
+                    measured = run_testclient(database, rows, args.repeat)
+                else:
+                    measured = run_http(database, rows, args.clients, args.duration)
+                results.extend({'rows': rows, 'mode': mode, **result} for result in measured)
+                print_results(results[-len(measured):])
+            os.remove(template)
+
+    with open(args.output, 'w') as f:
+        json.dump({'environment': environment(), 'arguments': vars(args), 'results': results}, f, indent=2)
+    print(f"\nSaved {len(results)} results to {args.output}")
+    if args.compare and compare(results, args.compare, args.threshold):
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
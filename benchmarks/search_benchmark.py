@@ -0,0 +1,99 @@
+"""Compare employee search latency: LIKE scan vs the full-text index.
+
+Builds a throwaway SQLite database, fills it with synthetic employees and
+times the same paginated search through both code paths.
+
+Usage:
+    python benchmarks/search_benchmark.py --rows 200000 --repeat 20
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import Flask
+from sqlalchemy import insert
+
+from models import db, Employee
+from search import apply_search, install_search_index, like_filter
+
+FIRST_NAMES = ['John', 'Sarah', 'Michael', 'Emily', 'Robert', 'Lisa', 'David', 'Jennifer', 'Kevin', 'Rachel']
+LAST_NAMES = ['Smith', 'Johnson', 'Williams', 'Brown', 'Jones', 'Garcia', 'Miller', 'Davis', 'Nguyen', 'Flores']
+DEPARTMENTS = ['Engineering', 'Finance', 'Sales', 'Legal', 'Marketing']
+POSITIONS = ['Software Engineer', 'Accountant', 'Account Executive', 'Paralegal', 'Brand Manager']
+QUERIES = ['john', 'smith', 'engineer', 'sarah nguyen', 'account', 'lis']
+
+
+def populate(rows):
+    rng = random.Random(42)
+    batch = []
+    for i in range(rows):
+        first = rng.choice(FIRST_NAMES)
+        last = rng.choice(LAST_NAMES)
+        dept = rng.randrange(len(DEPARTMENTS))
+        batch.append({
+            'name': f"{first} {last}",
+            'email': f"{first.lower()}.{last.lower()}.{i}@staffhub.com",
+            'department': DEPARTMENTS[dept],
+            'position': POSITIONS[dept],
+            'salary': rng.randint(40000, 150000),
+        })
+        if len(batch) == 10000:
+            db.session.execute(insert(Employee), batch)
+            batch = []
+    if batch:
+        db.session.execute(insert(Employee), batch)
+    db.session.commit()
+
+
+def time_search(search_fn, repeat):
+    timings = []
+    for _ in range(repeat):
+        for term in QUERIES:
+            start = time.perf_counter()
+            query = search_fn(Employee.query, term).order_by(Employee.name, Employee.id)
+            query.paginate(page=1, per_page=10, error_out=False)
+            timings.append(time.perf_counter() - start)
+    return timings
+
+
+def report(label, timings):
+    timings = sorted(timings)
+    p50 = statistics.median(timings) * 1000
+    p95 = timings[int(len(timings) * 0.95) - 1] * 1000
+    print(f"{label:<12} p50 {p50:8.2f} ms   p95 {p95:8.2f} ms")
+    return p50
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=200000)
+    parser.add_argument('--repeat', type=int, default=10)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        app = Flask(__name__)
+        app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+        app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+        db.init_app(app)
+        with app.app_context():
+            db.create_all()
+            with db.engine.begin() as conn:
+                backend = install_search_index(conn)
+            print(f"Populating {args.rows} employees (search backend: {backend})...")
+            populate(args.rows)
+
+            like_p50 = report('LIKE', time_search(like_filter, args.repeat))
+            fts_p50 = report(backend, time_search(apply_search, args.repeat))
+            print(f"Speed-up at p50: {like_p50 / fts_p50:.1f}x")
+            db.session.remove()
+            db.engine.dispose()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,109 @@
+"""Cold start of the app: importing it, serving the first request, booting gunicorn.
+
+Each measurement starts a fresh Python process, so nothing is warm but the
+OS file cache:
+
+import          ``import app`` (settings and extension wiring only), timed
+                inside the process; also checks that importing does not
+                touch the database file
+first request   process spawn until the test client has served ``/login``
+gunicorn        ``gunicorn -c gunicorn.conf.py app:app`` with one worker,
+                from spawn until ``/login`` answers 200
+
+Exits non-zero when the median gunicorn boot exceeds ``--budget-ms``.
+
+Usage:
+    python benchmarks/startup_benchmark.py --repeat 5 --budget-ms 3000
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from load_test import ROOT, free_port  # noqa: E402
+
+CHILD = '''
+import os, sys, time
+start = time.perf_counter()
+import app
+imported = time.perf_counter() - start
+path = os.environ['DATABASE_URL'].split('sqlite:///', 1)[1]
+untouched = not os.path.exists(path)
+app.app.test_client().get('/login')
+print(imported, untouched)
+'''
+
+
+def run_child(database):
+    env = dict(os.environ, DATABASE_URL=f'sqlite:///{database}', PASSWORD_HASH_WORKERS='0')
+    start = time.perf_counter()
+    output = subprocess.run([sys.executable, '-c', CHILD], cwd=ROOT, env=env, check=True,
+                            capture_output=True, text=True).stdout.split()
+    return float(output[0]), time.perf_counter() - start, output[1] == 'True'
+
+
+def boot_gunicorn(database, timeout=60):
+    port = free_port()
+    env = dict(os.environ, DATABASE_URL=f'sqlite:///{database}', WEB_CONCURRENCY='1')
+    start = time.perf_counter()
+    server = subprocess.Popen([sys.executable, '-m', 'gunicorn', '-b', f'127.0.0.1:{port}',
+                               '-c', os.path.join(ROOT, 'gunicorn.conf.py'), 'app:app'],
+                              cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        while time.perf_counter() - start < timeout:
+            try:
+                with urllib.request.urlopen(f'http://127.0.0.1:{port}/login', timeout=1) as response:
+                    if response.status == 200:
+                        return time.perf_counter() - start
+            except OSError:
+                time.sleep(0.01)
+        raise RuntimeError(f"gunicorn did not answer within {timeout}s")
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def report(label, samples):
+    samples_ms = [sample * 1000 for sample in samples]
+    print(f"{label:<14} median {statistics.median(samples_ms):8.1f} ms   max {max(samples_ms):8.1f} ms")
+    return statistics.median(samples_ms)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--budget-ms', type=float, default=3000, help='Maximum median gunicorn boot')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        database = os.path.join(tmp, 'employees.db')
+        env = dict(os.environ, DATABASE_URL=f'sqlite:///{database}', PASSWORD_HASH_WORKERS='0')
+        for flask_args in (['init-db'], ['seed']):
+            subprocess.run([sys.executable, '-m', 'flask', '--app', 'app', *flask_args],
+                           cwd=ROOT, env=env, check=True, stdout=subprocess.DEVNULL)
+
+        imports, first_requests = [], []
+        for _ in range(args.repeat):
+            # A database that does not exist yet shows whether importing connects
+            imported, _, untouched = run_child(os.path.join(tmp, 'absent.db'))
+            if not untouched:
+                sys.exit("Importing the app opened the database")
+            imports.append(imported)
+            first_requests.append(run_child(database)[1])
+        report('import', imports)
+        report('first request', first_requests)
+        boot = report('gunicorn', [boot_gunicorn(database) for _ in range(args.repeat)])
+
+    if boot > args.budget_ms:
+        sys.exit(f"Median gunicorn boot {boot:.0f} ms is over the {args.budget_ms:.0f} ms budget")
+    print(f"Within the {args.budget_ms:.0f} ms budget")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,153 @@
+"""Set-based edits and deletes over a selection of employees.
+
+A selection is the dashboard's search box and department filter, an
+explicit list of IDs, or both. ``bulk_update()`` and ``bulk_delete()`` run
+one ``UPDATE``/``DELETE ... WHERE id IN (<selection>)`` inside the caller's
+transaction instead of loading and flushing every employee.
+
+New values are SQL expressions, so the same expressions serve the preview,
+the audit diffs and the statement itself and the three always agree. Before
+writing, the affected rows are read once (locked ``FOR UPDATE`` where the
+database supports it) to compute the ``department_stats`` deltas and the
+audit entries that the ORM flush hooks would otherwise have produced.
+"""
+import math
+
+from sqlalchemy import Integer, case, cast, delete, func, literal, select, update
+
+from models import db, Employee
+from audit import record_changes
+from hierarchy import detach
+from importer import MAX_SALARY, validate_row
+from search import filter_employees
+from summary import apply_deltas, new_deltas, record
+
+SALARY_MODES = ('percent', 'amount')
+
+
+def parse_ids(text):
+    """Parse a comma/whitespace separated list of employee IDs."""
+    ids = []
+    for token in text.replace(',', ' ').split():
+        if not token.isdigit():
+            raise ValueError(f"Invalid employee ID '{token}'")
+        ids.append(int(token))
+    return ids
+
+
+def bulk_selection(search='', department='', ids=None, scope=None):
+    """``SELECT employee.id`` for the filter and/or IDs; refuses an empty selection.
+
+    ``scope`` is an extra filter clause, e.g. a manager's subtree.
+    """
+    if not (search or department or ids):
+        raise ValueError("Select employees with a search, a department or a list of IDs")
+    query = filter_employees(db.session.query(Employee.id), search, department, ranked=False)
+    if ids:
+        query = query.filter(Employee.id.in_(ids))
+    if scope is not None:
+        query = query.filter(scope)
+    return query.statement
+
+
+def bulk_changes(department='', position='', salary_mode='', salary_value=''):
+    """Return ``{column: new value expression}`` for the requested changes."""
+    changes = {}
+    # Same length and blank checks as the importer and the API
+    fields = {key: value for key, value in (('department', department), ('position', position)) if value}
+    for field, value in validate_row(fields, partial=True).items():
+        changes[field] = literal(value)
+    if salary_mode:
+        if salary_mode not in SALARY_MODES:
+            raise ValueError(f"Unknown salary change '{salary_mode}'")
+        try:
+            amount = float(salary_value)
+        except (TypeError, ValueError):
+            raise ValueError(f"Invalid salary change '{salary_value}'")
+        if not math.isfinite(amount) or abs(amount) > MAX_SALARY:
+            raise ValueError(f"Invalid salary change '{salary_value}'")
+        if salary_mode == 'percent':
+            if amount <= -100:
+                raise ValueError("A percentage cut must be less than 100%")
+            salary = func.round(Employee.salary * literal((100 + amount) / 100))
+        else:
+            salary = Employee.salary + literal(int(amount))
+        # Within the range any write accepts, and stored as a whole number
+        changes['salary'] = cast(case((salary < 0, 0), (salary > MAX_SALARY, MAX_SALARY), else_=salary), Integer)
+    if not changes:
+        raise ValueError("Nothing to change")
+    return changes
+
+
+def _new(changes, field):
+    return changes.get(field, getattr(Employee, field))
+
+
+def preview(selection, changes=None):
+    """Dry run: affected headcount and payroll before and after, nothing written."""
+    changes = changes or {}
+    count, payroll, new_payroll = db.session.execute(
+        select(func.count(), func.sum(Employee.salary), func.sum(_new(changes, 'salary')))
+        .where(Employee.id.in_(selection))
+    ).one()
+    return {
+        'count': count,
+        'payroll': payroll or 0,
+        # A delete removes the whole payroll of the selection
+        'new_payroll': (new_payroll or 0) if changes else 0,
+    }
+
+
+def bulk_update(selection, changes):
+    """Apply ``changes`` to every selected employee. Returns the row count."""
+    fields = ['department', 'position', 'salary']
+    rows = db.session.execute(
+        select(Employee.id, *(getattr(Employee, f) for f in fields),
+               *(_new(changes, f) for f in fields))
+        .where(Employee.id.in_(selection))
+        .with_for_update()
+    ).all()
+    deltas = new_deltas()
+    audited = []
+    for employee_id, *values in rows:
+        old, new = values[:3], values[3:]
+        record(deltas, old[0], old[2], -1)
+        record(deltas, new[0], new[2])
+        diff = {f: [o, n] for f, o, n in zip(fields, old, new) if o != n}
+        if diff:
+            audited.append((employee_id, 'update', diff))
+
+    db.session.execute(
+        update(Employee).where(Employee.id.in_(selection)).values(changes),
+        execution_options={'synchronize_session': False}
+    )
+    apply_deltas(db.session.connection(), deltas)
+    record_changes(db.session, 'employee', audited)
+    # Loaded instances now hold the old values
+    db.session.expire_all()
+    return len(rows)
+
+
+def bulk_delete(selection):
+    """Delete every selected employee. Returns the row count."""
+    columns = [column for column in Employee.__table__.columns]
+    rows = db.session.execute(
+        select(*columns).where(Employee.id.in_(selection)).with_for_update()
+    ).all()
+    deltas = new_deltas()
+    audited = []
+    for row in rows:
+        record(deltas, row.department, row.salary, -1)
+        audited.append((row.id, 'delete', {c.key: [getattr(row, c.key), None] for c in columns}))
+
+    # Reports of deleted employees move up to the nearest manager who stays
+    for report, old, new in detach(db.session.connection(), selection):
+        audited.append((report, 'update', {'manager_id': [old, new]}))
+    db.session.execute(
+        delete(Employee).where(Employee.id.in_(selection)),
+        execution_options={'synchronize_session': False}
+    )
+    apply_deltas(db.session.connection(), deltas)
+    record_changes(db.session, 'employee', audited)
+    db.session.expire_all()
+    return len(rows)
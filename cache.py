@@ -0,0 +1,209 @@
+"""Caching for dashboard data that changes only when employees are written.
+
+Every cached value is keyed by the current *generation* of the employee
+data. ``invalidate()`` bumps the generation, so all entries computed before
+a write stop matching at once without having to enumerate them.
+
+Entries live in a per-process LRU with a TTL. When ``CACHE_SHARED_PATH`` is
+set, a small SQLite file next to the app also holds the generation counter
+and the values, so gunicorn workers share both the results and the
+invalidations. Without it each worker invalidates only its own entries and
+the TTL bounds how stale another worker's copy can get.
+"""
+import os
+import pickle
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+_MISSING = object()
+
+
+class TTLCache:
+    """Thread-safe LRU cache whose entries expire after ``ttl`` seconds."""
+
+    def __init__(self, maxsize=256, ttl=300):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return default
+            expires, value = entry
+            if expires < time.monotonic():
+                del self._data[key]
+                return default
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl=None):
+        with self._lock:
+            self._data[key] = (time.monotonic() + (self.ttl if ttl is None else ttl), value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+
+class SharedStore:
+    """Key/value store and generation counters in a local SQLite file.
+
+    Each process (and thread) opens its own connection lazily, so the store
+    is safe to create before gunicorn forks its workers.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+
+    def _connect(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('CREATE TABLE IF NOT EXISTS cache_entry '
+                         '(key TEXT PRIMARY KEY, expires REAL NOT NULL, value BLOB NOT NULL)')
+            conn.execute('CREATE TABLE IF NOT EXISTS cache_generation '
+                         '(name TEXT PRIMARY KEY, value INTEGER NOT NULL)')
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def get(self, key, default=None):
+        row = self._connect().execute(
+            'SELECT value FROM cache_entry WHERE key = ? AND expires >= ?', (key, time.time())
+        ).fetchone()
+        return default if row is None else pickle.loads(row[0])
+
+    def set(self, key, value, ttl):
+        self._connect().execute(
+            'INSERT OR REPLACE INTO cache_entry (key, expires, value) VALUES (?, ?, ?)',
+            (key, time.time() + ttl, pickle.dumps(value, pickle.HIGHEST_PROTOCOL))
+        )
+
+    def generation(self, name):
+        row = self._connect().execute(
+            'SELECT value FROM cache_generation WHERE name = ?', (name,)
+        ).fetchone()
+        return row[0] if row else 0
+
+    def bump(self, name):
+        conn = self._connect()
+        conn.execute(
+            'INSERT INTO cache_generation (name, value) VALUES (?, 1) '
+            'ON CONFLICT(name) DO UPDATE SET value = value + 1', (name,)
+        )
+        # Expired entries are dead weight; drop them while we hold the file
+        conn.execute('DELETE FROM cache_entry WHERE expires < ?', (time.time(),))
+
+
+class DataCache:
+    """Generation-keyed cache with hit/miss counters."""
+
+    def __init__(self, name, maxsize=256, ttl=300):
+        self.name = name
+        self.local = TTLCache(maxsize, ttl)
+        self.shared = None
+        self._generation = 0
+        self._lock = threading.Lock()
+        self.stats = {'hits': 0, 'shared_hits': 0, 'misses': 0, 'invalidations': 0}
+
+    def init_app(self, app, ttl=None):
+        self.local = TTLCache(app.config.get('CACHE_MAXSIZE', self.local.maxsize),
+                              ttl if ttl is not None else app.config.get('CACHE_TTL', self.local.ttl))
+        path = app.config.get('CACHE_SHARED_PATH')
+        self.shared = SharedStore(path) if path else None
+
+    @property
+    def generation(self):
+        if self.shared is not None:
+            return self.shared.generation(self.name)
+        return self._generation
+
+    def _count(self, stat):
+        with self._lock:
+            self.stats[stat] += 1
+
+    def _full_key(self, key):
+        return f"{self.name}:{self.generation}:{key}"
+
+    def get(self, key, default=None):
+        """Return the value cached for ``key`` in the current generation."""
+        full_key = self._full_key(key)
+        value = self.local.get(full_key, _MISSING)
+        if value is not _MISSING:
+            self._count('hits')
+            return value
+        if self.shared is not None:
+            value = self.shared.get(full_key, _MISSING)
+            if value is not _MISSING:
+                self._count('shared_hits')
+                self.local.set(full_key, value)
+                return value
+        self._count('misses')
+        return default
+
+    def set(self, key, value, generation=None, ttl=None):
+        """Store ``value``; pass the ``generation`` read before computing it
+        so a value computed across an invalidation is filed under the old one.
+        ``ttl`` shortens the cache's own TTL for this entry."""
+        full_key = self._full_key(key) if generation is None else f"{self.name}:{generation}:{key}"
+        ttl = self.local.ttl if ttl is None else min(ttl, self.local.ttl)
+        self.local.set(full_key, value, ttl)
+        if self.shared is not None:
+            self.shared.set(full_key, value, ttl)
+
+    def get_or_compute(self, key, compute, ttl=None):
+        """Return the cached value for ``key``, computing it on a miss."""
+        generation = self.generation
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            value = compute()
+            self.set(key, value, generation, ttl)
+        return value
+
+    def invalidate(self):
+        """Drop every entry computed before now, in all workers sharing the store."""
+        with self._lock:
+            self._generation += 1
+            self.stats['invalidations'] += 1
+        if self.shared is not None:
+            self.shared.bump(self.name)
+        self.local.clear()
+
+    def get_stats(self):
+        with self._lock:
+            stats = dict(self.stats)
+        lookups = stats['hits'] + stats['shared_hits'] + stats['misses']
+        stats['hit_ratio'] = round((stats['hits'] + stats['shared_hits']) / lookups, 4) if lookups else None
+        stats['entries'] = len(self.local)
+        stats['generation'] = self.generation
+        stats['shared'] = self.shared is not None
+        return stats
+
+
+# Everything derived from the Employee table
+employee_cache = DataCache('employees')
+
+# Logged-in user snapshots, see auth.load_user
+user_cache = DataCache('users', maxsize=4096, ttl=5)
+
+# Rendered dashboard fragments and compressed pages, see pagecache
+page_cache = DataCache('pages', maxsize=1024)
+
+
+def invalidate_employee_caches():
+    """Call after committing any change to employees."""
+    employee_cache.invalidate()
+    page_cache.invalidate()
@@ -0,0 +1,57 @@
+"""Engine settings for running under a pre-forking server.
+
+``engine_options()`` turns the ``DB_POOL_*`` settings into the SQLAlchemy
+pool arguments for client/server databases, and gives SQLite a busy
+timeout so concurrent writers wait for the lock instead of failing with
+"database is locked". ``configure_engine()`` switches SQLite files to WAL,
+where readers never block the single writer.
+
+With ``preload_app`` gunicorn imports the app once and forks it; a pool
+inherited across the fork would share sockets between processes, so every
+worker calls ``dispose_after_fork()`` before serving.
+"""
+import sqlite3
+
+from sqlalchemy import event
+
+from models import db
+
+
+def engine_options(config):
+    """``SQLALCHEMY_ENGINE_OPTIONS`` for the configured database URI."""
+    if config['SQLALCHEMY_DATABASE_URI'].startswith('sqlite'):
+        # sqlite3's own busy handler retries until the timeout
+        return {'connect_args': {'timeout': config['SQLITE_BUSY_TIMEOUT']}}
+    return {
+        'pool_size': config['DB_POOL_SIZE'],
+        'max_overflow': config['DB_MAX_OVERFLOW'],
+        'pool_timeout': config['DB_POOL_TIMEOUT'],
+        'pool_recycle': config['DB_POOL_RECYCLE'],
+        'pool_pre_ping': config['DB_POOL_PRE_PING'],
+    }
+
+
+def _set_sqlite_pragmas(dbapi_connection, connection_record):
+    if not isinstance(dbapi_connection, sqlite3.Connection):
+        return
+    cursor = dbapi_connection.cursor()
+    # WAL is a property of the file; asking again on later connections is a no-op
+    cursor.execute('PRAGMA journal_mode=WAL')
+    # Durable at every checkpoint, without an fsync per commit
+    cursor.execute('PRAGMA synchronous=NORMAL')
+    cursor.close()
+
+
+def configure_engine(app):
+    with app.app_context():
+        engine = db.engine
+    if engine.dialect.name == 'sqlite' and app.config.get('SQLITE_WAL', True):
+        event.listen(engine, 'connect', _set_sqlite_pragmas)
+
+
+def dispose_after_fork(app):
+    """Drop pooled connections inherited from the parent process."""
+    with app.app_context():
+        # Replica binds too; close=False leaves the parent's connections alone
+        for engine in db.engines.values():
+            engine.dispose(close=False)
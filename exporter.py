@@ -0,0 +1,73 @@
+"""Streaming export of the employee directory.
+
+Rows are read with ``yield_per`` (a server-side cursor on PostgreSQL, lazy
+fetching on SQLite) and encoded in small chunks as they arrive, so memory
+stays flat no matter how many employees are exported.
+"""
+import csv
+import json
+
+from models import Employee
+
+EXPORT_FIELDS = ('id', 'name', 'email', 'department', 'position', 'salary', 'manager_id')
+
+FORMATS = {
+    'csv': 'text/csv',
+    'ndjson': 'application/x-ndjson',
+}
+
+FETCH_SIZE = 1000
+
+
+class _Echo:
+    """File-like object whose ``write`` returns the line instead of storing it."""
+
+    def write(self, value):
+        return value
+
+
+def export_rows(query, include_salary=True):
+    """Yield employee dicts for ``query`` without loading it all at once.
+
+    Without ``include_salary`` the salary column is still present but empty,
+    so every export has the same shape.
+    """
+    columns = [getattr(Employee, field) for field in EXPORT_FIELDS if include_salary or field != 'salary']
+    rows = query.with_entities(*columns).order_by(None).order_by(Employee.id).yield_per(FETCH_SIZE)
+    for row in rows:
+        record = row._asdict()
+        if not include_salary:
+            record['salary'] = None
+        yield record
+
+
+def _chunked(lines):
+    chunk = []
+    for line in lines:
+        chunk.append(line)
+        if len(chunk) >= FETCH_SIZE:
+            yield ''.join(chunk)
+            chunk = []
+    if chunk:
+        yield ''.join(chunk)
+
+
+def stream_csv(rows):
+    writer = csv.writer(_Echo())
+    yield writer.writerow(EXPORT_FIELDS)
+    yield from _chunked(
+        writer.writerow(['' if row[field] is None else row[field] for field in EXPORT_FIELDS])
+        for row in rows
+    )
+
+
+def stream_ndjson(rows):
+    yield from _chunked(json.dumps(row) + '\n' for row in rows)
+
+
+def stream_export(query, fmt, include_salary=True):
+    """Encode ``query`` as ``fmt`` ('csv' or 'ndjson'), chunk by chunk."""
+    rows = export_rows(query, include_salary)
+    if fmt == 'csv':
+        return stream_csv(rows)
+    return stream_ndjson(rows)
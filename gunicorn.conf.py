@@ -0,0 +1,63 @@
+"""Gunicorn settings: ``gunicorn -c gunicorn.conf.py app:app``.
+
+One process per CPU runs Python code in parallel; threads within each
+process overlap requests that are waiting on the database, the network or
+the password hashing pool. More processes than CPUs only adds context
+switches and per-process caches that each have to warm up and invalidate.
+
+The app is imported once in the master and forked (``preload_app``), so
+workers start fast and share the imported code. Migrations and sample data
+are not part of importing the app; they run once in the release step
+(``flask --app app init-db`` and ``flask --app app seed``). Every setting can be overridden from the
+environment or the command line.
+
+With more than one worker, the caches must be invalidated in all of them
+at once, or a page cached by one worker outlives a write made through
+another. Unless ``CACHE_SHARED_PATH`` is set, the workers share a cache
+file in a private directory created for this server run (readable only by
+its user, since cached values are unpickled) and removed when it stops.
+"""
+import multiprocessing
+import os
+import shutil
+import tempfile
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '8000')}"
+workers = int(os.environ.get('WEB_CONCURRENCY', multiprocessing.cpu_count()))
+worker_class = 'gthread'
+threads = int(os.environ.get('GUNICORN_THREADS', 4))
+preload_app = True
+
+# Read when the app is imported in the master, before the workers fork
+_own_cache_dir = None
+if workers > 1 and not os.environ.get('CACHE_SHARED_PATH'):
+    # A fresh 0700 directory: no other user can plant or read the file, and
+    # nothing is left over from an earlier run to be picked up
+    _own_cache_dir = tempfile.mkdtemp(prefix='staffhub-cache-')
+    os.environ['CACHE_SHARED_PATH'] = os.path.join(_own_cache_dir, 'cache.db')
+
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 30))
+graceful_timeout = 30
+keepalive = 5
+# Optionally restart workers every N requests to contain slow leaks; off by
+# default because a restart drops that worker's keep-alive connections
+max_requests = int(os.environ.get('GUNICORN_MAX_REQUESTS', 0))
+max_requests_jitter = max_requests // 10
+
+
+def post_fork(server, worker):
+    # Connections pooled in the master before the fork must not be shared
+    from app import app
+    from database import dispose_after_fork
+    dispose_after_fork(app)
+
+
+def worker_exit(server, worker):
+    # Write queued audit entries before the worker process goes away
+    from audit import audit_writer
+    audit_writer.shutdown()
+
+
+def on_exit(server):
+    if _own_cache_dir is not None:
+        shutil.rmtree(_own_cache_dir, ignore_errors=True)
@@ -0,0 +1,266 @@
+"""Reporting lines: ``employee.manager_id`` and the ``employee_closure`` table.
+
+The closure table holds one row per (manager, report) pair at any distance,
+with the number of levels between them. "Everyone under X" is then a single
+range scan of ``ancestor_id = X`` however deep the tree is, and "everyone
+above X" a scan of ``descendant_id = X``; nothing walks the tree one level
+per query. An employee is not its own ancestor: the subtree of X is X plus
+the rows below it.
+
+The table is kept in step inside the transaction that changes the tree:
+
+* ORM writes are picked up by flush listeners. An employee added or moved
+  under a manager brings its whole subtree along; a deleted employee's
+  reports move up to its manager (or the nearest surviving one above).
+* Set-based paths call ``attach_new()`` after bulk inserts and ``detach()``
+  before bulk deletes.
+
+``rebuild_closure()`` recomputes everything from ``manager_id`` with one
+statement per level, to repair drift after editing rows by hand in SQL.
+
+Managers are scoped to their subtree: ``scope_filter()`` is the clause every
+listing, edit and export applies for them.
+"""
+from sqlalchemy import event, false, func, inspect, literal, or_, select, true
+
+from models import db, Employee, EmployeeClosure, Role
+from audit import record_changes
+
+_employee = Employee.__table__
+_closure = EmployeeClosure.__table__
+
+# Deeper than any real organisation; reached only when manager_id has a cycle
+MAX_DEPTH = 1000
+
+
+def subtree_ids(root_id):
+    """``SELECT`` of the ids below ``root_id`` at every level."""
+    return select(_closure.c.descendant_id).where(_closure.c.ancestor_id == root_id)
+
+
+def in_subtree(root_id, include_root=True):
+    """Filter clause matching the employees below ``root_id`` (and itself)."""
+    below = Employee.id.in_(subtree_ids(root_id))
+    return or_(Employee.id == root_id, below) if include_root else below
+
+
+def is_scoped(user):
+    return user.role == Role.MANAGER.value
+
+
+def scope_filter(user, include_root=True):
+    """Clause limiting ``Employee`` rows to what ``user`` may see; None when unrestricted.
+
+    Managers see their own record and everyone under it. A manager account
+    that is not linked to an employee record sees no one.
+    """
+    if not is_scoped(user):
+        return None
+    if user.employee_id is None:
+        return false()
+    return in_subtree(user.employee_id, include_root)
+
+
+def scope_query(query, user, include_root=True):
+    clause = scope_filter(user, include_root)
+    return query if clause is None else query.filter(clause)
+
+
+def is_below(employee_id, ancestor_id):
+    """Whether ``employee_id`` reports to ``ancestor_id`` at any distance."""
+    return db.session.execute(
+        select(literal(1)).where(_closure.c.ancestor_id == ancestor_id,
+                                 _closure.c.descendant_id == employee_id)
+    ).first() is not None
+
+
+def can_reach(user, employee_id, include_root=True):
+    """Whether ``employee_id`` is inside ``user``'s scope."""
+    if not is_scoped(user):
+        return True
+    if user.employee_id is None:
+        return False
+    if employee_id == user.employee_id:
+        return include_root
+    return is_below(employee_id, user.employee_id)
+
+
+def parse_manager(value):
+    """Manager id from a form or JSON value; blank means no manager."""
+    if value is None or str(value).strip() == '':
+        return None
+    try:
+        return int(str(value).strip())
+    except ValueError:
+        raise ValueError(f"Invalid manager ID '{value}'")
+
+
+def move(conn, employee_id, manager_id):
+    """Re-attach ``employee_id`` and everything under it below ``manager_id``.
+
+    ``manager_id=None`` makes it a top-level employee. Raises ``ValueError``
+    if the manager does not exist or is part of the subtree being moved.
+    """
+    if manager_id is not None:
+        if manager_id == employee_id or conn.execute(
+            select(literal(1)).where(_closure.c.ancestor_id == employee_id,
+                                     _closure.c.descendant_id == manager_id)
+        ).first():
+            raise ValueError("An employee cannot report to themselves or to someone under them")
+        if not conn.execute(select(literal(1)).where(_employee.c.id == manager_id)).first():
+            raise ValueError(f"Manager #{manager_id} does not exist")
+
+    # The moved employee and its subtree, with their distance from it
+    members = select(literal(employee_id).label('id'), literal(0).label('depth')).union_all(
+        select(_closure.c.descendant_id, _closure.c.depth).where(_closure.c.ancestor_id == employee_id)
+    ).subquery()
+    # Cut the old managers above it off the subtree
+    conn.execute(_closure.delete().where(
+        _closure.c.ancestor_id.in_(select(_closure.c.ancestor_id).where(_closure.c.descendant_id == employee_id)),
+        _closure.c.descendant_id.in_(select(members.c.id)),
+    ))
+    if manager_id is None:
+        return
+    # Every manager from the new one upwards, with its distance from the new one
+    above = select(literal(manager_id).label('id'), literal(0).label('depth')).union_all(
+        select(_closure.c.ancestor_id, _closure.c.depth).where(_closure.c.descendant_id == manager_id)
+    ).subquery()
+    conn.execute(_closure.insert().from_select(
+        ['ancestor_id', 'descendant_id', 'depth'],
+        select(above.c.id, members.c.id, above.c.depth + members.c.depth + 1)
+        .select_from(above.join(members, true()))
+    ))
+
+
+def detach(conn, ids):
+    """Take the employees in ``ids`` (a list or a ``SELECT`` of ids) out of the tree.
+
+    Call before deleting them. Their reports move up to the nearest manager
+    above that is not being removed, and every path through a removed
+    employee gets shorter. Returns ``[(id, old_manager_id, new_manager_id)]``
+    of the reports that moved, for the audit log.
+    """
+    above = _closure.alias('above')
+    nearest = (select(above.c.ancestor_id)
+               .where(above.c.descendant_id == _employee.c.id, above.c.ancestor_id.not_in(ids))
+               .order_by(above.c.depth)
+               .limit(1)
+               .scalar_subquery())
+    orphaned = (_employee.c.manager_id.in_(ids), _employee.c.id.not_in(ids))
+    moved = conn.execute(select(_employee.c.id, _employee.c.manager_id, nearest).where(*orphaned)).all()
+    if moved:
+        conn.execute(_employee.update().where(*orphaned).values(manager_id=nearest))
+
+    # Levels removed between each surviving pair
+    upper, lower = _closure.alias('upper'), _closure.alias('lower')
+    skipped = (select(func.count())
+               .select_from(upper.join(lower, lower.c.ancestor_id == upper.c.descendant_id))
+               .where(upper.c.ancestor_id == _closure.c.ancestor_id,
+                      lower.c.descendant_id == _closure.c.descendant_id,
+                      upper.c.descendant_id.in_(ids))
+               .scalar_subquery())
+    conn.execute(_closure.update().where(
+        _closure.c.descendant_id.in_(select(lower.c.descendant_id).where(lower.c.ancestor_id.in_(ids))),
+        _closure.c.ancestor_id.not_in(ids),
+        _closure.c.descendant_id.not_in(ids),
+    ).values(depth=_closure.c.depth - skipped))
+    conn.execute(_closure.delete().where(
+        _closure.c.ancestor_id.in_(ids) | _closure.c.descendant_id.in_(ids)
+    ))
+    return [tuple(row) for row in moved]
+
+
+def attach_new(conn, after_id=0):
+    """Add closure rows for employees with ``id > after_id``; returns the rows added.
+
+    For bulk inserts. One ``INSERT ... SELECT`` per level: a new employee's
+    ancestors at distance ``n + 1`` are its manager's at distance ``n``.
+    """
+    added = conn.execute(_closure.insert().from_select(
+        ['ancestor_id', 'descendant_id', 'depth'],
+        select(_employee.c.manager_id, _employee.c.id, literal(1))
+        .where(_employee.c.id > after_id, _employee.c.manager_id.is_not(None))
+    )).rowcount
+    total, depth = added, 1
+    while added:
+        if depth > MAX_DEPTH:
+            raise ValueError("Reporting lines contain a cycle")
+        added = conn.execute(_closure.insert().from_select(
+            ['ancestor_id', 'descendant_id', 'depth'],
+            select(_closure.c.ancestor_id, _employee.c.id, literal(depth + 1))
+            .select_from(_employee.join(_closure, _closure.c.descendant_id == _employee.c.manager_id))
+            .where(_employee.c.id > after_id, _closure.c.depth == depth)
+        )).rowcount
+        total += added
+        depth += 1
+    return total
+
+
+def rebuild_closure(conn):
+    """Recompute ``employee_closure`` from ``manager_id``. Returns the row count."""
+    conn.execute(_closure.delete())
+    return attach_new(conn)
+
+
+@event.listens_for(db.session, 'before_flush')
+def detach_deleted_employees(session, flush_context, instances):
+    ids = [inspect(obj).identity[0] for obj in session.deleted if isinstance(obj, Employee)]
+    if not ids:
+        return
+    moved = detach(session.connection(), ids)
+    if moved:
+        record_changes(session, 'employee', [
+            (report, 'update', {'manager_id': [old, new]}) for report, old, new in moved
+        ])
+        # Loaded reports still hold the removed manager; reload it unless it is being changed
+        moved_ids = {report for report, _, _ in moved}
+        for obj in session.identity_map.values():
+            if (isinstance(obj, Employee) and obj.id in moved_ids
+                    and not inspect(obj).attrs.manager_id.history.has_changes()):
+                session.expire(obj, ['manager_id'])
+
+
+@event.listens_for(db.session, 'after_flush')
+def track_reporting_lines(session, flush_context):
+    conn = None
+    for obj in list(session.new) + list(session.dirty):
+        if not isinstance(obj, Employee) or obj in session.deleted:
+            continue
+        state = inspect(obj)
+        if obj in session.new:
+            if obj.manager_id is None:
+                continue
+        elif not state.attrs.manager_id.history.has_changes():
+            continue
+        conn = conn or session.connection()
+        move(conn, obj.id, obj.manager_id)
+
+
+def team_summary(root_id):
+    """``[(department, headcount, payroll), ...]`` of ``root_id`` and everyone under it."""
+    rows = db.session.execute(
+        select(Employee.department, func.count(Employee.id), func.sum(Employee.salary))
+        .where(in_subtree(root_id))
+        .group_by(Employee.department)
+        .order_by(Employee.department)
+    )
+    return [tuple(row) for row in rows]
+
+
+def team_sizes(ids):
+    """``{id: number of employees under it}`` for ``ids``."""
+    rows = db.session.execute(
+        select(_closure.c.ancestor_id, func.count())
+        .where(_closure.c.ancestor_id.in_(ids))
+        .group_by(_closure.c.ancestor_id)
+    )
+    return dict(rows.all())
+
+
+def chain_of_command(employee_id, user=None):
+    """Managers above ``employee_id``, top first; limited to ``user``'s scope if given."""
+    query = (Employee.query
+             .join(_closure, _closure.c.ancestor_id == Employee.id)
+             .filter(_closure.c.descendant_id == employee_id)
+             .order_by(_closure.c.depth.desc()))
+    return (scope_query(query, user) if user is not None else query).all()
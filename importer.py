@@ -0,0 +1,179 @@
+"""Streaming bulk import of employees from CSV or NDJSON.
+
+Rows are read one at a time from the uploaded stream, validated, and
+upserted by email in batches: one SELECT to find which emails already
+exist, then one executemany INSERT and one executemany UPDATE per batch,
+each batch in its own transaction. The import is a generator of progress
+events, so the caller can stream them back while the file is still being
+read and nothing but the current batch is ever held in memory.
+"""
+import codecs
+import csv
+import json
+import math
+
+from sqlalchemy import select, update
+
+from models import db, Employee
+from cache import invalidate_employee_caches
+from summary import apply_deltas, new_deltas, record
+
+FIELDS = ('name', 'email', 'department', 'position', 'salary')
+
+FORMATS = ('csv', 'ndjson')
+
+# Fits the salary INTEGER column on every supported database
+MAX_SALARY = 2**31 - 1
+
+
+def detect_format(filename='', content_type=''):
+    """Guess the upload format from its file name or content type."""
+    filename = (filename or '').lower()
+    content_type = (content_type or '').lower()
+    if filename.endswith(('.ndjson', '.jsonl', '.json')) or 'json' in content_type:
+        return 'ndjson'
+    return 'csv'
+
+
+def read_rows(stream, fmt):
+    """Yield ``(line_number, raw_row_or_none, error_or_none)`` from a binary stream.
+
+    Reading stops with an error at the first line that is not UTF-8 text or
+    that the CSV parser cannot read, since the rest cannot be trusted.
+    """
+    lines = codecs.iterdecode(stream, 'utf-8-sig')
+    line_number = 0
+    try:
+        if fmt == 'csv':
+            reader = csv.DictReader(lines)
+            for row in reader:
+                line_number = reader.line_num
+                yield line_number, row, None
+            return
+        for line_number, line in enumerate(lines, start=1):
+            if not line.strip():
+                continue
+            try:
+                row = json.loads(line)
+            except ValueError as e:
+                yield line_number, None, f"Invalid JSON: {e}"
+                continue
+            if not isinstance(row, dict):
+                yield line_number, None, "Each line must be a JSON object"
+                continue
+            yield line_number, row, None
+    except UnicodeDecodeError:
+        yield line_number + 1, None, "Not UTF-8 text; the rest of the file was skipped"
+    except csv.Error as e:
+        yield line_number + 1, None, f"Unreadable CSV ({e}); the rest of the file was skipped"
+
+
+def validate_row(row, partial=False):
+    """Return a clean employee dict or raise ``ValueError``.
+
+    With ``partial`` only the fields present in ``row`` are checked and
+    returned, for updates that change some columns only.
+    """
+    clean = {}
+    for field in FIELDS:
+        if partial and field not in row:
+            continue
+        value = row.get(field)
+        if value is None or str(value).strip() == '':
+            raise ValueError(f"Missing required field '{field}'")
+        clean[field] = str(value).strip()
+
+    if 'email' in clean and '@' not in clean['email']:
+        raise ValueError(f"Invalid email '{clean['email']}'")
+
+    if 'salary' in clean:
+        try:
+            salary = float(clean['salary'])
+        except ValueError:
+            salary = math.nan
+        if not math.isfinite(salary):
+            raise ValueError(f"Invalid salary '{clean['salary']}'")
+        if salary < 0:
+            raise ValueError("Salary cannot be negative")
+        if salary > MAX_SALARY:
+            raise ValueError(f"Salary cannot be more than {MAX_SALARY}")
+        clean['salary'] = int(salary)
+
+    for field, limit in (('name', 150), ('email', 150), ('department', 100), ('position', 100)):
+        if len(clean.get(field, '')) > limit:
+            raise ValueError(f"'{field}' is longer than {limit} characters")
+    return clean
+
+
+def _write_batch(batch):
+    """Upsert one batch of ``{email: row}``; returns ``(created, updated)``."""
+    existing = {}
+    deltas = new_deltas()
+    # Bulk statements skip the ORM flush hooks, so count the summary deltas here
+    for email, employee_id, department, salary in db.session.execute(
+        select(Employee.email, Employee.id, Employee.department, Employee.salary)
+        .where(Employee.email.in_(list(batch)))
+    ):
+        existing[email] = employee_id
+        record(deltas, department, salary, -1)
+    for row in batch.values():
+        record(deltas, row['department'], row['salary'])
+
+    inserts = [row for email, row in batch.items() if email not in existing]
+    updates = [dict(row, id=existing[email]) for email, row in batch.items() if email in existing]
+
+    if inserts:
+        db.session.execute(Employee.__table__.insert(), inserts)
+    if updates:
+        db.session.execute(update(Employee), updates)
+    apply_deltas(db.session.connection(), deltas)
+    db.session.commit()
+    invalidate_employee_caches()
+    return len(inserts), len(updates)
+
+
+def import_employees(stream, fmt='csv', batch_size=500):
+    """Import employees from ``stream`` and yield progress events.
+
+    Events are dicts with an ``event`` key: ``error`` for a rejected row,
+    ``progress`` after each committed batch and a final ``done``. Within a
+    batch the last row for an email wins.
+    """
+    stats = {'processed': 0, 'created': 0, 'updated': 0, 'failed': 0}
+    batch = {}
+    lines = {}
+
+    def flush():
+        try:
+            created, updated = _write_batch(batch)
+        except Exception as e:
+            db.session.rollback()
+            stats['failed'] += len(batch)
+            yield {'event': 'error', 'lines': sorted(lines.values()), 'message': f"Batch rejected: {e}"}
+        else:
+            stats['created'] += created
+            stats['updated'] += updated
+        batch.clear()
+        lines.clear()
+        yield dict(stats, event='progress')
+
+    for line_number, row, error in read_rows(stream, fmt):
+        stats['processed'] += 1
+        if error is None:
+            try:
+                row = validate_row(row)
+            except ValueError as e:
+                error = str(e)
+        if error is not None:
+            stats['failed'] += 1
+            yield {'event': 'error', 'line': line_number, 'message': error}
+            continue
+
+        batch[row['email']] = row
+        lines[row['email']] = line_number
+        if len(batch) >= batch_size:
+            yield from flush()
+
+    if batch:
+        yield from flush()
+    yield dict(stats, event='done')
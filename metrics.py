@@ -0,0 +1,181 @@
+"""Request and SQL instrumentation, exposed in Prometheus text format.
+
+Every request records its latency per route, and SQLAlchemy engine events
+count the statements it ran and the time spent in them. Statements slower
+than ``SLOW_QUERY_MS`` during a request are logged with their SQL text on
+the ``staffhub.sql`` logger. Outside requests (CLI commands, migrations,
+background threads) long bulk statements are expected and not reported.
+
+Metrics are kept per process. Behind several gunicorn workers each scrape
+sees the worker that answered it, so scrape each worker or sum in the
+dashboard.
+"""
+import logging
+import threading
+import time
+from bisect import bisect_left
+
+from flask import Response, abort, g, has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+slow_query_log = logging.getLogger('staffhub.sql')
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+
+class Histogram:
+    """Cumulative-bucket histogram keyed by a tuple of label values."""
+
+    def __init__(self, name, help_text, label_names, buckets):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = label_names
+        self.buckets = buckets
+        self._series = {}
+
+    def observe(self, labels, value):
+        series = self._series.get(labels)
+        if series is None:
+            series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+        series[0][bisect_left(self.buckets, value)] += 1
+        series[1] += value
+        series[2] += 1
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        for labels, (counts, total, count) in sorted(self._series.items()):
+            base = _labels(self.label_names, labels)
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + ('+Inf',), counts):
+                cumulative += bucket_count
+                lines.append(f'{self.name}_bucket{{{base}{"," if base else ""}le="{bound}"}} {cumulative}')
+            lines.append(f"{self.name}_sum{{{base}}} {total}")
+            lines.append(f"{self.name}_count{{{base}}} {count}")
+        return lines
+
+
+class Counter:
+
+    def __init__(self, name, help_text, label_names):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = label_names
+        self._series = {}
+
+    def inc(self, labels, amount=1):
+        self._series[labels] = self._series.get(labels, 0) + amount
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} counter"]
+        for labels, value in sorted(self._series.items()):
+            lines.append(f"{self.name}{{{_labels(self.label_names, labels)}}} {value}")
+        return lines
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _labels(names, values):
+    return ','.join(f'{name}="{_escape(value)}"' for name, value in zip(names, values))
+
+
+class Metrics:
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.slow_query_seconds = 0.2
+        self.token = None
+        self.collectors = []
+        self._listening = False
+        self.request_latency = Histogram(
+            'staffhub_request_duration_seconds', 'Request latency by route.',
+            ('route', 'method'), LATENCY_BUCKETS)
+        self.requests = Counter(
+            'staffhub_requests_total', 'Requests by route and status.',
+            ('route', 'method', 'status'))
+        self.sql_queries = Histogram(
+            'staffhub_request_sql_queries', 'SQL statements executed per request.',
+            ('route',), QUERY_COUNT_BUCKETS)
+        self.sql_time = Histogram(
+            'staffhub_request_sql_duration_seconds', 'Time spent in SQL per request.',
+            ('route',), LATENCY_BUCKETS)
+        self.slow_queries = Counter(
+            'staffhub_slow_queries_total', 'Statements slower than the slow query threshold.',
+            ('route',))
+
+    def init_app(self, app):
+        self.slow_query_seconds = app.config.get('SLOW_QUERY_MS', 200) / 1000
+        self.token = app.config.get('METRICS_TOKEN')
+        app.before_request(self._start_request)
+        app.after_request(self._finish_request)
+        app.add_url_rule('/metrics', 'metrics', self.metrics_view)
+        if not self._listening:
+            # Listening on the Engine class covers every engine of every app
+            event.listen(Engine, 'before_cursor_execute', self._before_cursor_execute)
+            event.listen(Engine, 'after_cursor_execute', self._after_cursor_execute)
+            self._listening = True
+
+    def add_collector(self, collector):
+        """Register a callable returning extra exposition lines at scrape time."""
+        self.collectors.append(collector)
+
+    @staticmethod
+    def _route():
+        return request.url_rule.rule if request.url_rule is not None else 'unmatched'
+
+    def _start_request(self):
+        g.metrics_start = time.perf_counter()
+        g.sql_queries = 0
+        g.sql_seconds = 0.0
+
+    def _finish_request(self, response):
+        start = g.get('metrics_start')
+        if start is None:
+            return response
+        route = self._route()
+        elapsed = time.perf_counter() - start
+        with self._lock:
+            self.request_latency.observe((route, request.method), elapsed)
+            self.requests.inc((route, request.method, response.status_code))
+            self.sql_queries.observe((route,), g.sql_queries)
+            self.sql_time.observe((route,), g.sql_seconds)
+        return response
+
+    def _before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault('query_start', []).append(time.perf_counter())
+
+    def _after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        starts = conn.info.get('query_start')
+        if not starts:
+            return
+        elapsed = time.perf_counter() - starts.pop()
+        route = None
+        if has_request_context() and 'sql_queries' in g:
+            g.sql_queries += 1
+            g.sql_seconds += elapsed
+            route = self._route()
+        if route is not None and elapsed >= self.slow_query_seconds:
+            slow_query_log.warning("Slow query (%.1f ms) on %s: %s", elapsed * 1000, route, statement)
+            with self._lock:
+                self.slow_queries.inc((route,))
+
+    def render(self):
+        with self._lock:
+            lines = []
+            for metric in (self.request_latency, self.requests, self.sql_queries,
+                           self.sql_time, self.slow_queries):
+                lines.extend(metric.render())
+        for collector in self.collectors:
+            lines.extend(collector())
+        return '\n'.join(lines) + '\n'
+
+    def metrics_view(self):
+        if self.token and request.headers.get('Authorization') != f'Bearer {self.token}':
+            abort(401)
+        return Response(self.render(), mimetype='text/plain; version=0.0.4')
+
+
+metrics = Metrics()
@@ -0,0 +1,126 @@
+"""Versioned schema migrations.
+
+Each migration runs once, in its own transaction, and is recorded in the
+``schema_version`` table. ``upgrade()`` applies whatever is pending and is
+safe to run repeatedly; it is meant for a release step or the ``init-db``
+CLI command, never for the worker import path.
+
+Migrations must also be idempotent on their own, because databases created
+before versioning existed already have some of the objects they create. They
+name the indexes they create: the models declare the latest schema, whose
+columns an older database only has once later migrations have run.
+"""
+from datetime import datetime
+
+from sqlalchemy import Column, DateTime, Integer, MetaData, String, Table, func, inspect, select
+
+from models import db, User, Employee, DepartmentStats, AuditLog, EmployeeClosure
+from hierarchy import rebuild_closure
+from search import install_search_index
+from summary import rebuild_department_stats
+
+_version_metadata = MetaData()
+
+schema_version = Table(
+    'schema_version', _version_metadata,
+    Column('version', Integer, primary_key=True),
+    Column('description', String(200), nullable=False),
+    Column('applied_at', DateTime, nullable=False),
+)
+
+MIGRATIONS = []
+
+
+def migration(version, description):
+    """Register a migration function taking an open connection."""
+    def decorator(f):
+        MIGRATIONS.append((version, description, f))
+        MIGRATIONS.sort(key=lambda m: m[0])
+        return f
+    return decorator
+
+
+@migration(1, 'Create base tables')
+def create_base_tables(conn):
+    for model in (User, Employee):
+        model.__table__.create(conn, checkfirst=True)
+
+
+def create_indexes(conn, model, *names):
+    """Create the named indexes declared on ``model`` unless they exist."""
+    indexes = {index.name: index for index in model.__table__.indexes}
+    for name in names:
+        indexes[name].create(conn, checkfirst=True)
+
+
+@migration(2, 'Index listing filter and sort columns')
+def create_listing_indexes(conn):
+    create_indexes(conn, User, 'ix_user_role')
+    create_indexes(conn, Employee, 'ix_employee_department_name_id', 'ix_employee_name_id')
+
+
+@migration(3, 'Full-text employee search index')
+def create_search_index(conn):
+    install_search_index(conn)
+
+
+@migration(4, 'Covering index for salary analytics')
+def create_salary_index(conn):
+    create_indexes(conn, Employee, 'ix_employee_department_salary')
+
+
+@migration(5, 'Department headcount and payroll summary')
+def create_department_stats(conn):
+    DepartmentStats.__table__.create(conn, checkfirst=True)
+    rebuild_department_stats(conn)
+
+
+@migration(6, 'Audit log of employee and account changes')
+def create_audit_log(conn):
+    AuditLog.__table__.create(conn, checkfirst=True)
+
+
+@migration(7, 'Reporting lines and org chart closure table')
+def create_reporting_lines(conn):
+    for column in (Employee.__table__.c.manager_id, User.__table__.c.employee_id):
+        add_column(conn, column)
+    EmployeeClosure.__table__.create(conn, checkfirst=True)
+    create_indexes(conn, Employee, 'ix_employee_manager_name_id')
+    rebuild_closure(conn)
+
+
+def add_column(conn, column):
+    """``ALTER TABLE ... ADD COLUMN`` for a nullable model column the table predates."""
+    if column.name in {c['name'] for c in inspect(conn).get_columns(column.table.name)}:
+        return
+    preparer = conn.dialect.identifier_preparer
+    ddl = (f"ALTER TABLE {preparer.format_table(column.table)} "
+           f"ADD COLUMN {preparer.format_column(column)} {column.type.compile(conn.dialect)}")
+    for key in column.foreign_keys:
+        ddl += f" REFERENCES {preparer.format_table(key.column.table)} ({preparer.format_column(key.column)})"
+    conn.exec_driver_sql(ddl)
+
+
+def current_version(conn):
+    schema_version.create(conn, checkfirst=True)
+    return conn.execute(select(func.max(schema_version.c.version))).scalar() or 0
+
+
+def upgrade():
+    """Apply pending migrations. Returns the list of versions applied."""
+    engine = db.engine
+    with engine.begin() as conn:
+        version = current_version(conn)
+
+    applied = []
+    for number, description, apply in MIGRATIONS:
+        if number <= version:
+            continue
+        with engine.begin() as conn:
+            apply(conn)
+            conn.execute(schema_version.insert().values(
+                version=number, description=description, applied_at=datetime.utcnow()
+            ))
+        print(f"Applied migration {number}: {description}")
+        applied.append(number)
+    return applied
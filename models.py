@@ -1,8 +1,12 @@
 from flask_sqlalchemy import SQLAlchemy
 from flask_login import UserMixin
-from enum import Enum
+from enum import Enum, IntFlag
+import json
+from types import MappingProxyType
+from routing import RoutingSession
 
-db = SQLAlchemy()
+# The routing session sends reads to replicas when any are configured
+db = SQLAlchemy(session_options={'class_': RoutingSession})
 
 class Role(Enum):
     ADMIN = "admin"
@@ -10,24 +14,46 @@ class Role(Enum):
     MANAGER = "manager"
     EMPLOYEE = "employee"
 
+class Permission(IntFlag):
+    CREATE = 1
+    READ = 2
+    UPDATE = 4
+    DELETE = 8
+    MANAGE_USERS = 16
+
+# Frozen lookup tables so permission checks are a dict hit and a bit test
+PERMISSION_NAMES = MappingProxyType({permission.name.lower(): permission for permission in Permission})
+
+ROLE_PERMISSIONS = MappingProxyType({
+    Role.ADMIN.value: Permission.CREATE | Permission.READ | Permission.UPDATE | Permission.DELETE | Permission.MANAGE_USERS,
+    Role.HR.value: Permission.CREATE | Permission.READ | Permission.UPDATE | Permission.DELETE,
+    Role.MANAGER.value: Permission.READ | Permission.UPDATE,
+    Role.EMPLOYEE.value: Permission.READ
+})
+
 class User(UserMixin, db.Model):
     id = db.Column(db.Integer, primary_key=True)
     username = db.Column(db.String(150), unique=True, nullable=False)
     password = db.Column(db.String(200), nullable=False)
-    role = db.Column(db.String(50), nullable=False, default=Role.EMPLOYEE.value)
+    role = db.Column(db.String(50), nullable=False, default=Role.EMPLOYEE.value, index=True)
     full_name = db.Column(db.String(200), nullable=True)
     email = db.Column(db.String(150), unique=True, nullable=True)
     is_active = db.Column(db.Boolean, default=True)
+    # The account holder's own employee record; a manager sees the subtree below it
+    employee_id = db.Column(db.Integer, nullable=True)
+    
+    @property
+    def permissions(self):
+        """Permission bitmask granted by the user's role"""
+        return ROLE_PERMISSIONS.get(self.role, Permission(0))
     
     def has_permission(self, permission):
-        """Check if user has specific permission based on role"""
-        role_permissions = {
-            Role.ADMIN.value: ['create', 'read', 'update', 'delete', 'manage_users'],
-            Role.HR.value: ['create', 'read', 'update', 'delete'],
-            Role.MANAGER.value: ['read', 'update'],
-            Role.EMPLOYEE.value: ['read']
-        }
-        return permission in role_permissions.get(self.role, [])
+        """Check if user has specific permission (name or Permission flag) based on role"""
+        if isinstance(permission, str):
+            permission = PERMISSION_NAMES.get(permission)
+            if permission is None:
+                return False
+        return self.permissions & permission == permission
     
     def can_manage_users(self):
         return self.role == Role.ADMIN.value
@@ -49,9 +75,68 @@ class User(UserMixin, db.Model):
         return self.role in [Role.ADMIN.value, Role.HR.value]
 
 class Employee(db.Model):
+    __table_args__ = (
+        # Serves department-filtered listings and keyset pagination seeks
+        db.Index('ix_employee_department_name_id', 'department', 'name', 'id'),
+        # Serves the unfiltered listing, which is ordered by name
+        db.Index('ix_employee_name_id', 'name', 'id'),
+        # Covers the per-department salary aggregates; without it SQLite walks
+        # the department/name index and looks up every row for its salary
+        db.Index('ix_employee_department_salary', 'department', 'salary'),
+        # Serves direct reports of a manager in name order (org chart); created
+        # by migration 7, which adds manager_id to older databases
+        db.Index('ix_employee_manager_name_id', 'manager_id', 'name', 'id'),
+    )
+
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(150), nullable=False)
     email = db.Column(db.String(150), unique=True, nullable=False)
     department = db.Column(db.String(100), nullable=False)
     position = db.Column(db.String(100), nullable=False)
     salary = db.Column(db.Integer, nullable=False)
+    manager_id = db.Column(db.Integer, db.ForeignKey('employee.id'), nullable=True)
+
+class DepartmentStats(db.Model):
+    """Headcount and payroll per department, maintained by ``summary``."""
+    __tablename__ = 'department_stats'
+
+    department = db.Column(db.String(100), primary_key=True)
+    headcount = db.Column(db.Integer, nullable=False, default=0)
+    payroll = db.Column(db.BigInteger, nullable=False, default=0)
+
+class EmployeeClosure(db.Model):
+    """Every (manager, report) pair at any distance, maintained by ``hierarchy``."""
+    __tablename__ = 'employee_closure'
+    __table_args__ = (
+        # Serves the chain of managers above an employee, nearest first
+        db.Index('ix_employee_closure_descendant', 'descendant_id', 'depth'),
+    )
+
+    # The primary key serves "everyone under X" as one range scan
+    ancestor_id = db.Column(db.Integer, primary_key=True)
+    descendant_id = db.Column(db.Integer, primary_key=True)
+    # 1 for a direct report, 2 for a report's report, ...
+    depth = db.Column(db.Integer, nullable=False)
+
+class AuditLog(db.Model):
+    """One committed change to an employee or user account, written by ``audit``."""
+    __tablename__ = 'audit_log'
+    __table_args__ = (
+        # Serves the per-record history view, newest first
+        db.Index('ix_audit_log_entity', 'entity_type', 'entity_id', 'id'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    entity_type = db.Column(db.String(20), nullable=False)
+    entity_id = db.Column(db.Integer, nullable=False)
+    action = db.Column(db.String(10), nullable=False)
+    # JSON object of {field: [old, new]}
+    changes = db.Column(db.Text, nullable=False)
+    actor_id = db.Column(db.Integer, nullable=True)
+    actor_name = db.Column(db.String(150), nullable=True)
+    created_at = db.Column(db.DateTime, nullable=False)
+
+    @property
+    def fields(self):
+        """``[(field, old, new), ...]`` sorted by field name"""
+        return [(field, old, new) for field, (old, new) in sorted(json.loads(self.changes).items())]
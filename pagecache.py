@@ -0,0 +1,95 @@
+"""Response caching for the dashboard.
+
+Two layers share ``page_cache``, whose generation every employee write
+bumps through ``invalidate_employee_caches()``:
+
+* ``cached_fragment()`` keeps the rendered employee listing per path, query
+  arguments and role (and, for managers, their team). What the listing
+  shows depends only on those, so every HR user viewing the same page and
+  filters reuses one render.
+* ``cached_response()`` keeps the whole page gzip-compressed per user, since
+  the header greets the user by name. Stored pages carry an ETag and
+  Last-Modified, so a browser revalidating an unchanged page gets a 304
+  without a body; clients that accept gzip get the stored bytes as-is.
+
+Responses that show flashed messages are never cached or served from cache.
+Both layers read from replicas like the rest of a GET request; see
+``routing.cached_read()`` for how long such renders are kept.
+"""
+import gzip
+import hashlib
+from datetime import datetime, timezone
+from functools import wraps
+
+from flask import request, session, make_response
+from flask_login import current_user
+from markupsafe import Markup
+
+from cache import page_cache, user_cache
+from hierarchy import is_scoped
+from routing import cache_ttl, cached_read, replica_router
+
+_MISSING = object()
+
+
+def _request_key():
+    return request.path, tuple(sorted(request.args.items(multi=True)))
+
+
+def cached_fragment(name, render):
+    """Return ``render()`` (an HTML string) cached for this path, query and role.
+
+    Managers only see their own subtree, so their renders are also keyed by
+    the employee record they are linked to.
+    """
+    scope = current_user.employee_id if is_scoped(current_user) else None
+    key = ('fragment', name, *_request_key(), current_user.role, scope)
+    return Markup(cached_read(page_cache, key, render))
+
+
+def _accepts_gzip():
+    return 'gzip' in request.accept_encodings
+
+
+def cached_response(view):
+    """Cache a GET view's page per user until the next employee write."""
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        if request.method != 'GET' or session.get('_flashes'):
+            return view(*args, **kwargs)
+
+        # User edits bump user_cache, so a renamed user is not greeted by the old name
+        key = ('page', *_request_key(), current_user.get_id(), user_cache.generation)
+        generation = page_cache.generation
+        # Right after their own write, a user gets a fresh page rather than one
+        # another user's request filled from a lagging replica
+        entry = _MISSING if replica_router.is_sticky() else page_cache.get(key, _MISSING)
+        if entry is _MISSING:
+            response = make_response(view(*args, **kwargs))
+            if response.status_code != 200 or response.direct_passthrough:
+                return response
+            body = response.get_data()
+            entry = {
+                'body': gzip.compress(body, compresslevel=6),
+                'etag': hashlib.sha1(body).hexdigest(),
+                'last_modified': datetime.now(timezone.utc).replace(microsecond=0),
+                'mimetype': response.mimetype,
+            }
+            page_cache.set(key, entry, generation, cache_ttl())
+
+        if _accepts_gzip():
+            response = make_response(entry['body'])
+            response.headers['Content-Encoding'] = 'gzip'
+            # A different representation of the same page needs its own tag
+            response.set_etag(entry['etag'] + '-gz')
+        else:
+            response = make_response(gzip.decompress(entry['body']))
+            response.set_etag(entry['etag'])
+        response.mimetype = entry['mimetype']
+        response.last_modified = entry['last_modified']
+        response.vary.update(('Accept-Encoding', 'Cookie'))
+        # Private to this user and revalidated on every view
+        response.cache_control.private = True
+        response.cache_control.no_cache = True
+        return response.make_conditional(request)
+    return wrapper
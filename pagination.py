@@ -0,0 +1,77 @@
+"""Keyset (seek) pagination for the employee listing.
+
+Instead of ``OFFSET n`` the next page is fetched with
+``WHERE (name, id) > (:name, :id) ORDER BY name, id LIMIT n``, which the
+``(department, name, id)`` index answers directly, so page 10,000 costs
+the same as page 1. The cursor is the ``name,id`` of the last row shown.
+"""
+from sqlalchemy import tuple_
+
+from models import Employee
+
+
+def encode_cursor(employee):
+    return f"{employee.name},{employee.id}"
+
+
+def decode_cursor(cursor):
+    """Parse an ``after`` cursor; returns ``None`` for the first page.
+
+    Names may contain commas, so only the last comma separates the id.
+    """
+    if not cursor:
+        return None
+    name, sep, employee_id = cursor.rpartition(',')
+    if not sep or not employee_id.isdigit():
+        return None
+    return name, int(employee_id)
+
+
+class KeysetPage:
+    """One page of a keyset listing.
+
+    ``total`` is only known when the caller asked for a count.
+    """
+    keyset = True
+
+    def __init__(self, items, per_page, after=None, next_cursor=None, total=None):
+        self.items = items
+        self.per_page = per_page
+        self.after = after
+        self.next_cursor = next_cursor
+        self.total = total
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+    @property
+    def is_first(self):
+        return not self.after
+
+    @property
+    def pages(self):
+        if self.total is None:
+            return None
+        return max(1, -(-self.total // self.per_page))
+
+
+def keyset_paginate(query, after=None, per_page=10, with_count=False):
+    """Fetch the page of ``query`` that follows the ``after`` cursor.
+
+    ``query`` must not carry its own ORDER BY; rows are ordered by
+    ``(name, id)``. One extra row is read to know whether a next page exists.
+    """
+    total = query.order_by(None).count() if with_count else None
+
+    position = decode_cursor(after)
+    if position is not None:
+        query = query.filter(tuple_(Employee.name, Employee.id) > tuple_(*position))
+
+    rows = query.order_by(Employee.name, Employee.id).limit(per_page + 1).all()
+    next_cursor = None
+    if len(rows) > per_page:
+        rows = rows[:per_page]
+        next_cursor = encode_cursor(rows[-1])
+
+    return KeysetPage(rows, per_page, after=after, next_cursor=next_cursor, total=total)
@@ -0,0 +1,113 @@
+"""Password hashing off the request thread.
+
+Hashing and verifying passwords is deliberately slow. Doing it inline ties
+up a worker for the whole computation, so during a login storm every other
+request queues behind it. ``PasswordHasher`` runs the work in a small
+process pool instead, with a bounded number of jobs in flight: when the
+pool is saturated callers wait up to ``timeout`` seconds for a slot and then
+get ``HasherBusy`` rather than piling up without limit.
+
+With ``workers = 0`` everything runs inline, which is what tests and the
+development server want.
+"""
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeout
+from concurrent.futures.process import BrokenProcessPool
+
+from werkzeug.security import check_password_hash, generate_password_hash
+
+
+class HasherBusy(Exception):
+    """Raised when no hashing slot frees up within the timeout."""
+
+
+class PasswordHasher:
+
+    def __init__(self, method='pbkdf2:sha256:600000', workers=0, max_pending=None, timeout=10):
+        self._lock = threading.Lock()
+        self._executor = None
+        self._pid = None
+        self.configure(method, workers, max_pending, timeout)
+
+    def init_app(self, app):
+        self.configure(
+            method=app.config.get('PASSWORD_HASH_METHOD', self.method),
+            workers=app.config.get('PASSWORD_HASH_WORKERS', self.workers),
+            max_pending=app.config.get('PASSWORD_HASH_MAX_PENDING'),
+            timeout=app.config.get('PASSWORD_HASH_TIMEOUT', self.timeout)
+        )
+
+    def configure(self, method, workers, max_pending=None, timeout=10):
+        self.shutdown()
+        self.method = method
+        self.workers = workers
+        self.timeout = timeout
+        # Enough queued jobs to keep every process busy, and no more
+        self.max_pending = max_pending or max(1, workers) * 4
+        self._slots = threading.BoundedSemaphore(self.max_pending)
+        self._canonical_method = None
+        # The pool starts lazily inside threaded workers, and forking a process
+        # with other threads running can deadlock the child on a lock one of
+        # them held. A fork server is a clean single-threaded process to fork
+        # from; without one, pool processes are spawned
+        self.start_method = 'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+
+    def _pool(self):
+        # Created lazily and per process, so it is never inherited across a fork
+        with self._lock:
+            if self._executor is None or self._pid != os.getpid():
+                context = multiprocessing.get_context(self.start_method)
+                if self.start_method == 'forkserver':
+                    # Pool processes then start with only what hashing needs imported
+                    context.set_forkserver_preload(['werkzeug.security'])
+                self._executor = ProcessPoolExecutor(max_workers=self.workers, mp_context=context)
+                self._pid = os.getpid()
+            return self._executor
+
+    def _run(self, fn, *args):
+        if not self.workers:
+            return fn(*args)
+        if not self._slots.acquire(timeout=self.timeout):
+            raise HasherBusy("Too many password operations in progress")
+        try:
+            future = self._pool().submit(fn, *args)
+        except BaseException:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+        try:
+            return future.result(timeout=self.timeout)
+        except FutureTimeout:
+            # Frees the slot if the job has not started; a running one frees it when done
+            future.cancel()
+            raise HasherBusy("Password operation timed out")
+        except BrokenProcessPool:
+            # A pool process died; start a fresh pool next time and answer now
+            with self._lock:
+                self._executor = None
+            return fn(*args)
+
+    def hash(self, password):
+        return self._run(generate_password_hash, password, self.method)
+
+    def verify(self, pwhash, password):
+        return self._run(check_password_hash, pwhash, password)
+
+    def needs_rehash(self, pwhash):
+        """True if ``pwhash`` was made with different parameters than ``method``."""
+        if self._canonical_method is None:
+            # Werkzeug records the fully expanded method (e.g. the default
+            # iteration count) in the hash; learn it once from a real hash
+            self._canonical_method = self.hash('').split('$', 1)[0]
+        return pwhash.split('$', 1)[0] != self._canonical_method
+
+    def shutdown(self):
+        with self._lock:
+            if self._executor is not None and self._pid == os.getpid():
+                self._executor.shutdown(wait=True)
+            self._executor = None
+
+
+password_hasher = PasswordHasher()
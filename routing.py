@@ -0,0 +1,201 @@
+"""Read-replica routing for the ORM session.
+
+With ``DATABASE_REPLICA_URLS`` set, each replica becomes a Flask-SQLAlchemy
+bind (``replica_0``, ``replica_1``, ...). ``RoutingSession.get_bind`` sends
+SELECTs to a replica during GET/HEAD requests and inside ``replica_reads()``;
+everything else goes to the primary, and so does every statement once the
+session has written something.
+
+A session picks one replica, round-robin, and keeps it, so one request
+reads one consistent copy. A replica that cannot be reached is skipped for
+``REPLICA_RETRY_SECONDS``; with none left, reads fall back to the primary.
+
+Replicas lag behind the primary. After a request commits a write, the same
+user's requests read from the primary for ``REPLICA_STICKY_SECONDS`` so they
+see what they just saved. Cached values normally live until the next write,
+which would keep a lagging replica's answer around as current, so:
+
+* reports and listings are cached through ``cached_read()``: filled from a
+  replica they are kept for ``REPLICA_CACHE_SECONDS`` only, and a user
+  inside the sticky window reads past the cache to the primary;
+* what decides access (user snapshots, a manager's team) is filled through
+  ``from_primary()``.
+"""
+import itertools
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from flask import g, has_request_context, request, session as flask_session
+from flask_sqlalchemy.session import Session
+from sqlalchemy import event
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.sql import Select
+
+log = logging.getLogger('staffhub.replicas')
+
+REPLICA_BIND_PREFIX = 'replica_'
+_STICKY_KEY = 'primary_until'
+_UNSET = object()
+_forced_route = ContextVar('staffhub_read_route', default=None)
+
+
+def replica_binds(urls):
+    """``SQLALCHEMY_BINDS`` entries for a comma-separated list of replica URLs."""
+    urls = [url.strip() for url in urls.split(',') if url.strip()]
+    return {f'{REPLICA_BIND_PREFIX}{index}': url for index, url in enumerate(urls)}
+
+
+class ReplicaRouter:
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._turn = itertools.count()
+        self._down_until = {}
+        self.keys = ()
+        self.sticky_seconds = 10
+        self.retry_seconds = 30
+        self.cache_seconds = 5
+
+    def init_app(self, app):
+        binds = app.config.get('SQLALCHEMY_BINDS') or {}
+        self.keys = tuple(sorted(key for key in binds if key.startswith(REPLICA_BIND_PREFIX)))
+        self.sticky_seconds = app.config.get('REPLICA_STICKY_SECONDS', self.sticky_seconds)
+        self.retry_seconds = app.config.get('REPLICA_RETRY_SECONDS', self.retry_seconds)
+        self.cache_seconds = app.config.get('REPLICA_CACHE_SECONDS', self.cache_seconds)
+        if self.keys:
+            app.before_request(self._route_request)
+
+    def _route_request(self):
+        g.replica_reads = (request.method in ('GET', 'HEAD')
+                           and flask_session.get(_STICKY_KEY, 0) < time.time())
+
+    def pick(self, engines):
+        """Engine of the next reachable replica, or None for the primary."""
+        for _ in self.keys:
+            with self._lock:
+                key = self.keys[next(self._turn) % len(self.keys)]
+            if self._down_until.get(key, 0) > time.monotonic():
+                continue
+            engine = engines[key]
+            try:
+                with engine.connect():
+                    pass
+            except DBAPIError as e:
+                log.warning("Replica %s unavailable, skipping for %ss: %s",
+                            key, self.retry_seconds, e.orig)
+                self._down_until[key] = time.monotonic() + self.retry_seconds
+                continue
+            return engine
+        return None
+
+    def mark_sticky(self):
+        """Send this user's reads to the primary for ``sticky_seconds``."""
+        if self.keys and has_request_context():
+            flask_session[_STICKY_KEY] = time.time() + self.sticky_seconds
+
+    def is_sticky(self):
+        """True while this user's reads go to the primary after their own write."""
+        return (bool(self.keys) and has_request_context()
+                and flask_session.get(_STICKY_KEY, 0) >= time.time())
+
+
+replica_router = ReplicaRouter()
+
+
+def reads_replica():
+    """True when SELECTs made now go to a replica, unless the session has written."""
+    if not replica_router.keys:
+        return False
+    forced = _forced_route.get()
+    if forced is not None:
+        return forced == 'replica'
+    return has_request_context() and g.get('replica_reads', False)
+
+
+class RoutingSession(Session):
+
+    def _reads_from_replica(self):
+        return not self.info.get('wrote') and reads_replica()
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and isinstance(clause, Select) and self._reads_from_replica():
+            replica = self.info.get('replica', _UNSET)
+            if replica is _UNSET:
+                replica = self.info['replica'] = replica_router.pick(self._db.engines)
+            if replica is not None:
+                return replica
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+@event.listens_for(RoutingSession, 'after_flush')
+def _flushed(session, flush_context):
+    session.info['wrote'] = True
+
+
+@event.listens_for(RoutingSession, 'do_orm_execute')
+def _executed(orm_execute_state):
+    # Bulk INSERT/UPDATE statements bypass the flush
+    if not orm_execute_state.is_select:
+        orm_execute_state.session.info['wrote'] = True
+
+
+@event.listens_for(RoutingSession, 'after_commit')
+def _committed(session):
+    if session.info.get('wrote'):
+        replica_router.mark_sticky()
+
+
+@contextmanager
+def _route(target):
+    token = _forced_route.set(target)
+    try:
+        yield
+    finally:
+        _forced_route.reset(token)
+
+
+def replica_reads():
+    """Read from a replica even outside a GET request (reports, scripts)."""
+    return _route('replica')
+
+
+def primary_reads():
+    """Read from the primary even during a GET request."""
+    return _route('primary')
+
+
+def from_primary(compute):
+    """Wrap a cache fill so it reads from the primary.
+
+    Cached values live until the next write bumps the generation; computed
+    from a lagging replica they would stay stale for that whole time.
+    """
+    def wrapper():
+        with primary_reads():
+            return compute()
+    return wrapper
+
+
+def cache_ttl():
+    """TTL for a value computed now: None (the cache's own) unless it came from a replica."""
+    return replica_router.cache_seconds if reads_replica() else None
+
+
+def cached_read(cache, key, compute):
+    """``cache.get_or_compute(key, compute)`` for reads a replica may answer.
+
+    A value read from a replica may lag the primary, so it is kept for
+    ``REPLICA_CACHE_SECONDS`` rather than until the next write. A user who
+    just wrote skips the cache: an entry someone else filled from a replica
+    could hide their change. Their value, read from the primary, is stored
+    for everyone.
+    """
+    if not replica_router.is_sticky():
+        return cache.get_or_compute(key, compute, cache_ttl())
+    generation = cache.generation
+    value = compute()
+    cache.set(key, value, generation)
+    return value
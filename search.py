@@ -0,0 +1,178 @@
+"""Full-text search for the employee directory.
+
+SQLite uses an FTS5 external-content table that triggers keep in sync with
+``employee``; PostgreSQL uses a GIN expression index over a ``tsvector``.
+Any other backend, or a SQLite build without FTS5, falls back to the
+original LIKE scan so search keeps working everywhere.
+"""
+import re
+from contextlib import contextmanager
+
+from sqlalchemy import column, func, literal_column, table, text
+
+from models import db, Employee
+
+FTS_TABLE = 'employee_fts'
+
+_TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+
+_fts = table(FTS_TABLE, column('rowid'), column('rank'))
+
+# Column names are unqualified in the index and qualified in queries;
+# PostgreSQL matches the two as the same expression.
+_PG_VECTOR_SQL = "to_tsvector('simple', {p}name || ' ' || {p}email || ' ' || {p}\"position\")"
+
+_SQLITE_DDL = [
+    f"""CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+        name, email, position,
+        content='employee', content_rowid='id',
+        tokenize='unicode61', prefix='2 3'
+    )""",
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ai AFTER INSERT ON employee BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, name, email, position)
+        VALUES (new.id, new.name, new.email, new.position);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ad AFTER DELETE ON employee BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, name, email, position)
+        VALUES ('delete', old.id, old.name, old.email, old.position);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_au AFTER UPDATE OF name, email, position ON employee BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, name, email, position)
+        VALUES ('delete', old.id, old.name, old.email, old.position);
+        INSERT INTO {FTS_TABLE}(rowid, name, email, position)
+        VALUES (new.id, new.name, new.email, new.position);
+    END""",
+]
+
+_POSTGRES_DDL = [
+    "CREATE INDEX IF NOT EXISTS ix_employee_search ON employee "
+    "USING GIN (" + _PG_VECTOR_SQL.format(p='') + ")",
+]
+
+# Backend detected per engine URL: 'fts5', 'tsvector' or 'like'
+_backends = {}
+
+
+def install_search_index(conn):
+    """Create the search index on ``conn``'s database and backfill it.
+
+    Safe to run repeatedly. Returns the backend that ended up active.
+    """
+    dialect = conn.dialect.name
+    backend = 'like'
+    if dialect == 'sqlite':
+        try:
+            with conn.begin_nested():
+                for statement in _SQLITE_DDL:
+                    conn.exec_driver_sql(statement)
+                conn.exec_driver_sql(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')")
+            backend = 'fts5'
+        except Exception as e:
+            print(f"FTS5 unavailable, falling back to LIKE search: {e}")
+    elif dialect == 'postgresql':
+        for statement in _POSTGRES_DDL:
+            conn.exec_driver_sql(statement)
+        backend = 'tsvector'
+    _backends[str(conn.engine.url)] = backend
+    return backend
+
+
+@contextmanager
+def deferred_indexing(conn):
+    """Index rows inserted inside the block in one pass at the end.
+
+    Per-row trigger maintenance makes an FTS5 bulk load several times slower
+    than the insert itself. Inside this block the insert trigger is dropped
+    and the new rows are indexed with one ``INSERT ... SELECT`` before it is
+    recreated. Everything runs in a single write transaction, so other
+    connections never see the table without its trigger; the caller commits.
+    """
+    if conn.dialect.name != 'sqlite' or search_backend() != 'fts5':
+        yield
+        return
+    if not conn.connection.dbapi_connection.in_transaction:
+        # pysqlite only opens transactions implicitly before DML; take the
+        # write lock now so the DDL below is part of the same transaction
+        conn.exec_driver_sql('BEGIN IMMEDIATE')
+    start = conn.exec_driver_sql('SELECT COALESCE(MAX(id), 0) FROM employee').scalar()
+    conn.exec_driver_sql(f'DROP TRIGGER IF EXISTS {FTS_TABLE}_ai')
+    yield
+    conn.exec_driver_sql(
+        f"INSERT INTO {FTS_TABLE}(rowid, name, email, position) "
+        f"SELECT id, name, email, position FROM employee WHERE id > ?", (start,)
+    )
+    conn.exec_driver_sql(_SQLITE_DDL[1])
+
+
+def search_backend():
+    """Return the active search backend for the current database."""
+    engine = db.engine
+    key = str(engine.url)
+    if key not in _backends:
+        dialect = engine.dialect.name
+        backend = 'like'
+        if dialect == 'sqlite':
+            with engine.connect() as conn:
+                found = conn.execute(
+                    text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"),
+                    {'name': FTS_TABLE}
+                ).first()
+            if found:
+                backend = 'fts5'
+        elif dialect == 'postgresql':
+            backend = 'tsvector'
+        _backends[key] = backend
+    return _backends[key]
+
+
+def search_tokens(search):
+    """Split a search box string into lower-case word tokens."""
+    return _TOKEN_RE.findall(search.lower())
+
+
+def like_filter(query, search):
+    """The original unindexed substring scan over name, email and position."""
+    return query.filter(
+        (Employee.name.contains(search)) |
+        (Employee.email.contains(search)) |
+        (Employee.position.contains(search))
+    )
+
+
+def apply_search(query, search, ranked=True, backend=None):
+    """Filter an ``Employee`` query by ``search``.
+
+    Every word in ``search`` must match the start of a word in the name,
+    email or position. With ``ranked`` the best matches come first; callers
+    that need a stable ordering of their own (keyset pagination) pass
+    ``ranked=False``.
+    """
+    tokens = search_tokens(search)
+    backend = backend or search_backend()
+    if not tokens or backend == 'like':
+        return like_filter(query, search)
+
+    if backend == 'fts5':
+        match = ' '.join(f'"{token}"*' for token in tokens)
+        query = query.join(_fts, _fts.c.rowid == Employee.id).filter(
+            literal_column(FTS_TABLE).op('MATCH')(match)
+        )
+        if ranked:
+            query = query.order_by(_fts.c.rank)
+        return query
+
+    vector = literal_column(_PG_VECTOR_SQL.format(p='employee.'))
+    tsquery = func.to_tsquery('simple', ' & '.join(f'{token}:*' for token in tokens))
+    query = query.filter(vector.op('@@')(tsquery))
+    if ranked:
+        query = query.order_by(func.ts_rank(vector, tsquery).desc())
+    return query
+
+
+def filter_employees(query, search='', department='', ranked=True):
+    """Apply the dashboard's search box and department filter to ``query``."""
+    if search:
+        query = apply_search(query, search, ranked=ranked)
+    if department:
+        query = query.filter(Employee.department == department)
+    return query
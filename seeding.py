@@ -0,0 +1,156 @@
+"""Bulk generation of realistic sample employees.
+
+Rows are generated lazily and written in chunks with one executemany
+``INSERT`` per chunk, so seeding a million employees never holds more than
+one chunk in memory and avoids per-object ORM overhead.
+"""
+import random
+import time
+from itertools import islice
+
+from sqlalchemy import bindparam, func, select
+
+from models import db, Employee
+from search import deferred_indexing
+from hierarchy import attach_new
+from summary import apply_deltas, new_deltas, record
+from cache import invalidate_employee_caches
+
+DEPARTMENTS = ['Engineering', 'Human Resources', 'Marketing', 'Finance', 'Sales', 'Operations', 'IT Support', 'Legal', 'Research & Development', 'Customer Service']
+
+POSITIONS = {
+    'Engineering': ['Software Engineer', 'Senior Software Engineer', 'Lead Developer', 'DevOps Engineer', 'Frontend Developer', 'Backend Developer', 'Full Stack Developer', 'System Architect'],
+    'Human Resources': ['HR Manager', 'HR Specialist', 'Recruiter', 'Training Coordinator', 'Compensation Analyst'],
+    'Marketing': ['Marketing Manager', 'Digital Marketing Specialist', 'Content Creator', 'SEO Specialist', 'Brand Manager'],
+    'Finance': ['Financial Analyst', 'Accountant', 'Finance Manager', 'Budget Analyst', 'Tax Specialist'],
+    'Sales': ['Sales Manager', 'Sales Representative', 'Account Executive', 'Business Development Manager'],
+    'Operations': ['Operations Manager', 'Project Manager', 'Quality Analyst', 'Process Improvement Specialist'],
+    'IT Support': ['IT Support Specialist', 'System Administrator', 'Network Engineer', 'Help Desk Technician'],
+    'Legal': ['Legal Counsel', 'Paralegal', 'Contract Specialist', 'Compliance Officer'],
+    'Research & Development': ['Research Scientist', 'Product Manager', 'Innovation Specialist', 'R&D Engineer'],
+    'Customer Service': ['Customer Service Rep', 'Support Manager', 'Client Success Manager', 'Call Center Agent']
+}
+
+# Realistic salary ranges per department
+SALARY_RANGES = {
+    'Engineering': (70000, 130000),
+    'Human Resources': (50000, 85000),
+    'Marketing': (45000, 90000),
+    'Finance': (55000, 95000),
+    'Sales': (40000, 120000),
+    'Operations': (50000, 85000),
+    'IT Support': (45000, 75000),
+    'Legal': (80000, 150000),
+    'Research & Development': (65000, 110000),
+    'Customer Service': (35000, 60000)
+}
+
+FIRST_NAMES = ['John', 'Sarah', 'Michael', 'Emily', 'Robert', 'Lisa', 'David', 'Jennifer', 'Christopher', 'Ashley',
+               'Matthew', 'Amanda', 'Daniel', 'Jessica', 'Anthony', 'Melissa', 'Mark', 'Michelle', 'Steven', 'Kimberly',
+               'Paul', 'Amy', 'Andrew', 'Angela', 'Joshua', 'Helen', 'Kenneth', 'Deborah', 'Kevin', 'Rachel',
+               'Brian', 'Carolyn', 'George', 'Janet', 'Edward', 'Catherine', 'Ronald', 'Maria', 'Timothy', 'Heather',
+               'Jason', 'Diane', 'Jeffrey', 'Ruth', 'Ryan', 'Julie', 'Jacob', 'Joyce', 'Gary', 'Virginia']
+
+LAST_NAMES = ['Smith', 'Johnson', 'Williams', 'Brown', 'Jones', 'Garcia', 'Miller', 'Davis', 'Rodriguez', 'Martinez',
+              'Hernandez', 'Lopez', 'Gonzalez', 'Wilson', 'Anderson', 'Thomas', 'Taylor', 'Moore', 'Jackson', 'Martin',
+              'Lee', 'Perez', 'Thompson', 'White', 'Harris', 'Sanchez', 'Clark', 'Ramirez', 'Lewis', 'Robinson',
+              'Walker', 'Young', 'Allen', 'King', 'Wright', 'Scott', 'Torres', 'Nguyen', 'Hill', 'Flores']
+
+
+def generate_employee_rows(count, seed=None, start=0):
+    """Yield ``count`` employee dicts ready for a bulk insert.
+
+    On an empty table (``start == 0``) emails look like
+    ``john.smith@staffhub.com``, with a counter for repeats. When adding to
+    existing data pass the current maximum employee id as ``start``: emails
+    then carry a unique ``.<n>`` suffix above every id already in use, so
+    they cannot collide with earlier rows.
+    """
+    rng = random.Random(seed)
+    repeats = {}
+    for i in range(count):
+        dept = rng.choice(DEPARTMENTS)
+        first_name = rng.choice(FIRST_NAMES)
+        last_name = rng.choice(LAST_NAMES)
+        base_email = f"{first_name.lower()}.{last_name.lower()}"
+        if start:
+            email = f"{base_email}.{start + i}@staffhub.com"
+        else:
+            counter = repeats.get(base_email, 0)
+            repeats[base_email] = counter + 1
+            email = f"{base_email}{counter or ''}@staffhub.com"
+        yield {
+            'name': f"{first_name} {last_name}",
+            'email': email,
+            'department': dept,
+            'position': rng.choice(POSITIONS[dept]),
+            'salary': rng.randint(*SALARY_RANGES[dept])
+        }
+
+
+def assign_managers(conn, after_id, span, chunk_size=10000):
+    """Arrange employees with ``id > after_id`` into a tree, ``span`` reports per manager.
+
+    The first new employee heads the tree; the rest fill it level by level
+    in id order, so 100,000 employees with a span of 10 are five levels deep.
+    """
+    ids = conn.execute(select(Employee.id).where(Employee.id > after_id).order_by(Employee.id)).scalars().all()
+    table = Employee.__table__
+    statement = (table.update()
+                 .where(table.c.id == bindparam('report'))
+                 .values(manager_id=bindparam('manager')))
+    links = ({'report': ids[i], 'manager': ids[(i - 1) // span]} for i in range(1, len(ids)))
+    while True:
+        chunk = list(islice(links, chunk_size))
+        if not chunk:
+            break
+        conn.execute(statement, chunk)
+    attach_new(conn, after_id)
+
+
+def bulk_insert_employees(rows, chunk_size=10000, span=0):
+    """Insert an iterable of employee dicts chunk by chunk.
+
+    Each chunk is one executemany statement; the whole load is a single
+    transaction with search indexing deferred to the end and the department
+    summary updated once before commit. With ``span`` the new employees are
+    also given reporting lines (see ``assign_managers()``). Returns the
+    number of rows written.
+    """
+    rows = iter(rows)
+    statement = Employee.__table__.insert()
+    total = 0
+    deltas = new_deltas()
+    conn = db.session.connection()
+    try:
+        with deferred_indexing(conn):
+            # Read inside the write transaction, so no other writer's rows are counted as ours
+            start = conn.execute(select(func.max(Employee.id))).scalar() or 0
+            while True:
+                chunk = list(islice(rows, chunk_size))
+                if not chunk:
+                    break
+                conn.execute(statement, chunk)
+                for row in chunk:
+                    record(deltas, row['department'], row['salary'])
+                total += len(chunk)
+        if span and total:
+            assign_managers(conn, start, span, chunk_size)
+        apply_deltas(conn, deltas)
+        db.session.commit()
+        invalidate_employee_caches()
+    except Exception:
+        db.session.rollback()
+        raise
+    return total
+
+
+def seed_employees(count, seed=None, chunk_size=10000, span=10):
+    """Generate and insert ``count`` employees, ``span`` reports per manager (0 = none).
+
+    Returns ``(rows_written, seconds_taken)``.
+    """
+    start_time = time.perf_counter()
+    start = db.session.execute(select(func.max(Employee.id))).scalar() or 0
+    written = bulk_insert_employees(generate_employee_rows(count, seed=seed, start=start), chunk_size, span)
+    return written, time.perf_counter() - start_time
@@ -0,0 +1,108 @@
+"""Per-department headcount and payroll kept in ``department_stats``.
+
+The dashboard reads these totals on every view; one row per department is
+O(departments) where aggregating ``employee`` is O(employees). The table is
+maintained as deltas in the same transaction as the write that causes them:
+
+* ORM writes (add, edit, delete, API batches) are picked up by a
+  ``before_flush`` listener, which compares each changed employee with its
+  row as it is in the database just before the flush overwrites it.
+* Bulk paths that bypass the unit of work (seeding, the importer) call
+  ``apply_deltas()`` with deltas computed from their own rows.
+
+``rebuild_department_stats()`` recomputes everything from ``employee`` to
+repair drift, e.g. after editing rows by hand in SQL.
+"""
+from collections import defaultdict
+
+from sqlalchemy import event, func, inspect, select
+
+from models import db, Employee, DepartmentStats
+
+_employee = Employee.__table__
+_stats = DepartmentStats.__table__
+
+
+def new_deltas():
+    """``{department: [headcount, payroll]}`` accumulator for ``record()``."""
+    return defaultdict(lambda: [0, 0])
+
+
+def record(deltas, department, salary, sign=1):
+    """Count one employee into (``sign=1``) or out of (``sign=-1``) ``department``."""
+    entry = deltas[department]
+    entry[0] += sign
+    # Same coercion the importer applies, so deltas match what is stored
+    entry[1] += sign * int(float(salary))
+
+
+def apply_deltas(conn, deltas):
+    """Apply accumulated deltas on ``conn`` inside the caller's transaction."""
+    # Sorted, so concurrent writers lock the rows in the same order
+    for department, (headcount, payroll) in sorted(deltas.items()):
+        if not headcount and not payroll:
+            continue
+        result = conn.execute(
+            _stats.update()
+            .where(_stats.c.department == department)
+            .values(headcount=_stats.c.headcount + headcount, payroll=_stats.c.payroll + payroll)
+        )
+        if not result.rowcount:
+            conn.execute(_stats.insert().values(
+                department=department, headcount=headcount, payroll=payroll
+            ))
+
+
+def _moved(employee):
+    attrs = inspect(employee).attrs
+    return attrs.department.history.has_changes() or attrs.salary.history.has_changes()
+
+
+@event.listens_for(db.session, 'before_flush')
+def track_employee_changes(session, flush_context, instances):
+    deltas = new_deltas()
+    for obj in session.new:
+        if isinstance(obj, Employee):
+            record(deltas, obj.department, obj.salary)
+
+    deleted = [obj for obj in session.deleted if isinstance(obj, Employee)]
+    moved = [obj for obj in session.dirty
+             if isinstance(obj, Employee) and obj not in session.deleted and _moved(obj)]
+    ids = [inspect(obj).identity[0] for obj in deleted + moved]
+    if ids:
+        # The rows still hold the previous values, loaded or not in the session
+        previous = session.connection().execute(
+            select(_employee.c.department, _employee.c.salary).where(_employee.c.id.in_(ids))
+        )
+        for department, salary in previous:
+            record(deltas, department, salary, -1)
+    for obj in moved:
+        record(deltas, obj.department, obj.salary)
+
+    if deltas:
+        apply_deltas(session.connection(), deltas)
+
+
+def department_summary():
+    """Return ``[(department, headcount, payroll), ...]`` sorted by department."""
+    rows = db.session.execute(
+        select(_stats.c.department, _stats.c.headcount, _stats.c.payroll)
+        .where(_stats.c.headcount > 0)
+        .order_by(_stats.c.department)
+    )
+    return [tuple(row) for row in rows]
+
+
+def rebuild_department_stats(conn):
+    """Recompute every row from ``employee``. Returns the department count."""
+    conn.execute(_stats.delete())
+    totals = conn.execute(
+        select(_employee.c.department, func.count(_employee.c.id), func.sum(_employee.c.salary))
+        .group_by(_employee.c.department)
+    ).all()
+    if totals:
+        conn.execute(_stats.insert(), [
+            {'department': department, 'headcount': headcount, 'payroll': payroll}
+            for department, headcount, payroll in totals
+        ])
+    return len(totals)
@@ -0,0 +1,23 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Hash passwords and write audit entries inline, so tests see their effects at once
+os.environ.setdefault('PASSWORD_HASH_WORKERS', '0')
+os.environ.setdefault('AUDIT_ASYNC', '0')
+# Seeded accounts log in with the same cheap hash, so nothing is re-hashed
+os.environ.setdefault('PASSWORD_HASH_METHOD', 'pbkdf2:sha256:1000')
+
+
+@pytest.fixture
+def make_app(tmp_path):
+    """``make_app(**config)``: an app on a throwaway SQLite file unless a URI is given."""
+    from app import create_app
+
+    def make(**config):
+        config.setdefault('SQLALCHEMY_DATABASE_URI', f"sqlite:///{tmp_path / 'primary.db'}")
+        return create_app(config)
+    return make
@@ -0,0 +1,50 @@
+import pytest
+
+from app import seed_database
+from migrations import upgrade
+
+EMPLOYEE = {'name': 'Ada Lovelace', 'email': 'ada@staffhub.com', 'department': 'Finance',
+            'position': 'Analyst', 'salary': 90000}
+
+
+@pytest.fixture
+def client(make_app):
+    app = make_app()
+    with app.app_context():
+        upgrade()
+        seed_database()
+    client = app.test_client()
+    assert client.post('/login', data={'username': 'HR', 'password': 'hr123'}).status_code == 302
+    return client
+
+
+@pytest.mark.parametrize('body', [
+    b'[{"name": "A", "email": "a@x.com", "department": "D", "position": "P", "salary": 1e400}]',
+    b'[{"name": "A", "email": "a@x.com", "department": "D", "position": "P", "salary": 1e30}]',
+    b'[{"name": "A", "email": "a@x.com", "department": "D", "position": "P", "salary": NaN}]',
+])
+def test_create_rejects_unusable_salary(client, body):
+    response = client.post('/api/v1/employees', data=body, content_type='application/json')
+    assert response.status_code == 400
+    assert response.json['details'][0]['index'] == 0
+
+
+def test_update_rejects_unusable_salary(client):
+    created = client.post('/api/v1/employees', json=[EMPLOYEE]).json['items'][0]
+    response = client.patch('/api/v1/employees', data=f'[{{"id": {created["id"]}, "salary": 1e400}}]',
+                            content_type='application/json')
+    assert response.status_code == 400
+
+
+@pytest.mark.parametrize('cursor', ['garbage', 'Ada Lovelace,', 'Ada,x1'])
+def test_list_rejects_malformed_cursor(client, cursor):
+    response = client.get('/api/v1/employees', query_string={'after': cursor})
+    assert response.status_code == 400
+    assert 'cursor' in response.json['error']
+
+
+def test_list_follows_cursor(client):
+    client.post('/api/v1/employees', json=[dict(EMPLOYEE, email=f'{i}@x.com', name=f'Emp {i}') for i in range(3)])
+    first = client.get('/api/v1/employees', query_string={'limit': 2}).json
+    rest = client.get('/api/v1/employees', query_string={'limit': 2, 'after': first['next_cursor']}).json
+    assert [e['name'] for e in first['items'] + rest['items']] == ['Emp 0', 'Emp 1', 'Emp 2']
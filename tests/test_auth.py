@@ -0,0 +1,48 @@
+import pytest
+from sqlalchemy import update
+
+from app import seed_database
+from cache import SharedStore
+from migrations import upgrade
+from models import db, User, Role
+
+
+@pytest.fixture
+def make_client(make_app):
+    def make(**config):
+        app = make_app(**config)
+        with app.app_context():
+            upgrade()
+            seed_database()
+        client = app.test_client()
+        assert client.post('/login', data={'username': 'HR', 'password': 'hr123'}).status_code == 302
+        return app, client
+    return make
+
+
+def test_demotion_in_another_worker_applies_at_once(make_client, tmp_path):
+    shared_path = str(tmp_path / 'cache.db')
+    app, client = make_client(CACHE_SHARED_PATH=shared_path)
+    assert client.get('/users').status_code == 200
+
+    # Another worker demotes HR: it writes the row and bumps the shared generation
+    with app.app_context():
+        db.session.execute(update(User).where(User.username == 'HR').values(role=Role.EMPLOYEE.value))
+        db.session.commit()
+    SharedStore(shared_path).bump('users')
+
+    response = client.get('/users', follow_redirects=True)
+    assert b'permission to access this resource' in response.data
+
+
+def test_zero_user_cache_ttl_reloads_every_request(make_client):
+    app, client = make_client(USER_CACHE_TTL=0)
+    assert client.get('/users').status_code == 200
+
+    # Written without invalidating, as another worker without a shared cache would
+    with app.app_context():
+        db.session.execute(update(User).where(User.username == 'HR').values(role=Role.EMPLOYEE.value))
+        db.session.commit()
+
+    response = client.get('/users', follow_redirects=True)
+    assert b'permission to access this resource' in response.data
@@ -0,0 +1,68 @@
+import pytest
+
+from app import seed_database
+from autocomplete import prefix_index
+from bulk import bulk_changes, bulk_selection, bulk_update
+from cache import invalidate_employee_caches
+from migrations import upgrade
+from models import db, Employee
+
+
+@pytest.fixture
+def client(make_app):
+    app = make_app(AUTOCOMPLETE_REBUILD_INTERVAL=0)
+    with app.app_context():
+        upgrade()
+        seed_database()
+        db.session.add_all([
+            Employee(name='Ada Lovelace', email='ada@staffhub.com', department='Finance', position='Analyst', salary=1),
+            Employee(name='Alan Turing', email='alan@staffhub.com', department='Finance', position='Engineer', salary=2),
+        ])
+        db.session.commit()
+    # One index per process; start from scratch for this app
+    prefix_index.__init__()
+    prefix_index.init_app(app)
+    assert prefix_index.wait_ready()
+    client = app.test_client()
+    assert client.post('/login', data={'username': 'HR', 'password': 'hr123'}).status_code == 302
+    return client
+
+
+def suggest(client, text):
+    response = client.get('/api/v1/employees/autocomplete', query_string={'q': text})
+    assert response.status_code == 200
+    # Let a rebuild started by this request finish before the next one
+    if prefix_index._thread is not None:
+        prefix_index._thread.join()
+    return [item['name'] for item in response.json['items']]
+
+
+def test_prefixes_of_every_word(client):
+    assert suggest(client, 'a') == ['Ada Lovelace', 'Alan Turing']
+    assert suggest(client, 'tur') == ['Alan Turing']
+    assert suggest(client, 'ada.love') == ['Ada Lovelace']
+    assert suggest(client, 'al eng') == ['Alan Turing']
+    assert suggest(client, 'staffhub') == []
+
+
+def test_local_writes_update_the_index_without_a_rebuild(client):
+    form = {'name': 'Ada King', 'email': 'ada@staffhub.com', 'department': 'Finance',
+            'position': 'Analyst', 'salary': '1'}
+    assert client.post('/edit/1', data=form).status_code == 302
+    assert suggest(client, 'king') == ['Ada King']
+    # A salary-only edit still invalidates the caches, and is accounted for
+    assert client.post('/edit/1', data=dict(form, salary='5')).status_code == 302
+    assert client.patch('/api/v1/employees', json=[{'id': 2, 'department': 'Sales'}]).status_code == 200
+    assert client.delete('/api/v1/employees', json={'ids': [2]}).status_code == 200
+    assert suggest(client, 'a') == ['Ada King']
+    assert prefix_index.stats['builds'] == 1
+
+
+def test_unseen_writes_rebuild(client):
+    with client.application.app_context():
+        bulk_update(bulk_selection(ids=[2]), bulk_changes(position='Cryptanalyst'))
+        db.session.commit()
+        invalidate_employee_caches()
+    suggest(client, 'crypt')
+    assert suggest(client, 'crypt') == ['Alan Turing']
+    assert prefix_index.stats['builds'] == 2
@@ -0,0 +1,46 @@
+import pytest
+
+from bulk import bulk_changes, bulk_selection, bulk_update, preview
+from importer import MAX_SALARY
+from migrations import upgrade
+from models import db, Employee
+
+
+@pytest.fixture
+def app(make_app):
+    app = make_app()
+    with app.app_context():
+        upgrade()
+        db.session.add_all([
+            Employee(name='Ada Lovelace', email='ada@staffhub.com', department='Finance', position='Analyst', salary=90000),
+            Employee(name='Alan Turing', email='alan@staffhub.com', department='Finance', position='Engineer', salary=95000),
+        ])
+        db.session.commit()
+        yield app
+
+
+@pytest.mark.parametrize('mode, value', [
+    ('amount', 'inf'), ('amount', '-inf'), ('amount', 'nan'), ('amount', '1e400'), ('amount', '1e30'),
+    ('percent', 'nan'), ('percent', 'inf'), ('percent', '1e30'),
+])
+def test_rejects_unusable_salary_changes(mode, value):
+    with pytest.raises(ValueError):
+        bulk_changes(salary_mode=mode, salary_value=value)
+
+
+@pytest.mark.parametrize('mode, value', [('amount', str(MAX_SALARY)), ('percent', '1e9')])
+def test_large_raises_stop_at_the_largest_salary(app, mode, value):
+    selection = bulk_selection(department='Finance')
+    changes = bulk_changes(salary_mode=mode, salary_value=value)
+    assert preview(selection, changes)['new_payroll'] == 2 * MAX_SALARY
+
+    assert bulk_update(selection, changes) == 2
+    db.session.commit()
+    assert {e.salary for e in Employee.query} == {MAX_SALARY}
+
+
+def test_cuts_stop_at_zero(app):
+    selection = bulk_selection(department='Finance')
+    bulk_update(selection, bulk_changes(salary_mode='amount', salary_value=str(-MAX_SALARY)))
+    db.session.commit()
+    assert {e.salary for e in Employee.query} == {0}
@@ -0,0 +1,51 @@
+import pytest
+
+from app import seed_database
+from migrations import upgrade
+from models import db, Employee
+
+FORM = {'name': 'Ada Lovelace', 'email': 'ada@staffhub.com', 'department': 'Finance',
+        'position': 'Analyst', 'salary': '90000'}
+UNUSABLE = ['inf', 'nan', '', 'abc', '-5', '1e12']
+
+
+@pytest.fixture
+def app(make_app):
+    app = make_app()
+    with app.app_context():
+        upgrade()
+        seed_database()
+    return app
+
+
+@pytest.fixture
+def client(app):
+    client = app.test_client()
+    assert client.post('/login', data={'username': 'HR', 'password': 'hr123'}).status_code == 302
+    return client
+
+
+@pytest.mark.parametrize('salary', UNUSABLE)
+def test_add_rejects_unusable_salary(app, client, salary):
+    response = client.post('/add', data=dict(FORM, salary=salary))
+    assert response.status_code == 200
+    assert b'alary' in response.data
+    with app.app_context():
+        assert db.session.scalar(db.select(Employee).filter_by(email=FORM['email'])) is None
+
+
+@pytest.mark.parametrize('salary', UNUSABLE)
+def test_edit_rejects_unusable_salary(app, client, salary):
+    assert client.post('/add', data=FORM).status_code == 302
+    with app.app_context():
+        employee_id = db.session.scalar(db.select(Employee.id).filter_by(email=FORM['email']))
+    response = client.post(f'/edit/{employee_id}', data=dict(FORM, salary=salary))
+    assert response.status_code == 200
+    with app.app_context():
+        assert db.session.get(Employee, employee_id).salary == 90000
+
+
+def test_add_accepts_decimal_salary(app, client):
+    assert client.post('/add', data=dict(FORM, salary='90000.75')).status_code == 302
+    with app.app_context():
+        assert db.session.scalar(db.select(Employee.salary).filter_by(email=FORM['email'])) == 90000
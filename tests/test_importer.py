@@ -0,0 +1,73 @@
+import io
+import json
+
+import pytest
+
+from importer import MAX_SALARY, import_employees, validate_row
+from migrations import upgrade
+from models import Employee
+
+ROW = {'name': 'Ada Lovelace', 'email': 'ada@staffhub.com', 'department': 'Finance',
+       'position': 'Analyst', 'salary': '90000'}
+
+
+@pytest.fixture
+def app(make_app):
+    app = make_app()
+    with app.app_context():
+        upgrade()
+        yield app
+
+
+def run(data, fmt):
+    return list(import_employees(io.BytesIO(data), fmt))
+
+
+def ndjson(*rows):
+    return b''.join(json.dumps(row).encode() + b'\n' for row in rows)
+
+
+@pytest.mark.parametrize('salary', ['1e400', 'inf', '-inf', 'nan', str(MAX_SALARY + 1), '1e30', 'abc'])
+def test_validate_row_rejects_unusable_salaries(salary):
+    with pytest.raises(ValueError):
+        validate_row(dict(ROW, salary=salary))
+
+
+def test_validate_row_accepts_largest_salary():
+    assert validate_row(dict(ROW, salary=str(MAX_SALARY)))['salary'] == MAX_SALARY
+
+
+def test_out_of_range_salaries_fail_their_row_only(app):
+    rows = [dict(ROW, email=f'{i}@staffhub.com', salary=salary)
+            for i, salary in enumerate([1000, 1e30, 2000])]
+    # json.dumps writes floats like 1e400 as Infinity, which json.loads reads back as inf
+    rows.append(dict(ROW, email='inf@staffhub.com', salary=float('inf')))
+    events = run(ndjson(*rows), 'ndjson')
+
+    assert [(e['line'], 'salary' in e['message'].lower()) for e in events if e['event'] == 'error'] == [(2, True), (4, True)]
+    assert events[-1] == {'event': 'done', 'processed': 4, 'created': 2, 'updated': 0, 'failed': 2}
+    assert Employee.query.count() == 2
+
+
+def test_ndjson_literal_1e400_is_a_row_error(app):
+    data = b'{"name": "A", "email": "a@x.com", "department": "D", "position": "P", "salary": 1e400}\n'
+    events = run(data, 'ndjson')
+    assert events[0]['event'] == 'error' and events[0]['line'] == 1
+    assert events[-1]['failed'] == 1
+
+
+@pytest.mark.parametrize('fmt', ['csv', 'ndjson'])
+def test_non_utf8_file_ends_with_an_error(app, fmt):
+    good = b'name,email,department,position,salary\nAda,ada@x.com,D,P,1\n' if fmt == 'csv' else ndjson(ROW)
+    events = run(good + b'\xff\xfe broken\n', fmt)
+
+    errors = [e for e in events if e['event'] == 'error']
+    assert len(errors) == 1 and 'UTF-8' in errors[0]['message']
+    assert events[-1]['event'] == 'done' and events[-1]['created'] == 1
+
+
+def test_unreadable_csv_ends_with_an_error(app):
+    data = b'name,email,department,position,salary\n"Ada' + b'x' * (200 * 1024) + b'\n'
+    events = run(data, 'csv')
+    assert events[0]['event'] == 'error' and 'Unreadable CSV' in events[0]['message']
+    assert events[-1]['event'] == 'done'
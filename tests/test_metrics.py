@@ -0,0 +1,35 @@
+import logging
+
+import pytest
+from sqlalchemy import text
+
+from metrics import metrics
+from migrations import upgrade
+from models import db
+
+
+@pytest.fixture
+def app(make_app, monkeypatch):
+    app = make_app()
+    with app.app_context():
+        upgrade()
+    # Every statement counts as slow
+    monkeypatch.setattr(metrics, 'slow_query_seconds', 0)
+    return app
+
+
+def test_slow_queries_are_logged_per_route(app, caplog):
+    with caplog.at_level(logging.WARNING, logger='staffhub.sql'):
+        app.test_client().get('/login')
+        with app.test_request_context('/login'):
+            app.preprocess_request()
+            db.session.execute(text('SELECT 1'))
+    assert caplog.records
+    assert all(' on /login: ' in record.getMessage() for record in caplog.records)
+
+
+def test_statements_outside_requests_are_not_logged(app, caplog):
+    with caplog.at_level(logging.WARNING, logger='staffhub.sql'), app.app_context():
+        db.session.execute(text('SELECT 1'))
+        upgrade()
+    assert not caplog.records
@@ -0,0 +1,74 @@
+import sqlite3
+
+from sqlalchemy import inspect
+
+from migrations import MIGRATIONS, upgrade
+from models import db, Employee, User
+
+# The tables as the app created them before schema versioning existed
+BASELINE_SCHEMA = """
+CREATE TABLE user (
+    id INTEGER NOT NULL PRIMARY KEY,
+    username VARCHAR(150) NOT NULL UNIQUE,
+    password VARCHAR(200) NOT NULL,
+    role VARCHAR(50) NOT NULL,
+    full_name VARCHAR(200),
+    email VARCHAR(150) UNIQUE,
+    is_active BOOLEAN
+);
+CREATE TABLE employee (
+    id INTEGER NOT NULL PRIMARY KEY,
+    name VARCHAR(150) NOT NULL,
+    email VARCHAR(150) NOT NULL UNIQUE,
+    department VARCHAR(100) NOT NULL,
+    position VARCHAR(100) NOT NULL,
+    salary INTEGER NOT NULL
+);
+INSERT INTO employee VALUES (1, 'Ada Lovelace', 'ada@staffhub.com', 'Finance', 'Analyst', 90000);
+INSERT INTO employee VALUES (2, 'Alan Turing', 'alan@staffhub.com', 'Finance', 'Engineer', 95000);
+"""
+
+
+def assert_latest_schema():
+    inspector = inspect(db.engine)
+    for model in (User, Employee):
+        table = model.__table__
+        assert {c.name for c in table.columns} <= {c['name'] for c in inspector.get_columns(table.name)}
+        assert {i.name for i in table.indexes} <= {i['name'] for i in inspector.get_indexes(table.name)}
+    assert {'employee_closure', 'department_stats', 'audit_log'} <= set(inspector.get_table_names())
+
+
+def test_upgrade_from_baseline_schema(make_app, tmp_path):
+    path = tmp_path / 'baseline.db'
+    with sqlite3.connect(path) as conn:
+        conn.executescript(BASELINE_SCHEMA)
+    app = make_app(SQLALCHEMY_DATABASE_URI=f'sqlite:///{path}')
+
+    with app.app_context():
+        assert upgrade() == [number for number, _, _ in MIGRATIONS]
+        assert_latest_schema()
+        assert [e.name for e in Employee.query.order_by(Employee.id)] == ['Ada Lovelace', 'Alan Turing']
+        assert upgrade() == []
+
+
+def test_reporting_lines_index_waits_for_its_column(make_app, tmp_path):
+    path = tmp_path / 'baseline.db'
+    with sqlite3.connect(path) as conn:
+        conn.executescript(BASELINE_SCHEMA)
+    app = make_app(SQLALCHEMY_DATABASE_URI=f'sqlite:///{path}')
+
+    with app.app_context():
+        for number, _, apply in MIGRATIONS:
+            with db.engine.begin() as conn:
+                apply(conn)
+            indexes = {i['name'] for i in inspect(db.engine).get_indexes('employee')}
+            assert ('ix_employee_manager_name_id' in indexes) == (number >= 7)
+
+
+def test_upgrade_empty_database(make_app):
+    app = make_app()
+
+    with app.app_context():
+        assert upgrade() == [number for number, _, _ in MIGRATIONS]
+        assert_latest_schema()
+        assert upgrade() == []
@@ -0,0 +1,32 @@
+import multiprocessing
+
+import pytest
+
+from passwords import HasherBusy, PasswordHasher
+
+
+@pytest.fixture
+def hasher():
+    hasher = PasswordHasher(method='pbkdf2:sha256:1000', workers=1, timeout=30)
+    yield hasher
+    hasher.shutdown()
+
+
+def test_pool_does_not_fork_the_threaded_worker(hasher):
+    expected = 'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+    assert hasher.start_method == expected
+
+
+def test_hash_and_verify_in_pool(hasher):
+    pwhash = hasher.hash('secret')
+    assert pwhash.startswith('pbkdf2:sha256:1000$')
+    assert hasher.verify(pwhash, 'secret')
+    assert not hasher.verify(pwhash, 'wrong')
+
+
+def test_timeout_is_reported_as_busy(hasher):
+    hasher.hash('warm up the pool')
+    hasher.method = 'pbkdf2:sha256:3000000'
+    hasher.timeout = 0.01
+    with pytest.raises(HasherBusy):
+        hasher.hash('slow')
@@ -0,0 +1,178 @@
+"""Read-replica routing against two local SQLite files standing in for replicas."""
+import shutil
+import sqlite3
+import time
+
+import pytest
+from flask import session
+
+from app import seed_database
+from cache import employee_cache
+from migrations import upgrade
+from models import db, Employee
+from routing import cached_read, from_primary, replica_binds, replica_router
+
+NAMES = {'primary': 'Primary Copy', 'replica_0': 'Replica Zero', 'replica_1': 'Replica One'}
+
+
+def replica_url(path):
+    return f'sqlite:///file:{path}?mode=ro&uri=true'
+
+
+@pytest.fixture
+def setup(make_app, tmp_path):
+    """``(make_app_with_replicas, paths)``; each copy names employee #1 after itself."""
+    primary = tmp_path / 'primary.db'
+    app = make_app(SQLITE_WAL=False)
+    with app.app_context():
+        upgrade()
+        seed_database()
+        db.session.add(Employee(name=NAMES['primary'], email='one@staffhub.com', department='Finance',
+                                position='Analyst', salary=1))
+        db.session.add(Employee(name='Second Employee', email='two@staffhub.com', department='Finance',
+                                position='Analyst', salary=2))
+        db.session.commit()
+        db.engine.dispose()
+    paths = {}
+    for key in ('replica_0', 'replica_1'):
+        paths[key] = tmp_path / f'{key}.db'
+        shutil.copy(primary, paths[key])
+        with sqlite3.connect(paths[key]) as conn:
+            conn.execute('UPDATE employee SET name = ? WHERE id = 1', (NAMES[key],))
+
+    def make(urls=None, **config):
+        urls = urls or [replica_url(paths['replica_0']), replica_url(paths['replica_1'])]
+        replica_router._down_until.clear()
+        return make_app(SQLITE_WAL=False, SQLALCHEMY_BINDS=replica_binds(','.join(urls)),
+                        REPLICA_STICKY_SECONDS=60, **config)
+    return make, paths
+
+
+def login(app):
+    client = app.test_client()
+    assert client.post('/login', data={'username': 'HR', 'password': 'hr123'}).status_code == 302
+    return client
+
+
+def read_name(client):
+    response = client.get('/api/v1/employees/1', query_string={'fields': 'name'})
+    assert response.status_code == 200
+    return response.json['name']
+
+
+def test_reads_alternate_between_replicas(setup):
+    make, _ = setup
+    client = login(make())
+
+    names = [read_name(client) for _ in range(4)]
+    assert set(names) == {NAMES['replica_0'], NAMES['replica_1']}
+    assert names[0] != names[1] and names[:2] == names[2:]
+
+
+def test_writes_go_to_primary_and_reads_stick_to_it(setup):
+    make, _ = setup
+    client = login(make())
+
+    response = client.patch('/api/v1/employees', json=[{'id': 2, 'position': 'Lead Analyst'}])
+    assert response.status_code == 200
+    # Read-your-writes: the same user now reads from the primary
+    assert [read_name(client) for _ in range(3)] == [NAMES['primary']] * 3
+    assert client.get('/api/v1/employees/2').json['position'] == 'Lead Analyst'
+
+    # Other users keep reading from the replicas
+    assert read_name(login(make())) in (NAMES['replica_0'], NAMES['replica_1'])
+
+    # Once the sticky window has passed, replicas again
+    with client.session_transaction() as session:
+        session['primary_until'] = 0
+    assert read_name(client) in (NAMES['replica_0'], NAMES['replica_1'])
+
+
+def test_unreachable_replica_is_skipped(setup, tmp_path):
+    make, paths = setup
+    client = login(make([replica_url(tmp_path / 'missing.db'), replica_url(paths['replica_1'])]))
+
+    assert [read_name(client) for _ in range(4)] == [NAMES['replica_1']] * 4
+
+
+def test_no_reachable_replica_falls_back_to_primary(setup, tmp_path):
+    make, _ = setup
+    client = login(make([replica_url(tmp_path / 'missing-0.db'), replica_url(tmp_path / 'missing-1.db')]))
+
+    assert [read_name(client) for _ in range(3)] == [NAMES['primary']] * 3
+
+
+def test_cache_fills_read_from_primary(setup):
+    make, _ = setup
+    app = make()
+
+    def first_name():
+        return db.session.scalar(db.select(Employee.name).where(Employee.id == 1))
+
+    with app.test_request_context('/', method='GET'):
+        app.preprocess_request()
+        assert first_name() in (NAMES['replica_0'], NAMES['replica_1'])
+        assert employee_cache.get_or_compute('replica-test', from_primary(first_name)) == NAMES['primary']
+
+
+
+def first_name():
+    return db.session.scalar(db.select(Employee.name).where(Employee.id == 1))
+
+
+def test_report_fills_from_replica_are_kept_briefly(setup):
+    make, _ = setup
+    app = make(REPLICA_CACHE_SECONDS=0)
+    calls = []
+
+    def counted():
+        calls.append(1)
+        return first_name()
+
+    with app.test_request_context('/', method='GET'):
+        app.preprocess_request()
+        assert cached_read(employee_cache, 'replica-report', counted) in (NAMES['replica_0'], NAMES['replica_1'])
+        # Kept for REPLICA_CACHE_SECONDS, not until the next write
+        cached_read(employee_cache, 'replica-report', counted)
+    assert len(calls) == 2
+
+
+def test_report_reads_past_cache_right_after_own_write(setup):
+    make, _ = setup
+    app = make(REPLICA_CACHE_SECONDS=60)
+
+    with app.test_request_context('/', method='GET'):
+        app.preprocess_request()
+        assert cached_read(employee_cache, 'replica-report', first_name) in (NAMES['replica_0'], NAMES['replica_1'])
+
+    with app.test_request_context('/', method='GET'):
+        session['primary_until'] = time.time() + 60
+        app.preprocess_request()
+        assert cached_read(employee_cache, 'replica-report', first_name) == NAMES['primary']
+
+
+def test_dashboard_reads_replicas_and_keeps_them_briefly(setup):
+    make, paths = setup
+    client = login(make(REPLICA_CACHE_SECONDS=0))
+
+    page = client.get('/').data
+    assert NAMES['replica_0'].encode() in page or NAMES['replica_1'].encode() in page
+
+    # The replicas catch up with a change; no write went through this app to invalidate
+    for path in paths.values():
+        with sqlite3.connect(path) as conn:
+            conn.execute("UPDATE employee SET name = 'Replica Caught Up' WHERE id = 1")
+    assert b'Replica Caught Up' in client.get('/').data
+
+
+def test_user_who_just_wrote_reads_past_replica_cache(setup):
+    make, _ = setup
+    app = make(REPLICA_CACHE_SECONDS=60)
+    writer, other = login(app), login(app)
+
+    response = writer.patch('/api/v1/employees', json=[{'id': 1, 'name': 'Saved Name'}])
+    assert response.status_code == 200
+    # Another HR user fills the shared listing from a replica that has not caught up
+    assert b'Saved Name' not in other.get('/').data
+
+    assert b'Saved Name' in writer.get('/').data